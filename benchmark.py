@@ -0,0 +1,202 @@
+"""
+Benchmark the pipeline's core stages on synthetic Singapore data at several scales.
+
+Usage:
+    python benchmark.py --scales 1 10 100 --repeat 3 --output benchmarks/results.json
+
+Cold-start time is also measured for every income-sg sub-command: a fresh interpreter
+importing the CLI and the modules that sub-command needs.
+
+Scale 1 is the size of raw/population_density.csv (one point per 100m grid cell); scale N
+places N jittered points in each grid cell. Property points, planning areas and income
+distributions are synthesised from the real raw/planning_area.geojson boundaries.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from income_sg.cli import STAGE_COMMANDS
+from income_sg.estimate_income import estimate_income
+from income_sg.process_income_data import process_income_to_cumulative
+from income_sg.storage import write_dataset
+from income_sg.utils import assign_planning_area_and_subzone, idw_interpolation, prepare_coordinates
+
+PLANNING_AREA_GEOJSON = os.path.abspath('./raw/planning_area.geojson')
+SUBZONE_GEOJSON = os.path.abspath('./raw/subzone.geojson')
+POPULATION_DENSITY_CSV = os.path.abspath('./raw/population_density.csv')
+
+# Number of property price points per grid cell in the real data (~13k points for ~80k cells)
+PROPERTY_POINTS_PER_CELL = 0.17
+GRID_CELL_SIZE = 1 / 1200  # WorldPop 100m grid spacing in degrees
+
+def synthetic_grid(scale, rng):
+    """Population grid with `scale` jittered points per real 100m grid cell."""
+    base = pd.read_csv(POPULATION_DENSITY_CSV)
+    repeats = np.repeat(np.arange(len(base)), scale)
+    # Scale 1 keeps the real grid; larger scales spread points uniformly within each cell
+    jitter = (rng.random((len(repeats), 2)) - 0.5) * GRID_CELL_SIZE * (scale > 1)
+    return pd.DataFrame({
+        'latitude': base['latitude'].to_numpy()[repeats] + jitter[:, 0],
+        'longitude': base['longitude'].to_numpy()[repeats] + jitter[:, 1],
+        'popDensity': rng.lognormal(3.0, 1.5, len(repeats)).astype('float32'),
+    })
+
+def synthetic_property_prices(grid, rng):
+    """Property price points sampled near populated grid cells."""
+    n = max(int(len(grid) * PROPERTY_POINTS_PER_CELL), 30)
+    rows = rng.integers(0, len(grid), n)
+    return pd.DataFrame({
+        'latitude': grid['latitude'].to_numpy()[rows] + rng.normal(0, GRID_CELL_SIZE, n),
+        'longitude': grid['longitude'].to_numpy()[rows] + rng.normal(0, GRID_CELL_SIZE, n),
+        'mean_price_per_sqm': rng.lognormal(8.7, 0.5, n),
+        'housing_type': np.where(rng.random(n) < 0.7, 'public', 'private'),
+    })
+
+def synthetic_income_csv(planning_areas, path, rng):
+    """raw/income.csv-style household counts by income bracket for each planning area."""
+    brackets = ['0_1000'] + [f"{lower}_{lower + 999}" for lower in range(1000, 15000, 1000)] + \
+        ['15000_17499', '17500_19999', '20000_and_Over']
+    counts = rng.dirichlet(np.ones(len(brackets) + 1), len(planning_areas)) * 50
+    income = pd.DataFrame(counts, columns=['No_Working_Person'] + brackets).round(1)
+    income.insert(0, 'Total', income.sum(axis=1))
+    income.insert(0, 'Planning_Area', planning_areas)
+    income.to_csv(path, index=False)
+
+@contextmanager
+def working_directory(path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+def measure(func, repeat):
+    """Run func `repeat` times, returning the best wall time, CPU time and peak traced memory."""
+    wall_times, cpu_times, peaks = [], [], []
+    for _ in range(repeat):
+        tracemalloc.start()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        func()
+        wall_times.append(time.perf_counter() - wall_start)
+        cpu_times.append(time.process_time() - cpu_start)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return {
+        'wall_seconds': min(wall_times),
+        'wall_seconds_all': wall_times,
+        'cpu_seconds': min(cpu_times),
+        'peak_traced_bytes': max(peaks),
+    }
+
+def run_scale(scale, repeat, seed=0):
+    """Benchmark every stage at one scale."""
+    rng = np.random.default_rng(seed)
+    subzone_geojson = SUBZONE_GEOJSON if os.path.exists(SUBZONE_GEOJSON) else PLANNING_AREA_GEOJSON
+
+    grid = synthetic_grid(scale, rng)
+    properties = synthetic_property_prices(grid, rng)
+    source = prepare_coordinates(properties, 'latitude', 'longitude', 'mean_price_per_sqm')
+    target_coords = grid[['latitude', 'longitude']].to_numpy()
+
+    results = {'scale': scale, 'grid_cells': len(grid), 'property_points': len(properties), 'stages': {}}
+    print(f"Scale {scale}x: {len(grid)} grid cells, {len(properties)} property points.")
+
+    # Load the polygon index once so every stage measures steady-state lookups
+    assign_planning_area_and_subzone(grid.head(1), PLANNING_AREA_GEOJSON, subzone_geojson)
+    results['stages']['assign_planning_area_and_subzone'] = measure(
+        lambda: assign_planning_area_and_subzone(grid, PLANNING_AREA_GEOJSON, subzone_geojson), repeat
+    )
+    assign_planning_area_and_subzone(grid.head(1), PLANNING_AREA_GEOJSON, subzone_geojson, use_raster=True)
+    results['stages']['assign_planning_area_and_subzone_raster'] = measure(
+        lambda: assign_planning_area_and_subzone(grid, PLANNING_AREA_GEOJSON, subzone_geojson, use_raster=True), repeat
+    )
+    results['stages']['idw_interpolation'] = measure(lambda: idw_interpolation(source, target_coords), repeat)
+
+    labelled = assign_planning_area_and_subzone(grid, PLANNING_AREA_GEOJSON, subzone_geojson)
+    labelled['combined_price'] = idw_interpolation(source, labelled[['latitude', 'longitude']].to_numpy())
+    planning_areas = sorted(labelled['planning_area'].unique())
+
+    with tempfile.TemporaryDirectory() as directory, working_directory(directory):
+        os.makedirs('raw')
+        os.makedirs('processed')
+        synthetic_income_csv(planning_areas, './raw/income.csv', rng)
+        results['stages']['process_income_to_cumulative'] = measure(process_income_to_cumulative, repeat)
+
+        write_dataset(labelled, './processed/interpolated_combined.parquet')
+        results['stages']['estimate_income'] = measure(estimate_income, repeat)
+
+    for stage, stage_results in results['stages'].items():
+        print(f"  {stage}: {stage_results['wall_seconds']:.3f}s, "
+              f"peak {stage_results['peak_traced_bytes'] / 2**20:.1f} MiB")
+    return results
+
+def measure_cold_start(repeat):
+    """
+    Best wall time of a fresh interpreter importing each sub-command's modules, and of
+    an empty interpreter for reference.
+
+    Returns:
+        dict: Sub-command -> seconds.
+    """
+    repository = os.path.dirname(os.path.abspath(__file__))
+    scripts = {'(interpreter)': 'pass'}
+    for command in ['run', 'serve'] + list(STAGE_COMMANDS):
+        scripts[command] = f"from income_sg.cli import import_command; import_command({command!r})"
+
+    results = {}
+    for command, script in scripts.items():
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, '-c', script], cwd=repository, check=True)
+            times.append(time.perf_counter() - start)
+        results[command] = min(times)
+        print(f"  cold start {command}: {results[command]:.3f}s")
+    return results
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages on synthetic data.")
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100], help="Grid scales to run.")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per stage (the best is reported).")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for the synthetic data.")
+    parser.add_argument('--output', default='./benchmarks/results.json', help="Path of the JSON results file.")
+    args = parser.parse_args()
+
+    report = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'repeat': args.repeat,
+        'cold_start_seconds': measure_cold_start(args.repeat),
+        'results': [run_scale(scale, args.repeat, args.seed) for scale in args.scales],
+    }
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+    print(f"Benchmark results saved to '{args.output}'.")
+
+if __name__ == "__main__":
+    main()
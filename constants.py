@@ -1 +0,0 @@
-ONEMAP_SEARCH_BASE_URL = "https://www.onemap.gov.sg/api/common/elastic/search"
\ No newline at end of file
@@ -0,0 +1,3 @@
+"""Synthetic 100m x 100m income grid for Singapore from property prices, census income and population density."""
+
+__version__ = "0.1.0"
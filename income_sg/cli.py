@@ -0,0 +1,168 @@
+"""
+Command line entry point: `income-sg run` for the whole pipeline, or one sub-command per stage.
+
+Only the modules of the stages that actually run are imported, so e.g. `income-sg estimate`
+does not load SciPy, pyproj or the polygon index.
+"""
+import argparse
+import importlib
+import os
+
+from .constants import PROFILERS
+from .stages import pipeline_stages
+
+# Sub-command -> (stage name, help)
+STAGE_COMMANDS = {
+    'hdb-prices': ("hdb_property_prices", "Geocode and aggregate HDB resale prices."),
+    'private-prices': ("private_property_prices", "Geocode and aggregate URA private property prices."),
+    'cumulative-income': ("cumulative_income", "Build cumulative income distributions per planning area."),
+    'exclusion-mask': ("exclusion_mask", "Compile the non-residential exclusion rules onto the population grid."),
+    'interpolate': ("interpolation", "Interpolate property prices onto the population grid."),
+    'estimate': ("estimate_income", "Estimate the income of every residential grid cell."),
+    'income-grid': ("income_grid", "Convert the estimated income to the memory-mapped grid format."),
+    'temporal': ("temporal_interpolation", "Interpolate quarterly price surfaces."),
+    'ensemble': ("estimate_income_ensemble", "Build a Monte Carlo income ensemble."),
+    'tiles': ("tile_pyramids", "Export MBTiles pyramids of the income and price grids."),
+    'export-csv': ("export_csv", "Export estimated_income as CSV."),
+}
+
+def _stage_options(args):
+    """pipeline_stages options from parsed arguments (sub-commands only define some)."""
+    return {
+        'incremental': getattr(args, 'incremental', False),
+        'skip_excluded': getattr(args, 'skip_excluded', False),
+        'blend_housing_types': getattr(args, 'blend_housing_types', False),
+        'workers': getattr(args, 'workers', None),
+        'temporal': getattr(args, 'temporal', False) or args.command == 'temporal',
+        'ensemble': getattr(args, 'ensemble', None) or getattr(args, 'realisations', None),
+        'tiles': getattr(args, 'tiles', False) or args.command == 'tiles',
+        'export_csv': getattr(args, 'export_csv', False) or args.command == 'export-csv',
+    }
+
+def _run_stages(stages, args, force):
+    from .pipeline import run_pipeline
+
+    if args.instrument or args.profile:
+        from .instrumentation import Instrumentation
+
+        with Instrumentation(profile=args.profile) as instrumentation:
+            run_pipeline(stages, force=force, instrumentation=instrumentation)
+    else:
+        run_pipeline(stages, force=force)
+
+def _serve(args):
+    from .constants import INCOME_GRID_PATH
+    from .exclusion_mask import load_exclusion_mask
+    from .income_query import ESTIMATED_INCOME_PATH, IncomeQueryEngine, benchmark_http, serve
+
+    path = args.path or (INCOME_GRID_PATH if os.path.isdir(INCOME_GRID_PATH) else ESTIMATED_INCOME_PATH)
+    engine = IncomeQueryEngine.load(path, exclusion_mask=load_exclusion_mask())
+    if args.benchmark:
+        result = benchmark_http(args.host, args.port, engine, n_requests=args.benchmark)
+        print(f"{result['requests']} requests in {result['seconds']:.2f}s ({result['requests_per_second']:.0f} req/s).")
+    else:
+        serve(engine, args.host, args.port)
+
+def _cross_validate(args):
+    from .cross_validation import DEFAULT_BLOCK_SIZE, DEFAULT_K_VALUES, DEFAULT_POWERS, run_cross_validation
+
+    run_cross_validation(args.k or DEFAULT_K_VALUES, args.power or DEFAULT_POWERS, n_folds=args.folds,
+                         block_size=args.block_size or DEFAULT_BLOCK_SIZE, seed=args.seed,
+                         time_combinations=args.time_combinations)
+
+def import_command(command):
+    """Import the modules a sub-command needs, without running it (for cold-start timing)."""
+    if command in ('serve', 'cross-validate'):
+        importlib.import_module(f"{__package__}.{'income_query' if command == 'serve' else 'cross_validation'}")
+        return
+    if command == 'run':
+        return
+    stage_name = STAGE_COMMANDS[command][0]
+    options = {'temporal': True, 'ensemble': 1, 'tiles': True, 'export_csv': True}
+    stage = next(stage for stage in pipeline_stages(**options) if stage.name == stage_name)
+    importlib.import_module(stage.func.module)
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='income-sg', description="Generate synthetic income data for Singapore.")
+    commands = parser.add_subparsers(dest='command', required=True, metavar='command')
+
+    instrument = argparse.ArgumentParser(add_help=False)
+    instrument.add_argument("--instrument", action="store_true",
+                            help="Record per-stage metrics and a Chrome trace in ./processed/instrumentation.")
+    instrument.add_argument("--profile", choices=PROFILERS, help="Also profile each stage (implies --instrument).")
+    workers = argparse.ArgumentParser(add_help=False)
+    workers.add_argument("--workers", type=int, metavar="N",
+                         help="Interpolate and estimate per planning area in N processes (same results).")
+    incremental = argparse.ArgumentParser(add_help=False)
+    incremental.add_argument("--incremental", action="store_true",
+                             help="Re-interpolate only grid cells affected by changed property prices.")
+    skip_excluded = argparse.ArgumentParser(add_help=False)
+    skip_excluded.add_argument("--skip-excluded", action="store_true",
+                               help="Do not interpolate prices for cells excluded by ./raw/exclusion_rules.json.")
+    blend = argparse.ArgumentParser(add_help=False)
+    blend.add_argument("--blend-housing-types", action="store_true",
+                       help="Interpolate each housing type separately (cached) and blend by local supply.")
+
+    run = commands.add_parser('run', parents=[instrument, workers, incremental, skip_excluded, blend],
+                              help="Run every stage whose inputs changed.")
+    run.add_argument("--force", action="store_true", help="Re-run every stage even if its inputs are unchanged.")
+    run.add_argument("--export-csv", action="store_true", help="Also export estimated_income as CSV.")
+    run.add_argument("--ensemble", type=int, metavar="N",
+                     help="Also build a Monte Carlo income ensemble of N seeded realisations.")
+    run.add_argument("--temporal", action="store_true",
+                     help="Also interpolate quarterly price surfaces from the transaction histories.")
+    run.add_argument("--tiles", action="store_true",
+                     help="Also export MBTiles pyramids of the estimated income and property price grids.")
+
+    for command, (_, help_text) in STAGE_COMMANDS.items():
+        parents = [instrument]
+        if command == 'interpolate':
+            parents += [workers, incremental, skip_excluded, blend]
+        elif command == 'estimate':
+            parents += [workers]
+        stage_parser = commands.add_parser(command, parents=parents, help=help_text)
+        if command == 'ensemble':
+            stage_parser.add_argument("realisations", type=int, nargs='?', default=100,
+                                      help="Number of seeded realisations (default 100).")
+
+    serve = commands.add_parser('serve', help="Serve point and region queries over the estimated income grid.")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8080)
+    serve.add_argument('--path', default=None,
+                       help="Estimated income dataset or grid directory to load (the income grid if built).")
+    serve.add_argument('--benchmark', type=int, metavar='N',
+                       help="Instead of serving, measure throughput of N requests against a server on --host/--port.")
+
+    cross_validate = commands.add_parser('cross-validate',
+                                         help="Score IDW k and power settings by cross-validation on the property prices.")
+    cross_validate.add_argument('--folds', type=int, default=5,
+                                help="Number of spatial block folds, or 0 for leave-one-out (default 5).")
+    cross_validate.add_argument('--k', type=int, nargs='+', metavar='K',
+                                help="Neighbour counts to evaluate (default 5 10 20 30 50).")
+    cross_validate.add_argument('--power', type=float, nargs='+', metavar='P',
+                                help="IDW powers to evaluate (default 1 1.5 2 3).")
+    cross_validate.add_argument('--block-size', type=float,
+                                help="Side of the spatial fold blocks in degrees (default 0.01, about 1.1 km).")
+    cross_validate.add_argument('--seed', type=int, default=0, help="Seed of the fold assignment.")
+    cross_validate.add_argument('--time-combinations', action='store_true',
+                                help="Time each k and power combination on its own and report its "
+                                     "throughput (slower; default times only the shared pass).")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.command == 'serve':
+        _serve(args)
+    elif args.command == 'cross-validate':
+        _cross_validate(args)
+    elif args.command == 'run':
+        _run_stages(pipeline_stages(**_stage_options(args)), args, force=args.force)
+    else:
+        # A stage asked for by name always runs
+        stage_name = STAGE_COMMANDS[args.command][0]
+        stages = [stage for stage in pipeline_stages(**_stage_options(args)) if stage.name == stage_name]
+        _run_stages(stages, args, force=True)
+
+if __name__ == "__main__":
+    main()
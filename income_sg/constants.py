@@ -0,0 +1,14 @@
+ONEMAP_SEARCH_BASE_URL = "https://www.onemap.gov.sg/api/common/elastic/search"
+GEOCODE_CACHE_PATH = "./processed/geocode_cache.sqlite"
+
+# Paths shared by the stage modules and the stage list, kept here so listing stages imports nothing heavy
+INCOME_CSV_PATTERN = "./raw/income*.csv"  # e.g. income.csv (current) and income_2015.csv
+CUMULATIVE_INCOME_PATH = "./processed/cumulative_income.npz"
+INCOME_GRID_PATH = "./processed/income_grid"
+TEMPORAL_OUTPUT_PATH = "./processed/interpolated_temporal.parquet"
+TILES_DIRECTORY = "./processed/tiles"
+EXCLUSION_RULES_PATH = "./raw/exclusion_rules.json"
+EXCLUSION_MASK_PATH = "./processed/exclusion_mask"
+
+# Profilers accepted by --profile (see instrumentation.py)
+PROFILERS = ('cprofile', 'sampling')
@@ -0,0 +1,248 @@
+"""
+Cross-validation of the default IDW interpolation over the property price points.
+
+Every (k, power) combination is scored from one neighbour query per fold: the fold's
+held-out points are queried once for the largest k against a KD-tree of the remaining
+points, and cumulative weighted sums over the sorted neighbours give the prediction of
+every smaller k and every power in the same pass. Throughput is that of the shared pass
+unless --time-combinations re-runs the query and weighting of each combination on its own.
+
+Usage:
+    income-sg cross-validate --folds 5 --k 10 20 30 --power 1 2 3
+    income-sg cross-validate --folds 0    # leave-one-out
+    income-sg cross-validate --time-combinations
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from .storage import read_dataset, write_dataset
+
+PROPERTY_PRICE_PATHS = ["./processed/hdb_property_prices.parquet", "./processed/private_property_prices.parquet"]
+CROSS_VALIDATION_OUTPUT_PATH = "./processed/cross_validation.parquet"
+
+DEFAULT_K_VALUES = (5, 10, 20, 30, 50)
+DEFAULT_POWERS = (1.0, 1.5, 2.0, 3.0)
+# Side of the square blocks assigned to spatial folds (degrees, ~1.1 km)
+DEFAULT_BLOCK_SIZE = 0.01
+
+def load_property_points(paths=PROPERTY_PRICE_PATHS):
+    """
+    Property price points with their planning area and housing type.
+
+    Returns:
+        pd.DataFrame: 'lat', 'lon', 'value', 'planning_area' and 'housing_type' columns.
+    """
+    columns = ['latitude', 'longitude', 'mean_price_per_sqm', 'planning_area', 'housing_type']
+    points = pd.concat([read_dataset(path, columns=columns) for path in paths], ignore_index=True)
+    points = points.rename(columns={'latitude': 'lat', 'longitude': 'lon', 'mean_price_per_sqm': 'value'})
+    points = points.dropna(subset=['lat', 'lon', 'value']).reset_index(drop=True)
+    for column in ['planning_area', 'housing_type']:
+        points[column] = points[column].astype(str)
+    return points
+
+def spatial_folds(coords, n_folds, block_size=DEFAULT_BLOCK_SIZE, seed=0):
+    """
+    Assign points to folds by square spatial blocks, so held-out points are not
+    predicted from their immediate neighbours in the same estate.
+
+    Parameters:
+        coords (np.ndarray): [[lat, lon], ...] point coordinates.
+        n_folds (int): Number of folds.
+        block_size (float): Block side in degrees.
+        seed (int): Seed of the random block-to-fold assignment.
+
+    Returns:
+        np.ndarray: Fold of each point.
+    """
+    blocks = np.floor(coords / block_size).astype(np.int64)
+    _, block_codes = np.unique(blocks, axis=0, return_inverse=True)
+    block_folds = np.random.default_rng(seed).permutation(block_codes.max() + 1) % n_folds
+    return block_folds[block_codes.ravel()]
+
+def idw_predictions(distances, neighbour_values, k_values, powers):
+    """
+    IDW predictions for every (power, k) combination from one set of sorted neighbours,
+    with the weights of utils.idw_interpolation.
+
+    Parameters:
+        distances (np.ndarray): (points, max_k) neighbour distances, nearest first.
+        neighbour_values (np.ndarray): (points, max_k) neighbour values.
+        k_values (list): Neighbour counts, each at most max_k.
+        powers (list): IDW powers.
+
+    Returns:
+        np.ndarray: (powers, k_values, points) predictions.
+    """
+    powers = np.asarray(powers, dtype=float)[:, None, None]
+    weights = 1 / (distances[None] ** powers + 1e-10)
+    weight_sums = np.cumsum(weights, axis=2)
+    weighted_sums = np.cumsum(weights * neighbour_values[None], axis=2)
+    columns = np.asarray(k_values) - 1
+    return (weighted_sums[:, :, columns] / weight_sums[:, :, columns]).transpose(0, 2, 1)
+
+def _query_neighbours(tree, coords, k, exclude=None, workers=-1):
+    """k nearest neighbours of each point, skipping the point itself for leave-one-out."""
+    if exclude is None:
+        distances, indices = tree.query(coords, k=k, workers=workers)
+    else:
+        distances, indices = tree.query(coords, k=k + 1, workers=workers)
+        # Drop each point's own index (not necessarily the first column when points coincide)
+        keep = indices != exclude[:, None]
+        keep[keep.sum(axis=1) > k, -1] = False
+        distances = distances[keep].reshape(len(coords), k)
+        indices = indices[keep].reshape(len(coords), k)
+    return distances.reshape(len(coords), k), indices.reshape(len(coords), k)
+
+def _error_table(errors, groups, k_values, powers, level):
+    """RMSE and MAE of every (power, k) combination per group, from bincounts."""
+    codes, names = pd.factorize(groups)
+    counts = np.bincount(codes, minlength=len(names))
+    rows = []
+    for p, power in enumerate(powers):
+        for i, k in enumerate(k_values):
+            squared = np.bincount(codes, weights=errors[p, i] ** 2, minlength=len(names))
+            absolute = np.bincount(codes, weights=np.abs(errors[p, i]), minlength=len(names))
+            rows.append(pd.DataFrame({
+                'k': k, 'power': power, 'level': level, 'group': np.asarray(names, dtype=object),
+                'points': counts, 'rmse': np.sqrt(squared / counts), 'mae': absolute / counts,
+            }))
+    return pd.concat(rows, ignore_index=True)
+
+def cross_validate_idw(points, k_values=DEFAULT_K_VALUES, powers=DEFAULT_POWERS, n_folds=5,
+                       block_size=DEFAULT_BLOCK_SIZE, seed=0, chunk_size=20_000, workers=-1,
+                       time_combinations=False):
+    """
+    Cross-validate IDW over a parameter grid.
+
+    Parameters:
+        points (pd.DataFrame): Output of load_property_points.
+        k_values (list): Neighbour counts to evaluate.
+        powers (list): IDW powers to evaluate.
+        n_folds (int): Number of spatial folds (0 for leave-one-out).
+        block_size (float): Spatial fold block side in degrees.
+        seed (int): Seed of the fold assignment.
+        chunk_size (int): Held-out points weighted per batch, bounding memory to
+            powers x chunk_size x max(k_values) values.
+        workers (int): Number of workers for the KDTree queries (-1 uses all cores).
+        time_combinations (bool): Also time the neighbour query and weighting of each
+            combination on its own. Otherwise only the single shared pass is timed.
+
+    Returns:
+        tuple: (errors, throughput). errors holds RMSE and MAE per (k, power) overall
+        ('level' 'all'), per planning area and per housing type. throughput holds the
+        points per second of each (k, power) combination with time_combinations, or a
+        single row for the shared pass without it.
+    """
+    from scipy.spatial import cKDTree
+
+    k_values = sorted({int(k) for k in k_values})
+    powers = [float(power) for power in powers]
+    max_k = k_values[-1]
+    coords = points[['lat', 'lon']].to_numpy(dtype=float)
+    values = points['value'].to_numpy(dtype=float)
+
+    if n_folds:
+        folds = spatial_folds(coords, n_folds, block_size, seed)
+        fold_ids = range(n_folds)
+    else:
+        folds = np.zeros(len(points), dtype=np.int64)
+        fold_ids = [0]
+
+    predictions = np.full((len(powers), len(k_values), len(points)), np.nan)
+    query_seconds = np.zeros(len(k_values))
+    weight_seconds = np.zeros((len(powers), len(k_values)))
+    shared_seconds = 0.0
+    for fold in fold_ids:
+        held_out = np.flatnonzero(folds == fold)
+        training = np.flatnonzero(folds != fold) if n_folds else np.arange(len(points))
+        if len(training) < max_k + (0 if n_folds else 1) or not len(held_out):
+            print(f"Skipping fold {fold}: {len(training)} training and {len(held_out)} held-out points.")
+            continue
+
+        # One tree per fold, reused by every combination
+        tree = cKDTree(coords[training])
+        exclude = None if n_folds else held_out
+        for start in range(0, len(held_out), chunk_size):
+            block = held_out[start:start + chunk_size]
+            block_exclude = None if exclude is None else exclude[start:start + chunk_size]
+
+            # One query for the largest k and one weighting pass feed every combination
+            begin = time.perf_counter()
+            distances, indices = _query_neighbours(tree, coords[block], max_k, block_exclude, workers)
+            neighbour_values = values[training][indices]
+            predictions[:, :, block] = idw_predictions(distances, neighbour_values, k_values, powers)
+            shared_seconds += time.perf_counter() - begin
+
+            if not time_combinations:
+                continue
+
+            # Query cost of each k and weighting cost of each combination on its own,
+            # as idw_interpolation would run it
+            for i, k in enumerate(k_values):
+                begin = time.perf_counter()
+                _query_neighbours(tree, coords[block], k, block_exclude, workers)
+                query_seconds[i] += time.perf_counter() - begin
+            for p, power in enumerate(powers):
+                for i, k in enumerate(k_values):
+                    begin = time.perf_counter()
+                    weights = 1 / (distances[:, :k] ** power + 1e-10)
+                    np.sum(weights * neighbour_values[:, :k], axis=1) / np.sum(weights, axis=1)
+                    weight_seconds[p, i] += time.perf_counter() - begin
+
+    evaluated = ~np.isnan(predictions[0, 0])
+    errors = predictions[:, :, evaluated] - values[evaluated]
+    error_table = pd.concat([
+        _error_table(errors, np.full(evaluated.sum(), 'all', dtype=object), k_values, powers, 'all'),
+        _error_table(errors, points['planning_area'].to_numpy()[evaluated], k_values, powers, 'planning_area'),
+        _error_table(errors, points['housing_type'].to_numpy()[evaluated], k_values, powers, 'housing_type'),
+    ], ignore_index=True)
+
+    if not time_combinations:
+        # The shared pass serves every combination at once, so it has no per-combination throughput
+        throughput = pd.DataFrame({
+            'points': [evaluated.sum()],
+            'seconds': [shared_seconds],
+            'points_per_second': [evaluated.sum() / shared_seconds if shared_seconds else np.nan],
+        })
+        return error_table, throughput
+
+    seconds = (query_seconds[None, :] + weight_seconds).ravel()
+    throughput = pd.DataFrame({
+        'k': np.tile(k_values, len(powers)),
+        'power': np.repeat(powers, len(k_values)),
+        'points': evaluated.sum(),
+        'seconds': seconds,
+        'points_per_second': evaluated.sum() / seconds,
+    })
+    return error_table, throughput
+
+def run_cross_validation(k_values=DEFAULT_K_VALUES, powers=DEFAULT_POWERS, n_folds=5, block_size=DEFAULT_BLOCK_SIZE,
+                         seed=0, output_path=CROSS_VALIDATION_OUTPUT_PATH, time_combinations=False):
+    """
+    Cross-validate IDW over the processed property prices, save the errors and print
+    the overall accuracy of each combination, best RMSE first. Throughput is reported per
+    combination with time_combinations, and for the shared pass as a whole otherwise.
+    """
+    points = load_property_points()
+    mode = f"{n_folds}-fold spatial" if n_folds else "leave-one-out"
+    print(f"Cross-validating IDW ({mode}) on {len(points)} property points, "
+          f"{len(k_values)} k values x {len(powers)} powers.")
+
+    start = time.perf_counter()
+    errors, throughput = cross_validate_idw(points, k_values, powers, n_folds, block_size, seed,
+                                            time_combinations=time_combinations)
+    summary_columns = ['k', 'power', 'rmse', 'mae']
+    if time_combinations:
+        errors = errors.merge(throughput[['k', 'power', 'points_per_second']], on=['k', 'power'])
+        summary_columns.append('points_per_second')
+    write_dataset(errors, output_path)
+
+    summary = errors[errors['level'] == 'all'].sort_values('rmse')[summary_columns]
+    print(summary.to_string(index=False, float_format=lambda value: f"{value:,.2f}"))
+    if not time_combinations:
+        print(f"Shared pass over every combination: {throughput['points_per_second'].iloc[0]:,.0f} points/s "
+              f"(use --time-combinations for per-combination throughput).")
+    print(f"Cross-validation completed in {time.perf_counter() - start:.1f}s. Results saved to '{output_path}'.")
+    return errors, throughput
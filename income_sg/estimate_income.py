@@ -0,0 +1,433 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import numpy as np
+
+from .exclusion_mask import DEFAULT_EXCLUSION_RULES, ExclusionRules, load_exclusion_mask
+from .partitioned import map_partitions, partition_arrays, partition_bounds
+from .process_income_data import CUMULATIVE_INCOME_PATH, CumulativeIncome
+from .storage import read_dataset, write_dataset
+from .utils import standardize_names
+
+# Lower and upper bounds of the "and over" bracket for the top price deciles
+AND_OVER_DECILE_BOUNDS = {
+    7: (30000, 80000),
+    8: (40000, 100000),
+    9: (50000, 120000),
+    10: (70000, 150000),
+}
+
+def parse_income_brackets(income_brackets):
+    """
+    Parse income bracket names (e.g. '1000_1999', '20000_and_Over') into bound tables.
+
+    Parameters:
+        income_brackets (list): Income bracket column names.
+
+    Returns:
+        tuple: (lower, upper, and_over, valid) arrays indexed by bracket. Brackets with an
+        unexpected format are flagged as invalid instead of raising, so that only brackets
+        which are actually assigned raise an error.
+    """
+    lower = np.zeros(len(income_brackets))
+    upper = np.zeros(len(income_brackets))
+    and_over = np.zeros(len(income_brackets), dtype=bool)
+    valid = np.ones(len(income_brackets), dtype=bool)
+
+    for i, income_bracket in enumerate(income_brackets):
+        try:
+            if 'and_over' in income_bracket.lower():
+                and_over[i] = True
+                lower[i] = int(income_bracket.split('_')[0])
+                upper[i] = lower[i] * 3  # Exaggerated approximation for "and Over"
+            elif '_' in income_bracket:
+                lower[i], upper[i] = map(int, income_bracket.split('_'))
+            else:
+                valid[i] = False
+        except ValueError:
+            valid[i] = False
+
+    return lower, upper, and_over, valid
+
+def bracket_bounds(bracket_index, deciles, income_brackets):
+    """
+    Income bounds of assigned brackets, with the "and over" bracket narrowed by price decile.
+
+    Parameters:
+        bracket_index (np.ndarray): Assigned bracket index per cell.
+        deciles (np.ndarray): Price decile per cell.
+        income_brackets (list): Income bracket column names.
+
+    Returns:
+        tuple: (lower_bound, upper_bound) arrays.
+    """
+    lower_table, upper_table, and_over_table, valid_table = parse_income_brackets(income_brackets)
+    invalid = ~valid_table[bracket_index]
+    if invalid.any():
+        raise ValueError(f"Unexpected income bracket format: {income_brackets[bracket_index[invalid][0]]}")
+
+    lower_bound = lower_table[bracket_index]
+    upper_bound = upper_table[bracket_index]
+    and_over = and_over_table[bracket_index]
+    for decile, (decile_lower, decile_upper) in AND_OVER_DECILE_BOUNDS.items():
+        # Adjust lower and upper bounds for deciles >= 7
+        adjust = and_over & (deciles == decile)
+        lower_bound[adjust] = decile_lower
+        upper_bound[adjust] = decile_upper
+    return lower_bound, upper_bound
+
+def compute_income_bounds(interpolated_combined, cumulative_income, vintage=None, return_probabilities=False):
+    """
+    Select the residential grid cells and compute the income bracket and bounds of each.
+
+    All planning areas are processed in one batch: the decile lookup, the bracket mapping
+    and the bound table are whole-array operations. Cells are returned grouped by planning
+    area (in order of first appearance).
+
+    Parameters:
+        interpolated_combined (pd.DataFrame): Grid with 'planning_area', 'subzone', 'latitude',
+            'longitude', 'combined_price', 'price_decile' and 'popDensity' columns, and
+            optionally a boolean 'excluded' column (default: the default exclusion rules).
+        cumulative_income (CumulativeIncome): Cumulative income probabilities per area and vintage.
+        vintage (str): Income vintage to use (default: the last).
+        return_probabilities (bool): Also return each cell's cumulative bracket probabilities.
+
+    Returns:
+        pd.DataFrame: Per-cell output columns (without income) with the bracket index in
+        'bracket_index' and the bounds in 'lower_bound' and 'upper_bound'. With
+        return_probabilities, a (cells, (cells x brackets) array) tuple.
+    """
+    # Factorize planning areas in order of first appearance (missing areas get -1)
+    area_codes, planning_areas = pd.factorize(interpolated_combined['planning_area'])
+    pop_density = interpolated_combined['popDensity'].to_numpy(dtype=float)
+
+    # Gather the area x bracket table of cumulative probabilities from the vintage's array
+    income_brackets = cumulative_income.brackets
+    income_table = cumulative_income.table(vintage)
+    income_areas = pd.Index(cumulative_income.areas)
+    area_index = income_areas.get_indexer(planning_areas)
+    has_income = (area_index >= 0) & ~np.isnan(income_table[area_index, -1])
+    cumulative_probs = np.where(has_income[:, None], income_table[area_index], np.nan)
+    usable = has_income.copy()
+    others = income_areas.get_indexer(['others'])[0]
+
+    # Handle missing income data
+    area_density = np.bincount(
+        area_codes[area_codes >= 0],
+        weights=np.nan_to_num(pop_density[area_codes >= 0]),
+        minlength=len(planning_areas)
+    )
+    for i in np.flatnonzero(~has_income):
+        planning_area = planning_areas[i]
+        print(f"Warning: No income data for planning area '{planning_area}', using 'other' planning area information.")
+
+        # Check population density
+        if area_density[i] == 0:
+            print(f"Skipping '{planning_area}' due to zero population density.")
+            continue
+
+        # Use "others" planning area as fallback
+        if others >= 0 and not np.isnan(income_table[others, -1]):
+            cumulative_probs[i] = income_table[others]
+            usable[i] = True
+        else:
+            print(f"No 'other' column found. Skipping '{planning_area}'.")
+
+    # Skip rows with low population density or in non-residential subzones
+    if 'excluded' in interpolated_combined:
+        excluded = interpolated_combined['excluded'].to_numpy(dtype=bool)
+    else:
+        excluded = ExclusionRules(**DEFAULT_EXCLUSION_RULES).evaluate(
+            interpolated_combined['latitude'], interpolated_combined['longitude'],
+            pop_density, interpolated_combined['subzone'],
+        )
+    keep = (area_codes >= 0) & usable[np.maximum(area_codes, 0)] & ~excluded
+    rows = np.flatnonzero(keep)
+    rows = rows[np.argsort(area_codes[rows], kind='stable')]
+    codes = area_codes[rows]
+
+    # Map decile to cumulative probability and find matching income bracket
+    # (equivalent to np.searchsorted(cumulative_probs, decile_prob) per row)
+    deciles = interpolated_combined['price_decile'].to_numpy()[rows]
+    decile_probs = (deciles + 1) / 10.0
+    matching_index = np.sum(cumulative_probs[codes] < decile_probs[:, None], axis=1)
+    matching_index = np.minimum(matching_index, len(income_brackets) - 1)  # Handle edge cases
+
+    # Look up the lower and upper bounds of each assigned bracket
+    lower_bound, upper_bound = bracket_bounds(matching_index, deciles, income_brackets)
+
+    cells = pd.DataFrame({
+        'planning_area': np.asarray(planning_areas, dtype=object)[codes],
+        'subzone': interpolated_combined['subzone'].to_numpy()[rows],
+        'latitude': interpolated_combined['latitude'].to_numpy()[rows],
+        'longitude': interpolated_combined['longitude'].to_numpy()[rows],
+        'property_price': interpolated_combined['combined_price'].to_numpy()[rows],
+        'price_decile': deciles,
+        'income_bracket': np.asarray(income_brackets, dtype=object)[matching_index],
+        'popDensity': pop_density[rows],
+        'bracket_index': matching_index,
+        'lower_bound': lower_bound,
+        'upper_bound': upper_bound,
+    })
+    if return_probabilities:
+        return cells, cumulative_probs[codes]
+    return cells
+
+def _income_bounds_partition(bounds):
+    """compute_income_bounds for the cells of one planning area, in a partition worker."""
+    arrays, context = partition_arrays()
+    rows = arrays['order'][bounds[0]:bounds[1]]
+    partition = pd.DataFrame({
+        'planning_area': np.repeat(context['planning_areas'][arrays['area_codes'][rows[0]]], len(rows)),
+        'subzone': pd.Categorical.from_codes(arrays['subzone_codes'][rows], categories=context['subzones']),
+        **{column: arrays[column][rows] for column in context['value_columns']},
+    })
+    return compute_income_bounds(partition, context['cumulative_income'], context['vintage'])
+
+def partitioned_income_bounds(interpolated_combined, cumulative_income, vintage=None, n_workers=None):
+    """
+    compute_income_bounds run per planning area in a process pool.
+
+    Grid columns are shared with the workers rather than pickled, and partitions are
+    merged in the serial output order (planning areas by first appearance), so the
+    result is identical to compute_income_bounds.
+    """
+    area_codes, planning_areas = pd.factorize(interpolated_combined['planning_area'])
+    subzone_codes, subzones = pd.factorize(interpolated_combined['subzone'])
+    order, bounds = partition_bounds(area_codes)
+
+    value_columns = ['latitude', 'longitude', 'combined_price', 'price_decile', 'popDensity']
+    if 'excluded' in interpolated_combined:
+        value_columns.append('excluded')
+    arrays = {column: interpolated_combined[column].to_numpy() for column in value_columns}
+    arrays.update(order=order, area_codes=area_codes, subzone_codes=subzone_codes)
+    context = {
+        'planning_areas': np.asarray(planning_areas, dtype=object),
+        'subzones': pd.Index(np.asarray(subzones, dtype=object)),
+        'value_columns': value_columns,
+        'cumulative_income': cumulative_income,
+        'vintage': vintage,
+    }
+    # Serial result on no rows: the column dtypes to restore, and the result when there is nothing to partition
+    template = compute_income_bounds(interpolated_combined.iloc[:0], cumulative_income, vintage)
+    if not bounds:
+        return template
+
+    parts = map_partitions(_income_bounds_partition, arrays, bounds, context=context, n_workers=n_workers)
+    return pd.concat(parts, ignore_index=True).astype(template.dtypes.to_dict())
+
+def assign_income_brackets(interpolated_combined, cumulative_income, vintage=None, n_workers=None):
+    """
+    Assign an income bracket and a random income to every residential grid cell.
+
+    Draws are taken in the order of compute_income_bounds, so results match the original
+    per-row implementation for the same random seed. With n_workers, the bounds are
+    computed per planning area in parallel and the draws are still taken here, in the
+    same order, so the result does not change.
+
+    Returns:
+        pd.DataFrame: Estimated income per grid cell.
+    """
+    if n_workers:
+        cells = partitioned_income_bounds(interpolated_combined, cumulative_income, vintage, n_workers)
+    else:
+        cells = compute_income_bounds(interpolated_combined, cumulative_income, vintage)
+
+    # Generate a random income within the bracket bounds
+    average_income = np.random.uniform(cells['lower_bound'].to_numpy(), cells['upper_bound'].to_numpy())
+
+    return cells.drop(columns=['bracket_index', 'lower_bound', 'upper_bound']).assign(average_income=average_income)
+
+def load_income_inputs():
+    """
+    Load the interpolated grid and cumulative income distributions, with exponential
+    price deciles computed over the grid and each cell's flag from the exclusion mask.
+
+    Returns:
+        tuple: (interpolated_combined, cumulative_income)
+    """
+    # Hardcoded file paths
+    interpolated_combined_path = "./processed/interpolated_combined.parquet"
+    cumulative_income_path = "./processed/cumulative_income.parquet"
+
+    # Load the datasets
+    interpolated_combined = read_dataset(interpolated_combined_path, columns=[
+        'planning_area', 'subzone', 'latitude', 'longitude', 'popDensity', 'combined_price'
+    ])
+    # Area names are normalised when the array is built; fall back to the single-vintage table
+    cumulative_income = CumulativeIncome.load(CUMULATIVE_INCOME_PATH)
+    if cumulative_income is None:
+        cumulative_income = CumulativeIncome.from_frame(read_dataset(cumulative_income_path))
+
+    interpolated_combined = standardize_names(interpolated_combined, "planning_area")
+
+    # Calculate exponential price bins for stratification
+    max_price = interpolated_combined['combined_price'].max()
+    min_price = interpolated_combined['combined_price'].min()
+    num_bins = 10
+    bins = np.geomspace(min_price, max_price, num_bins + 1)  # Exponential progression for bins
+
+    interpolated_combined['price_decile'] = np.digitize(
+        interpolated_combined['combined_price'], bins, right=False
+    ) - 1  # Adjust for 0-based indexing
+
+    interpolated_combined['excluded'] = load_exclusion_mask().excluded(
+        interpolated_combined['latitude'], interpolated_combined['longitude'],
+        interpolated_combined['popDensity'], interpolated_combined['subzone'],
+    )
+
+    return interpolated_combined, cumulative_income
+
+def estimate_income(vintage=None, n_workers=None):
+    output_path = "./processed/estimated_income.parquet"
+
+    interpolated_combined, cumulative_income = load_income_inputs()
+
+    # Assign income levels to every grid cell across all planning areas at once
+    result_df = assign_income_brackets(interpolated_combined, cumulative_income, vintage, n_workers)
+
+    # Save to a Parquet file
+    write_dataset(result_df, output_path)
+
+# Bins across each cell's [lower, upper] income range, used to stream ensemble percentiles
+ENSEMBLE_HISTOGRAM_BINS = 64
+
+# Per-process cell inputs for ensemble workers, set by _init_ensemble_worker
+_ensemble_inputs = None
+
+def _init_ensemble_worker(deciles, cumulative_probs, income_brackets, envelope_lower, envelope_upper):
+    global _ensemble_inputs
+    _ensemble_inputs = (deciles, cumulative_probs, income_brackets, envelope_lower, envelope_upper)
+
+def _run_ensemble_realisations(seed_sequences):
+    """
+    Draw one realisation per seed and reduce them on the fly, so only one realisation
+    is held in memory at a time.
+
+    Each realisation draws a cell's position within its price decile, assigns the bracket
+    that position falls in, then draws the income within that bracket.
+
+    Returns:
+        tuple: (sum, sum of squares, relative-position histogram, bracket counts) per cell.
+        Sums are of incomes centred on the middle of each cell's income envelope, for
+        stable variances; histogram positions are relative to that envelope.
+    """
+    deciles, cumulative_probs, income_brackets, envelope_lower, envelope_upper = _ensemble_inputs
+    n_cells = len(deciles)
+    width = envelope_upper - envelope_lower
+    center = envelope_lower + width / 2
+    safe_width = np.where(width > 0, width, 1.0)
+    cells = np.arange(n_cells)
+
+    total = np.zeros(n_cells)
+    total_squares = np.zeros(n_cells)
+    histogram = np.zeros((n_cells, ENSEMBLE_HISTOGRAM_BINS), dtype=np.uint32)
+    bracket_counts = np.zeros((n_cells, len(income_brackets)), dtype=np.uint32)
+
+    for seed_sequence in seed_sequences:
+        rng = np.random.default_rng(seed_sequence)
+        decile_probs = rng.uniform(deciles / 10.0, (deciles + 1) / 10.0)
+        brackets = np.minimum(np.sum(cumulative_probs < decile_probs[:, None], axis=1), len(income_brackets) - 1)
+        incomes = rng.uniform(*bracket_bounds(brackets, deciles, income_brackets))
+
+        centred = incomes - center
+        total += centred
+        total_squares += centred ** 2
+
+        position = ((incomes - envelope_lower) / safe_width * ENSEMBLE_HISTOGRAM_BINS).astype(np.int64)
+        histogram[cells, np.clip(position, 0, ENSEMBLE_HISTOGRAM_BINS - 1)] += 1
+        bracket_counts[cells, brackets] += 1
+
+    return total, total_squares, histogram, bracket_counts
+
+def _histogram_percentile(histogram, lower_bound, upper_bound, q):
+    """Percentile q (0-100) per cell from the relative-position histogram."""
+    cumulative = np.cumsum(histogram, axis=1)
+    target = cumulative[:, -1] * q / 100.0
+    bins = np.argmax(cumulative >= target[:, None], axis=1)
+
+    rows = np.arange(len(histogram))
+    below = np.where(bins > 0, cumulative[rows, np.maximum(bins - 1, 0)], 0)
+    in_bin = np.maximum(histogram[rows, bins], 1)
+    fraction = np.clip((target - below) / in_bin, 0.0, 1.0)
+
+    return lower_bound + (upper_bound - lower_bound) * (bins + fraction) / ENSEMBLE_HISTOGRAM_BINS
+
+def estimate_income_ensemble(n_realisations=100, n_workers=None, seed=0, percentiles=(5, 50, 95)):
+    """
+    Monte Carlo ensemble of estimate_income.
+
+    estimate_income places each cell at the top of its price decile when choosing a
+    bracket. Each realisation instead draws the cell's position uniformly within its
+    decile, so the bracket itself varies, and then draws the income within that bracket.
+    Every realisation uses its own SeedSequence child stream, so results are reproducible
+    for a given seed. Realisations are spread across a process pool and reduced on the
+    fly into per-cell mean, standard deviation, percentiles and income bracket frequencies.
+
+    Parameters:
+        n_realisations (int): Number of realisations (at least 1).
+        n_workers (int): Number of worker processes (default: all cores).
+        seed (int): Root seed for the SeedSequence.
+        percentiles (tuple): Percentiles (0-100) to report per cell.
+
+    Returns:
+        pd.DataFrame: Ensemble statistics per grid cell.
+    """
+    if n_realisations < 1:
+        raise ValueError(f"n_realisations must be at least 1, got {n_realisations}.")
+    output_path = "./processed/estimated_income_ensemble.parquet"
+
+    interpolated_combined, cumulative_income = load_income_inputs()
+    cells, cumulative_probs = compute_income_bounds(interpolated_combined, cumulative_income,
+                                                    return_probabilities=True)
+    income_brackets = cumulative_income.brackets
+    deciles = cells['price_decile'].to_numpy()
+
+    # Income envelope of each cell: from the lowest bracket its decile can reach to the highest
+    last_bracket = len(income_brackets) - 1
+    lowest = np.minimum(np.sum(cumulative_probs < (deciles / 10.0)[:, None], axis=1), last_bracket)
+    highest = np.minimum(np.sum(cumulative_probs < ((deciles + 1) / 10.0)[:, None], axis=1), last_bracket)
+    lowest_lower, lowest_upper = bracket_bounds(lowest, deciles, income_brackets)
+    highest_lower, highest_upper = bracket_bounds(highest, deciles, income_brackets)
+    envelope_lower = np.minimum(lowest_lower, highest_lower)
+    envelope_upper = np.maximum(lowest_upper, highest_upper)
+
+    # Independent child streams, split into one batch per worker
+    n_workers = min(n_workers or os.cpu_count(), n_realisations)
+    seed_sequences = np.random.SeedSequence(seed).spawn(n_realisations)
+    batches = [seed_sequences[i::n_workers] for i in range(n_workers)]
+
+    total = total_squares = histogram = bracket_counts = None
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_ensemble_worker,
+                             initargs=(deciles, cumulative_probs, income_brackets,
+                                       envelope_lower, envelope_upper)) as executor:
+        # Merge partial reductions in batch order so the result does not depend on timing
+        for partial in executor.map(_run_ensemble_realisations, batches):
+            if total is None:
+                total, total_squares, histogram, bracket_counts = partial
+            else:
+                total += partial[0]
+                total_squares += partial[1]
+                histogram += partial[2]
+                bracket_counts += partial[3]
+
+    center = (envelope_lower + envelope_upper) / 2
+    mean_centred = total / n_realisations
+    variance = np.maximum(total_squares / n_realisations - mean_centred ** 2, 0.0)
+
+    result_df = cells.drop(columns=['bracket_index', 'lower_bound', 'upper_bound'])
+    result_df['mean_income'] = center + mean_centred
+    result_df['std_income'] = np.sqrt(variance)
+    for q in percentiles:
+        result_df[f'p{q:g}_income'] = _histogram_percentile(histogram, envelope_lower, envelope_upper, q)
+    frequencies = pd.DataFrame(
+        bracket_counts / n_realisations, columns=[f'freq_{bracket}' for bracket in income_brackets],
+        index=result_df.index
+    )
+    result_df = pd.concat([result_df, frequencies], axis=1)
+
+    write_dataset(result_df, output_path)
+    print(f"Income ensemble of {n_realisations} realisations saved to '{output_path}'.")
+
+    return result_df
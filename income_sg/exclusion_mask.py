@@ -0,0 +1,210 @@
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from .constants import EXCLUSION_MASK_PATH, EXCLUSION_RULES_PATH
+from .grid_store import RasterGrid
+from .storage import _csv_path, read_dataset
+
+POPULATION_DENSITY_PATH = "./processed/population_density.parquet"
+
+# Bump when rule evaluation changes, so cached masks are recompiled
+EXCLUSION_RULES_VERSION = 2
+
+# Subzones that are likely to be non-residential
+NON_RESIDENTIAL_SUBZONES = [
+    'AIRPORT ROAD', 'BENOI SECTOR', 'CENTRAL WATER CATCHMENT',
+    'CHANGI AIRPORT', 'CITY TERMINALS', 'CLEMENTI FOREST',
+    'CONEY ISLAND', 'DEFU INDUSTRIAL PARK', 'JURONG ISLAND',
+    'JURONG ISLAND AND BUKOM', 'JURONG PORT', 'MANDAI WEST',
+    'MARINA CENTRE', 'MARINA EAST', 'MARINA SOUTH',
+    'NORTH-EASTERN ISLANDS', 'PASIR RIS WAFER FAB PARK',
+    'PIONEER SECTOR', 'PORT', 'RESERVOIR VIEW',
+    'SELETAR AEROSPACE PARK', 'SEMBAWANG WHARVES',
+    'SOUTHERN ISLANDS', 'THE WHARVES', 'WESTERN WATER CATCHMENT'
+]
+
+# Rules used where ./raw/exclusion_rules.json does not override them
+DEFAULT_EXCLUSION_RULES = {
+    'subzones': NON_RESIDENTIAL_SUBZONES,
+    'min_population_density': 1.0,
+    # e.g. {"path": "./raw/land_use.geojson", "property": "LU_DESC", "exclude": ["PORT / AIRPORT"]}
+    'land_use': None,
+}
+
+class ExclusionRules:
+    """
+    Rules for grid cells that are unlikely to be residential.
+
+    A cell is excluded if its subzone is in `subzones` (exact match), its population
+    density is below `min_population_density`, or its centre lies in a land-use polygon
+    whose `property` value is in `exclude`.
+
+    Parameters:
+        subzones (list): Excluded subzone names.
+        min_population_density (float): Cells below this density are excluded (None to keep all).
+        land_use (dict): Optional 'path' of a GeoJSON file, 'property' naming the land-use
+            attribute and the 'exclude'd values.
+    """
+
+    def __init__(self, subzones=(), min_population_density=None, land_use=None):
+        self.subzones = sorted({str(name) for name in subzones})
+        self.min_population_density = min_population_density
+        self.land_use = land_use
+        self._land_use_tree = None
+
+    @classmethod
+    def load(cls, path=EXCLUSION_RULES_PATH):
+        """Rules from a JSON file, with DEFAULT_EXCLUSION_RULES for any key it leaves out."""
+        rules = dict(DEFAULT_EXCLUSION_RULES)
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as file:
+                rules.update(json.load(file))
+        return cls(**rules)
+
+    def to_dict(self):
+        return {'subzones': self.subzones, 'min_population_density': self.min_population_density,
+                'land_use': self.land_use}
+
+    @property
+    def source_paths(self):
+        """Files the rules read."""
+        return [self.land_use['path']] if self.land_use else []
+
+    def _excluded_land_use(self, lats, lons):
+        import shapely
+
+        if self._land_use_tree is None:
+            import geopandas as gpd
+
+            land_use = gpd.read_file(self.land_use['path'])
+            excluded = land_use[land_use[self.land_use['property']].isin(self.land_use['exclude'])]
+            self._land_use_tree = shapely.STRtree(np.asarray(excluded.geometry))
+        point_indices, _ = self._land_use_tree.query(shapely.points(lons, lats), predicate='intersects')
+        excluded = np.zeros(len(lats), dtype=bool)
+        excluded[point_indices] = True
+        return excluded
+
+    def evaluate(self, lats, lons, pop_density, subzone):
+        """
+        Whether each point is excluded, from its density and subzone.
+
+        Returns:
+            np.ndarray: Boolean array, True for excluded points.
+        """
+        pop_density = np.asarray(pop_density, dtype=float)
+        excluded = np.zeros(len(pop_density), dtype=bool)
+        if self.min_population_density is not None:
+            excluded |= pop_density < self.min_population_density
+        if self.subzones:
+            excluded |= pd.Series(np.asarray(subzone, dtype=object)).isin(self.subzones).to_numpy()
+        if self.land_use:
+            excluded |= self._excluded_land_use(np.asarray(lats, dtype=float), np.asarray(lons, dtype=float))
+        return excluded
+
+class ExclusionMask:
+    """
+    Exclusion rules compiled into a boolean layer of the population grid.
+
+    Points at a cell centre of the grid take the cell's cached value; other points (or
+    every point, if there is no grid) are evaluated against the rules directly.
+
+    Parameters:
+        raster (RasterGrid): Grid with an 'excluded' layer (None for rules only).
+        rules (ExclusionRules): The rules the layer was compiled from.
+    """
+
+    def __init__(self, raster, rules):
+        self.raster = raster
+        self.rules = rules
+
+    def excluded(self, lats, lons, pop_density=None, subzone=None):
+        """
+        Whether each point is excluded.
+
+        Parameters:
+            lats, lons (array-like): Point coordinates.
+            pop_density, subzone (array-like): Values of each point, used for points off the
+                grid. Without them, points off the grid are kept.
+
+        Returns:
+            np.ndarray: Boolean array, True for excluded points.
+        """
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+        excluded = np.zeros(len(lats), dtype=bool)
+        off_grid = np.ones(len(lats), dtype=bool)
+        if self.raster is not None:
+            rows, cols, on_grid = self.raster.cell_index(lats, lons)
+            excluded[on_grid] = self.raster.layers['excluded'][rows[on_grid], cols[on_grid]] == 1
+            off_grid = ~on_grid
+
+        if off_grid.any() and pop_density is not None and subzone is not None:
+            excluded[off_grid] = self.rules.evaluate(
+                lats[off_grid], lons[off_grid],
+                np.asarray(pop_density)[off_grid], np.asarray(subzone, dtype=object)[off_grid],
+            )
+        return excluded
+
+def compile_exclusion_mask(rules, cells):
+    """
+    Evaluate the rules at every cell of the labelled population grid.
+
+    Parameters:
+        rules (ExclusionRules): Rules to compile.
+        cells (pd.DataFrame): Grid cells with 'latitude', 'longitude', 'popDensity' and
+            'subzone' columns, as in ./processed/population_density.parquet.
+
+    Returns:
+        RasterGrid: Grid with an 'excluded' layer (1 for excluded cells).
+    """
+    raster = RasterGrid.from_frame(cells)
+    rows, cols, _ = raster.cell_index(cells['latitude'], cells['longitude'])
+    layer = np.zeros(raster.shape, dtype=np.uint8)
+    layer[rows, cols] = rules.evaluate(cells['latitude'], cells['longitude'], cells['popDensity'], cells['subzone'])
+    raster.layers['excluded'] = layer
+    return raster
+
+@lru_cache(maxsize=None)
+def load_exclusion_mask(rules_path=EXCLUSION_RULES_PATH, population_density_path=POPULATION_DENSITY_PATH,
+                        mask_path=EXCLUSION_MASK_PATH):
+    """
+    Load the exclusion mask once per process, compiling it on first use and again
+    whenever the rules, the population grid or the land-use file change.
+
+    Without the population grid, the mask evaluates the rules per point.
+
+    Returns:
+        ExclusionMask: The mask.
+    """
+    rules = ExclusionRules.load(rules_path)
+    sources = [path for path in (population_density_path, _csv_path(population_density_path)) if os.path.exists(path)]
+    if not sources:
+        return ExclusionMask(None, rules)
+
+    sources = sources[:1] + rules.source_paths
+    signature = {
+        'version': EXCLUSION_RULES_VERSION,
+        'rules': rules.to_dict(),
+        'sources': [[os.path.getsize(path), os.path.getmtime(path)] for path in sources],
+    }
+    raster = RasterGrid.load(mask_path)
+    if raster is None or raster.metadata.get('signature') != json.loads(json.dumps(signature)):
+        cells = read_dataset(population_density_path, columns=['latitude', 'longitude', 'popDensity', 'subzone'])
+        raster = compile_exclusion_mask(rules, cells)
+        raster.metadata['signature'] = signature
+        raster.save(mask_path)
+        print(f"Exclusion mask compiled: {int(raster.layers['excluded'].sum())} of {int(raster.mask.sum())} "
+              f"cells excluded. Saved to '{mask_path}'.")
+        raster = RasterGrid.load(mask_path)
+    return ExclusionMask(raster, rules)
+
+def build_exclusion_mask(population_density_path=POPULATION_DENSITY_PATH):
+    """Compile (or validate) the cached exclusion mask."""
+    if not any(os.path.exists(path) for path in (population_density_path, _csv_path(population_density_path))):
+        raise FileNotFoundError(f"Cannot compile the exclusion mask: population grid '{population_density_path}' "
+                                f"(or its CSV) does not exist.")
+    load_exclusion_mask(population_density_path=population_density_path)
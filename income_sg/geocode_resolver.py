@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+
+def _to_float(values):
+    """Float array from OneMap's numeric strings (NaN for missing or malformed values)."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    try:
+        # Arrow parses the strings in one pass, much faster than float() per value
+        return pc.cast(pa.array(values, type=pa.string()), pa.float64()).to_numpy(zero_copy_only=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype=float)
+
+def candidate_field(candidates, field):
+    """One field of every candidate's OneMap result, as an object array (None if missing)."""
+    return np.array([result.get(field) for result in candidates['result'].to_numpy()], dtype=object)
+
+class CandidateScore:
+    """
+    Linear score of OneMap search candidates; the lowest-scoring candidate of each
+    search wins, with ties going to the earlier result.
+
+    Parameters:
+        distance (float): Weight per metre between the candidate's X/Y and the search's
+            SVY21 reference point. Candidates without a distance (no reference point or no
+            candidate X/Y) cannot be chosen when this is set.
+        rank (float): Weight per position between the candidate's rank in OneMap's results
+            and preferred_rank.
+        preferred_rank (int): Rank with no rank penalty.
+        block_match (float): Added when the candidate's BLK_NO equals the first word of the
+            search value (negative to prefer the searched block).
+        keyword_penalties (dict): BUILDING substring -> amount added when it matches.
+    """
+
+    def __init__(self, distance=0.0, rank=0.0, preferred_rank=0, block_match=0.0, keyword_penalties=None):
+        self.distance = distance
+        self.rank = rank
+        self.preferred_rank = preferred_rank
+        self.block_match = block_match
+        self.keyword_penalties = dict(keyword_penalties or {})
+
+    def __call__(self, candidates, search_vals, reference_xy=None):
+        """
+        Score every candidate.
+
+        Parameters:
+            candidates (pd.DataFrame): Candidates, as from collect_candidates.
+            search_vals (np.ndarray): Search value of each search.
+            reference_xy (np.ndarray): (searches, 2) SVY21 reference points (NaN for none).
+
+        Returns:
+            np.ndarray: Score per candidate (NaN for candidates that cannot be chosen).
+        """
+        query = candidates['query'].to_numpy()
+        score = self.rank * np.abs(candidates['rank'].to_numpy() - self.preferred_rank).astype(float)
+
+        if self.distance:
+            if reference_xy is None:
+                reference_xy = np.full((len(search_vals), 2), np.nan)
+            reference_xy = np.asarray(reference_xy, dtype=float)
+            distance = np.hypot(
+                _to_float(candidate_field(candidates, 'X')) - reference_xy[query, 0],
+                _to_float(candidate_field(candidates, 'Y')) - reference_xy[query, 1],
+            )
+            score = score + self.distance * distance
+
+        if self.block_match:
+            blocks = pd.Series(search_vals[query], dtype=object).astype(str).str.split(n=1).str[0].str.upper()
+            matches = pd.Series(candidate_field(candidates, 'BLK_NO')).astype(str).str.upper() == blocks
+            score = score + self.block_match * matches.to_numpy()
+
+        if self.keyword_penalties:
+            buildings = pd.Series(candidate_field(candidates, 'BUILDING')).fillna('').astype(str).str.upper()
+            for keyword, penalty in self.keyword_penalties.items():
+                score = score + penalty * buildings.str.contains(keyword.upper(), regex=False).to_numpy()
+        return score
+
+# Closest result to the project's own coordinates (private projects)
+NEAREST_CANDIDATE = CandidateScore(distance=1.0)
+
+# The earlier HDB rule: the second result when there are several (tends to be residential)
+SECOND_CANDIDATE = CandidateScore(rank=1.0, preferred_rank=1)
+
+# HDB addresses: the searched block, avoiding car parks and other non-residential buildings,
+# then the second result as before
+HDB_CANDIDATE = CandidateScore(
+    rank=1.0, preferred_rank=1, block_match=-100.0,
+    keyword_penalties={'CAR PARK': 50.0, 'CARPARK': 50.0, 'MULTI-STOREY': 50.0, 'KINDERGARTEN': 20.0,
+                       'CHILDCARE': 20.0, 'PRESCHOOL': 20.0, 'SCHOOL': 20.0, 'CLINIC': 20.0, 'MARKET': 20.0},
+)
+
+def collect_candidates(responses, search_vals):
+    """
+    Flatten the OneMap results of many searches into one table.
+
+    Each distinct search value is looked up once; repeated searches share its results.
+
+    Parameters:
+        responses (dict): Search value -> OneMap response (or None).
+        search_vals (list): Search values, one per search.
+
+    Returns:
+        tuple: (candidates, found). candidates has one row per result with the search
+        index in 'query', the result's position in 'rank' and the OneMap result dict in
+        'result' (fields are read with candidate_field); found is the number of results
+        OneMap reported for each search (0 for failed requests).
+    """
+    codes, unique_vals = pd.factorize(pd.Series(search_vals, dtype=object))
+    responses = [responses.get(search_val) or {} for search_val in unique_vals]
+    unique_found = np.array([response.get('found', 0) for response in responses], dtype=np.int64)
+    lists = [response.get('results', []) if n else [] for response, n in zip(responses, unique_found)]
+    unique_lengths = np.array([len(results) for results in lists], dtype=np.int64)
+    results = np.empty(unique_lengths.sum(), dtype=object)
+    results[:] = [result for results in lists for result in results]
+
+    # Repeat each distinct value's results for every search of it
+    lengths = unique_lengths[codes]
+    rank = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    starts = np.cumsum(unique_lengths) - unique_lengths
+    candidates = pd.DataFrame({
+        'query': np.repeat(np.arange(len(codes)), lengths),
+        'rank': rank,
+        'result': pd.Series(results[np.repeat(starts[codes], lengths) + rank], dtype=object),
+    })
+    return candidates, unique_found[codes]
+
+def resolve_candidates(responses, search_vals, score=NEAREST_CANDIDATE, reference_xy=None):
+    """
+    Choose the best OneMap result of every search in one vectorized pass.
+
+    Searches with exactly one result take it; only the candidates of searches with
+    several results are scored.
+
+    Parameters:
+        responses (dict): Search value -> OneMap response (or None).
+        search_vals (array-like): Search values, one per search (duplicates allowed).
+        score (CandidateScore): Scoring rule.
+        reference_xy (array-like): (searches, 2) SVY21 reference point of each search, for
+            distance scoring (NaN where unknown).
+
+    Returns:
+        pd.DataFrame: One row per search with 'found', the chosen 'rank' (-1 for none) and
+        its 'address', 'latitude' and 'longitude' (missing for none).
+    """
+    search_vals = np.asarray(list(search_vals), dtype=object)
+    candidates, found = collect_candidates(responses, search_vals)
+    query = candidates['query'].to_numpy()
+
+    scores = np.zeros(len(candidates))
+    multiple = found[query] > 1
+    if multiple.any():
+        scores[multiple] = score(candidates[multiple], search_vals, reference_xy)
+    eligible = np.flatnonzero(~np.isnan(scores))
+
+    # Order by search, score and rank; the first candidate of each search wins
+    order = eligible[np.lexsort((candidates['rank'].to_numpy()[eligible], scores[eligible], query[eligible]))]
+    best = order[np.r_[True, query[order][1:] != query[order][:-1]]] if len(order) else order
+    chosen = candidates.iloc[best]
+
+    rank = np.full(len(search_vals), -1, dtype=np.int64)
+    address = np.full(len(search_vals), None, dtype=object)
+    latitude = np.full(len(search_vals), np.nan)
+    longitude = np.full(len(search_vals), np.nan)
+    searches = query[best]
+    rank[searches] = chosen['rank'].to_numpy()
+    address[searches] = candidate_field(chosen, 'ADDRESS')
+    latitude[searches] = _to_float(candidate_field(chosen, 'LATITUDE'))
+    longitude[searches] = _to_float(candidate_field(chosen, 'LONGITUDE'))
+    return pd.DataFrame({'found': found, 'rank': rank, 'address': address,
+                         'latitude': latitude, 'longitude': longitude})
@@ -0,0 +1,193 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .constants import GEOCODE_CACHE_PATH, ONEMAP_SEARCH_BASE_URL
+
+# Status codes worth retrying (rate limited or transient server errors)
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Fetched responses are written to the cache in chunks of this size as they complete
+CACHE_WRITE_CHUNK_SIZE = 100
+
+# Process-wide network call and cache hit totals across all geocoders (read by instrumentation.py)
+GEOCODE_COUNTERS = Counter()
+
+class GeocodeCache:
+    """
+    Persistent SQLite cache of OneMap search responses keyed by search value.
+
+    Both hits and "not found" responses are stored, so a rebuild only goes to the
+    network for addresses that have never been resolved. Failed requests are not cached.
+    """
+
+    def __init__(self, path=GEOCODE_CACHE_PATH):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS geocode ("
+            "search_val TEXT PRIMARY KEY, response TEXT NOT NULL, fetched_at REAL NOT NULL)"
+        )
+        self.connection.commit()
+
+    def get_many(self, search_vals):
+        """Return a dict of cached responses for the given search values."""
+        cached = {}
+        search_vals = list(search_vals)
+        # Stay below SQLite's bound parameter limit
+        for start in range(0, len(search_vals), 500):
+            chunk = search_vals[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.connection.execute(
+                f"SELECT search_val, response FROM geocode WHERE search_val IN ({placeholders})", chunk
+            )
+            cached.update((search_val, json.loads(response)) for search_val, response in rows)
+        return cached
+
+    def put_many(self, responses):
+        """Store a dict of search value -> response."""
+        now = time.time()
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO geocode (search_val, response, fetched_at) VALUES (?, ?, ?)",
+            [(search_val, json.dumps(response), now) for search_val, response in responses.items()]
+        )
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+class RateLimiter:
+    """Thread-safe limiter that spaces out calls to at most `rate` per second."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.lock = threading.Lock()
+        self.next_time = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            delay = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+class OneMapGeocoder:
+    """
+    Cached, concurrent client for the OneMap search API.
+
+    Parameters:
+        cache_path (str): Path to the SQLite cache. Default is GEOCODE_CACHE_PATH.
+        base_url (str): Search endpoint. Point this at a local stub server for testing.
+        max_workers (int): Maximum number of concurrent requests.
+        requests_per_second (float): Rate limit shared by all workers (None to disable).
+        max_retries (int): Retries per request on connection errors and retryable status codes.
+        backoff (float): Base delay in seconds for exponential backoff between retries.
+        timeout (float): Per-request timeout in seconds.
+    """
+
+    def __init__(self, cache_path=GEOCODE_CACHE_PATH, base_url=ONEMAP_SEARCH_BASE_URL,
+                 max_workers=8, requests_per_second=4, max_retries=3, backoff=0.5, timeout=30):
+        self.cache = GeocodeCache(cache_path)
+        self.base_url = base_url
+        self.max_workers = max_workers
+        self.rate_limiter = RateLimiter(requests_per_second)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+        # Pooled HTTP session shared by all workers
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # Counters for the current geocoder
+        self.network_calls = 0
+        self.cache_hits = 0
+
+    def _fetch(self, search_val):
+        """Fetch a single search value from the API, retrying with backoff. Returns None on failure."""
+        params = {
+            "searchVal": search_val,
+            "returnGeom": "Y",
+            "getAddrDetails": "Y",
+        }
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.wait()
+            try:
+                response = self.session.get(self.base_url, params=params, timeout=self.timeout)
+            except requests.RequestException as e:
+                error = str(e)
+            else:
+                if response.status_code == 200:
+                    try:
+                        return response.json()
+                    except ValueError:
+                        # e.g. a proxy error page served with a 200
+                        error = f"Invalid JSON response: {response.text[:200]}"
+                else:
+                    error = f"Status Code: {response.status_code}, Response: {response.text}"
+                    if response.status_code not in RETRY_STATUS_CODES:
+                        break
+            if attempt < self.max_retries:
+                time.sleep(self.backoff * 2 ** attempt)
+
+        print(f"Failed to fetch data for address: {search_val}")
+        print(error)
+        return None
+
+    def search_batch(self, search_vals):
+        """
+        Resolve many search values, only calling the API for values missing from the cache.
+
+        Parameters:
+            search_vals (iterable): Search strings (duplicates are resolved once).
+
+        Returns:
+            dict: Search value -> OneMap response JSON, or None if the request failed.
+        """
+        unique_vals = list(dict.fromkeys(search_vals))
+        results = self.cache.get_many(unique_vals)
+        self.cache_hits += len(results)
+        GEOCODE_COUNTERS['cache_hits'] += len(results)
+
+        missing = [search_val for search_val in unique_vals if search_val not in results]
+        if missing:
+            print(f"Geocoding {len(missing)} new addresses ({len(results)} cached).")
+            self.network_calls += len(missing)
+            GEOCODE_COUNTERS['network_calls'] += len(missing)
+            # Successful responses are cached as they complete, so an interrupted batch keeps
+            # its paid calls; failures are not cached so they are retried next run
+            unsaved = {}
+            executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            try:
+                futures = {executor.submit(self._fetch, search_val): search_val for search_val in missing}
+                for future in as_completed(futures):
+                    response = future.result()
+                    results[futures[future]] = response
+                    if response is not None:
+                        unsaved[futures[future]] = response
+                    if len(unsaved) >= CACHE_WRITE_CHUNK_SIZE:
+                        self.cache.put_many(unsaved)
+                        unsaved = {}
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
+                if unsaved:
+                    self.cache.put_many(unsaved)
+
+        return results
+
+    def search(self, search_val):
+        """Resolve a single search value. Returns the OneMap response JSON or None."""
+        return self.search_batch([search_val])[search_val]
+
+    def close(self):
+        self.session.close()
+        self.cache.close()
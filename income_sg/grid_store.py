@@ -0,0 +1,262 @@
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .constants import INCOME_GRID_PATH
+from .storage import read_dataset
+
+POPULATION_DENSITY_CSV = "./raw/population_density.csv"
+POPULATION_GRID_PATH = "./processed/population_grid"
+# Serialises conversion of the population CSV between stages running in threads
+_population_grid_lock = threading.Lock()
+
+# Bump when the on-disk layout changes
+GRID_FORMAT_VERSION = 1
+
+# A point is on the grid if it lies within this fraction of a cell of a cell centre
+ON_GRID_TOLERANCE = 1e-3
+
+def _infer_axis(values):
+    """
+    Cell centres along one axis of a regular grid: the origin, cell size and exact
+    coordinate of every cell (cells without data are filled in from origin and size).
+    """
+    unique = np.unique(values)
+    if len(unique) == 1:
+        raise ValueError("Cannot infer a grid from a single row or column of points.")
+    cell_size = np.diff(unique).min()
+    n_cells = int(round((unique[-1] - unique[0]) / cell_size)) + 1
+    axis = unique[0] + np.arange(n_cells) * cell_size
+
+    # Keep the exact source coordinates for the cells that have data
+    positions = np.rint((unique - unique[0]) / cell_size).astype(np.int64)
+    if np.abs(axis[positions] - unique).max() > ON_GRID_TOLERANCE * cell_size:
+        raise ValueError("Points are not on a regular grid.")
+    axis[positions] = unique
+    return axis, cell_size
+
+def _code_dtype(n_categories):
+    # Code 0 marks cells without a label
+    return np.uint8 if n_categories < np.iinfo(np.uint8).max else np.uint16
+
+class RasterGrid:
+    """
+    Regular lat/lon grid stored as dense arrays.
+
+    The header holds the origin (centre of the south-west cell), cell size and shape;
+    exact cell-centre coordinates are kept per row and column. Value layers are float32
+    arrays (NaN where a cell has no data) and label layers are uint8/uint16 codes into a
+    category list, with 0 for unlabelled cells. Saved grids are a directory of .npy files
+    that load memory-mapped, so stages share them without copying or parsing. Used for
+    the population grid, the label raster, the exclusion mask and the income grid; the
+    interpolated prices passed to estimation stay in Parquet (float64, row order).
+
+    Parameters:
+        latitudes (array): Latitude of each grid row, ascending.
+        longitudes (array): Longitude of each grid column, ascending.
+        mask (array): Boolean (rows, cols) array of cells present in the source data.
+        layers (dict): Layer name -> (rows, cols) float32 or code array.
+        categories (dict): Label layer name -> list of category names for codes 1..n.
+        metadata (dict): JSON-serializable values saved with the header.
+    """
+
+    def __init__(self, latitudes, longitudes, mask, layers=None, categories=None, metadata=None):
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+        self.mask = mask
+        self.layers = dict(layers or {})
+        self.categories = dict(categories or {})
+        self.metadata = dict(metadata or {})
+
+    @property
+    def shape(self):
+        return self.mask.shape
+
+    @property
+    def origin(self):
+        return float(self.latitudes[0]), float(self.longitudes[0])
+
+    @property
+    def cell_size(self):
+        return (
+            float((self.latitudes[-1] - self.latitudes[0]) / (len(self.latitudes) - 1)),
+            float((self.longitudes[-1] - self.longitudes[0]) / (len(self.longitudes) - 1)),
+        )
+
+    @classmethod
+    def from_frame(cls, df, value_columns=(), label_columns=()):
+        """
+        Build a grid from one row per cell with latitude and longitude columns.
+
+        Parameters:
+            df (pd.DataFrame): Grid cells.
+            value_columns (iterable): Numeric columns stored as float32 layers.
+            label_columns (iterable): String columns stored as code layers.
+
+        Returns:
+            RasterGrid: The grid.
+        """
+        latitudes, _ = _infer_axis(df['latitude'].to_numpy(dtype=float))
+        longitudes, _ = _infer_axis(df['longitude'].to_numpy(dtype=float))
+        grid = cls(latitudes, longitudes, np.zeros((len(latitudes), len(longitudes)), dtype=bool))
+
+        rows, cols, on_grid = grid.cell_index(df['latitude'], df['longitude'])
+        if not on_grid.all():
+            raise ValueError(f"{(~on_grid).sum()} points are not on the grid.")
+        if len(np.unique(rows * len(longitudes) + cols)) != len(df):
+            raise ValueError("More than one row per grid cell.")
+        grid.mask[rows, cols] = True
+
+        for column in value_columns:
+            layer = np.full(grid.shape, np.nan, dtype=np.float32)
+            layer[rows, cols] = df[column].to_numpy(dtype=np.float32)
+            grid.layers[column] = layer
+
+        for column in label_columns:
+            codes, names = pd.factorize(df[column], sort=True)
+            layer = np.zeros(grid.shape, dtype=_code_dtype(len(names)))
+            layer[rows, cols] = codes + 1  # factorize gives -1 for missing labels
+            grid.layers[column] = layer
+            grid.categories[column] = [str(name) for name in names]
+        return grid
+
+    def cell_index(self, lats, lons):
+        """
+        Grid row and column of each point.
+
+        Returns:
+            tuple: (rows, cols, on_grid) arrays; on_grid is False for points outside the
+            grid or not at a cell centre, whose rows/cols are clipped to the grid.
+        """
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+        lat_size, lon_size = self.cell_size
+        rows = np.rint((lats - self.latitudes[0]) / lat_size).astype(np.int64)
+        cols = np.rint((lons - self.longitudes[0]) / lon_size).astype(np.int64)
+
+        inside = (rows >= 0) & (rows < self.shape[0]) & (cols >= 0) & (cols < self.shape[1])
+        rows = np.clip(rows, 0, self.shape[0] - 1)
+        cols = np.clip(cols, 0, self.shape[1] - 1)
+        on_grid = (
+            inside
+            & (np.abs(self.latitudes[rows] - lats) <= ON_GRID_TOLERANCE * lat_size)
+            & (np.abs(self.longitudes[cols] - lons) <= ON_GRID_TOLERANCE * lon_size)
+        )
+        return rows, cols, on_grid
+
+    def labels(self, name, rows, cols):
+        """Category names of a label layer at the given cells (None where unlabelled)."""
+        names = np.array([None] + self.categories[name], dtype=object)
+        return names[self.layers[name][rows, cols]]
+
+    def to_frame(self, columns=None):
+        """
+        One row per present cell, in row-major order, with latitude, longitude and the
+        requested layers (all by default). Label layers become pandas categoricals.
+        """
+        rows, cols = np.nonzero(self.mask)
+        df = pd.DataFrame({'latitude': self.latitudes[rows], 'longitude': self.longitudes[cols]})
+        for name in (self.layers if columns is None else columns):
+            values = self.layers[name][rows, cols]
+            if name in self.categories:
+                values = pd.Categorical.from_codes(values.astype(np.int64) - 1, categories=self.categories[name])
+            df[name] = values
+        return df
+
+    def save(self, path):
+        """Write the header and one .npy file per array to a directory."""
+        os.makedirs(path, exist_ok=True)
+        # Each file is written aside and renamed into place, so readers (and memory maps
+        # of an earlier save) never see a partly written array
+        temporary_suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+
+        def write_array(name, array):
+            temporary_path = os.path.join(path, f"{name}{temporary_suffix}")
+            with open(temporary_path, 'wb') as file:
+                np.save(file, array)
+            os.replace(temporary_path, os.path.join(path, f"{name}.npy"))
+
+        write_array('latitudes', self.latitudes)
+        write_array('longitudes', self.longitudes)
+        write_array('mask', self.mask)
+        for name, layer in self.layers.items():
+            write_array(f"layer_{name}", np.ascontiguousarray(layer))
+
+        header = {
+            'version': GRID_FORMAT_VERSION,
+            'origin': self.origin,
+            'cell_size': self.cell_size,
+            'shape': self.shape,
+            'layers': list(self.layers),
+            'categories': self.categories,
+            'metadata': self.metadata,
+        }
+        # Written last, so an interrupted save is not mistaken for a complete grid
+        temporary_path = os.path.join(path, f"header{temporary_suffix}")
+        with open(temporary_path, 'w', encoding='utf-8') as file:
+            json.dump(header, file, indent=2)
+        os.replace(temporary_path, os.path.join(path, 'header.json'))
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """
+        Load a saved grid with its arrays memory-mapped (read-only by default).
+
+        Returns:
+            RasterGrid: The grid, or None if there is no complete grid at path.
+        """
+        header_path = os.path.join(path, 'header.json')
+        if not os.path.exists(header_path):
+            return None
+        with open(header_path, encoding='utf-8') as file:
+            header = json.load(file)
+        if header.get('version') != GRID_FORMAT_VERSION:
+            return None
+
+        def array(name):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+
+        return cls(
+            array('latitudes'),
+            array('longitudes'),
+            array('mask'),
+            {name: array(f"layer_{name}") for name in header['layers']},
+            header['categories'],
+            header.get('metadata'),
+        )
+
+def load_population_grid(csv_path=POPULATION_DENSITY_CSV, grid_path=POPULATION_GRID_PATH):
+    """
+    Load the WorldPop population density grid, converting the CSV to the memory-mapped
+    format on first use (and again whenever the CSV is newer than the saved grid).
+
+    Returns:
+        RasterGrid: Grid with a popDensity layer.
+    """
+    header_path = os.path.join(grid_path, 'header.json')
+    with _population_grid_lock:
+        if os.path.exists(header_path) and os.path.getmtime(header_path) >= os.path.getmtime(csv_path):
+            grid = RasterGrid.load(grid_path)
+            if grid is not None:
+                return grid
+
+        grid = RasterGrid.from_frame(pd.read_csv(csv_path), value_columns=['popDensity'])
+        grid.save(grid_path)
+        return RasterGrid.load(grid_path)
+
+def build_income_grid(estimated_income_path="./processed/estimated_income.parquet", grid_path=INCOME_GRID_PATH):
+    """Convert the estimated income dataset to the memory-mapped grid format."""
+    estimated_income = read_dataset(estimated_income_path, columns=[
+        'latitude', 'longitude', 'popDensity', 'property_price', 'average_income',
+        'planning_area', 'subzone', 'income_bracket'
+    ])
+    grid = RasterGrid.from_frame(
+        estimated_income,
+        value_columns=['popDensity', 'property_price', 'average_income'],
+        label_columns=['planning_area', 'subzone', 'income_bracket'],
+    )
+    grid.save(grid_path)
+    print(f"Income grid {grid.shape[0]}x{grid.shape[1]} saved to '{grid_path}'.")
@@ -0,0 +1,212 @@
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+HDB_AGGREGATE_STATE_PATH = "./processed/hdb_price_aggregate.npz"
+
+# Log-spaced price per sqm bins for the median sketch (~1% relative bin width)
+SKETCH_MIN_PRICE = 500.0
+SKETCH_MAX_PRICE = 100000.0
+SKETCH_BIN_RATIO = 1.01
+SKETCH_EDGES = np.exp(np.arange(
+    np.log(SKETCH_MIN_PRICE), np.log(SKETCH_MAX_PRICE) + np.log(SKETCH_BIN_RATIO), np.log(SKETCH_BIN_RATIO)
+))
+
+# Number of bytes around the resume offset used to detect a rewritten source file
+CHECKSUM_BYTES = 4096
+
+def _file_checksum(path, offset):
+    """Hash of the start of the file and of the bytes just before offset."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        digest.update(file.read(min(CHECKSUM_BYTES, offset)))
+        file.seek(max(offset - CHECKSUM_BYTES, 0))
+        digest.update(file.read(min(CHECKSUM_BYTES, offset)))
+    return digest.hexdigest()
+
+def iter_resale_csv(path, usecols=None, chunksize=100_000, offset=0):
+    """
+    Stream an HDB resale CSV in chunks of rows.
+
+    Parameters:
+        path (str): CSV path.
+        usecols (list): Columns to read (default: all).
+        chunksize (int): Rows per chunk.
+        offset (int): Byte offset of the first row to read (0 for the whole file).
+
+    Yields:
+        pd.DataFrame: Non-empty chunks of transactions.
+    """
+    with open(path, 'rb') as file:
+        header = file.readline().decode('utf-8').strip().split(',')
+        if offset:
+            file.seek(offset)
+        for chunk in pd.read_csv(file, header=None, names=header, chunksize=chunksize, usecols=usecols):
+            if not chunk.empty:
+                yield chunk
+
+class HdbPriceAggregator:
+    """
+    Running per-address price per sqm statistics for HDB resale transactions.
+
+    Each address keeps an exact count and sum (for the mean) and a fixed-bin histogram
+    over log-spaced price per sqm bins as a mergeable median sketch. Memory depends on the
+    number of addresses, not the number of transactions, and new data can be added (or
+    two aggregators merged) without revisiting transactions already counted.
+    """
+
+    def __init__(self):
+        self.addresses = []
+        self.address_index = {}
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.sums = np.zeros(0, dtype=np.float64)
+        self.histograms = np.zeros((0, len(SKETCH_EDGES) - 1), dtype=np.uint32)
+
+        # Resume position within the source CSV
+        self.source_path = None
+        self.source_offset = 0
+        self.source_checksum = None
+
+    def _address_ids(self, addresses):
+        """Map addresses to row ids, growing the arrays for unseen addresses."""
+        codes, uniques = pd.factorize(addresses)
+        new = [address for address in uniques if address not in self.address_index]
+        if new:
+            for address in new:
+                self.address_index[address] = len(self.addresses)
+                self.addresses.append(address)
+            extra = len(new)
+            self.counts = np.concatenate([self.counts, np.zeros(extra, dtype=self.counts.dtype)])
+            self.sums = np.concatenate([self.sums, np.zeros(extra, dtype=self.sums.dtype)])
+            self.histograms = np.vstack([
+                self.histograms, np.zeros((extra, self.histograms.shape[1]), dtype=self.histograms.dtype)
+            ])
+        unique_ids = np.array([self.address_index[address] for address in uniques], dtype=np.int64)
+        return unique_ids[codes]
+
+    def add(self, addresses, prices_per_sqm):
+        """Add a batch of transactions."""
+        prices_per_sqm = np.asarray(prices_per_sqm, dtype=float)
+        valid = np.isfinite(prices_per_sqm)
+        ids = self._address_ids(np.asarray(addresses)[valid])
+        prices_per_sqm = prices_per_sqm[valid]
+
+        self.counts += np.bincount(ids, minlength=len(self.counts))
+        self.sums += np.bincount(ids, weights=prices_per_sqm, minlength=len(self.sums))
+
+        n_bins = self.histograms.shape[1]
+        bins = np.clip(np.searchsorted(SKETCH_EDGES, prices_per_sqm, side='right') - 1, 0, n_bins - 1)
+        np.add.at(self.histograms, (ids, bins), 1)
+
+    def merge(self, other):
+        """Merge another aggregator's statistics into this one."""
+        ids = self._address_ids(np.asarray(other.addresses, dtype=object))
+        np.add.at(self.counts, ids, other.counts)
+        np.add.at(self.sums, ids, other.sums)
+        np.add.at(self.histograms, ids, other.histograms)
+
+    def ingest_csv(self, path, chunksize=100_000):
+        """
+        Stream resale transactions from a CSV in chunks.
+
+        If the same file was ingested before and has only been appended to, reading
+        resumes from the previous end of file; if it was rewritten, statistics are reset
+        and the whole file is read again.
+
+        Returns:
+            int: Number of transactions read.
+        """
+        size = os.path.getsize(path)
+        resume = (
+            self.source_path == os.path.abspath(path)
+            and self.source_offset <= size
+            and self.source_checksum == _file_checksum(path, self.source_offset)
+        )
+        if not resume and self.source_path is not None:
+            print(f"'{path}' changed since it was last ingested. Rebuilding HDB price statistics.")
+            self.__init__()
+
+        rows = 0
+        for chunk in iter_resale_csv(path, usecols=['block', 'street_name', 'floor_area_sqm', 'resale_price'],
+                                     chunksize=chunksize, offset=self.source_offset if resume else 0):
+            full_address = chunk["block"].astype(str) + " " + chunk["street_name"]
+            self.add(full_address.to_numpy(), chunk["resale_price"] / chunk["floor_area_sqm"])
+            rows += len(chunk)
+
+        self.source_path = os.path.abspath(path)
+        self.source_offset = size
+        self.source_checksum = _file_checksum(path, size)
+        return rows
+
+    def _values_at_rank(self, cumulative, ranks):
+        """Approximate the rank-th smallest value per address (1-based ranks)."""
+        ranks = np.maximum(ranks, 1)
+        rank_bin = np.argmax(cumulative >= ranks[:, None], axis=1)
+
+        rows = np.arange(len(ranks))
+        below = np.where(rank_bin > 0, cumulative[rows, np.maximum(rank_bin - 1, 0)], 0)
+        in_bin = np.maximum(self.histograms[rows, rank_bin], 1)
+
+        # Values in a bin are assumed evenly spread (geometrically, since the bins are log-spaced)
+        fraction = (ranks - below - 0.5) / in_bin
+        log_lower = np.log(SKETCH_EDGES[rank_bin])
+        log_upper = np.log(SKETCH_EDGES[rank_bin + 1])
+        return np.exp(log_lower + fraction * (log_upper - log_lower))
+
+    def medians(self):
+        """Approximate median price per sqm per address from the histogram sketch."""
+        cumulative = np.cumsum(self.histograms, axis=1)
+        # Average the two middle values for even counts, as an exact median would
+        lower = self._values_at_rank(cumulative, (self.counts + 1) // 2)
+        upper = self._values_at_rank(cumulative, self.counts // 2 + 1)
+        return np.where(self.counts > 0, (lower + upper) / 2, np.nan)
+
+    def summary(self):
+        """
+        Returns:
+            pd.DataFrame: full_address, median_price_per_sqm, mean_price_per_sqm and the number
+            of transactions per address.
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = self.sums / self.counts
+        summary = pd.DataFrame({
+            "full_address": self.addresses,
+            "median_price_per_sqm": self.medians(),
+            "mean_price_per_sqm": means,
+            "transactions": self.counts,
+        })
+        return summary[self.counts > 0].sort_values("full_address").reset_index(drop=True)
+
+    def save(self, path=HDB_AGGREGATE_STATE_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        np.savez_compressed(
+            path,
+            addresses=np.array(self.addresses, dtype=str),
+            counts=self.counts,
+            sums=self.sums,
+            histograms=self.histograms,
+            sketch_edges=SKETCH_EDGES,
+            source=np.array([self.source_path or '', str(self.source_offset), self.source_checksum or '']),
+        )
+
+    @classmethod
+    def load(cls, path=HDB_AGGREGATE_STATE_PATH):
+        """Load saved statistics, or return an empty aggregator if none exist (or the sketch bins changed)."""
+        aggregator = cls()
+        if not os.path.exists(path):
+            return aggregator
+        with np.load(path) as state:
+            if not np.array_equal(state['sketch_edges'], SKETCH_EDGES):
+                return aggregator
+            aggregator.addresses = state['addresses'].tolist()
+            aggregator.address_index = {address: i for i, address in enumerate(aggregator.addresses)}
+            aggregator.counts = state['counts']
+            aggregator.sums = state['sums']
+            aggregator.histograms = state['histograms']
+            source_path, source_offset, source_checksum = state['source'].tolist()
+        aggregator.source_path = source_path or None
+        aggregator.source_offset = int(source_offset)
+        aggregator.source_checksum = source_checksum or None
+        return aggregator
@@ -0,0 +1,290 @@
+"""
+Long-lived query engine over the estimated income grid, with a small HTTP front-end.
+
+Usage:
+    income-sg serve --port 8080
+    curl "http://127.0.0.1:8080/nearest?lat=1.3521&lon=103.8198"
+"""
+import http.client
+import json
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from .grid_store import RasterGrid
+from .storage import read_dataset
+from .utils import project_to_svy21
+
+ESTIMATED_INCOME_PATH = "./processed/estimated_income.parquet"
+QUERY_COLUMNS = ['planning_area', 'subzone', 'latitude', 'longitude', 'popDensity', 'average_income']
+
+def _aggregate(incomes, densities):
+    """Summary statistics of the incomes of a set of cells."""
+    if len(incomes) == 0:
+        return {'cells': 0, 'mean_income': None, 'median_income': None, 'weighted_mean_income': None}
+    weight = densities.sum()
+    return {
+        'cells': int(len(incomes)),
+        'mean_income': float(incomes.mean()),
+        'median_income': float(np.median(incomes)),
+        'weighted_mean_income': float((incomes * densities).sum() / weight) if weight > 0 else None,
+    }
+
+class IncomeQueryEngine:
+    """
+    In-memory index of the estimated income grid.
+
+    Cells are held in a KD-tree over SVY21 metres for nearest and radius queries and in a
+    latitude-sorted array for bounding boxes. Per-subzone and per-planning-area row groups
+    and their aggregates are computed once at load time.
+
+    Parameters:
+        grid (pd.DataFrame): Estimated income grid with QUERY_COLUMNS.
+        exclusion_mask (ExclusionMask): Optional mask whose excluded cells are dropped, e.g.
+            when the rules changed after the grid was estimated.
+    """
+
+    def __init__(self, grid, exclusion_mask=None):
+        if exclusion_mask is not None:
+            grid = grid[~exclusion_mask.excluded(grid['latitude'], grid['longitude'],
+                                                 grid['popDensity'], grid['subzone'])]
+        self.grid = grid.reset_index(drop=True)
+        self.latitudes = self.grid['latitude'].to_numpy(dtype=float)
+        self.longitudes = self.grid['longitude'].to_numpy(dtype=float)
+        self.incomes = self.grid['average_income'].to_numpy(dtype=float)
+        self.densities = self.grid['popDensity'].to_numpy(dtype=float)
+        # Column arrays for single-cell lookups without going through the DataFrame
+        self.columns = {column: self.grid[column].to_numpy() for column in QUERY_COLUMNS}
+
+        self.tree = cKDTree(project_to_svy21(np.column_stack([self.latitudes, self.longitudes])))
+        self.latitude_order = np.argsort(self.latitudes, kind='stable')
+        self.sorted_latitudes = self.latitudes[self.latitude_order]
+
+        self.region_rows = {}
+        self.region_aggregates = {}
+        for level in ['subzone', 'planning_area']:
+            codes, names = pd.factorize(self.grid[level].astype(str).str.strip().str.lower())
+            order = np.argsort(codes, kind='stable')
+            splits = np.split(order, np.cumsum(np.bincount(codes, minlength=len(names)))[:-1])
+            self.region_rows[level] = dict(zip(names, splits))
+            self.region_aggregates[level] = {
+                name: _aggregate(self.incomes[rows], self.densities[rows]) for name, rows in zip(names, splits)
+            }
+
+    @classmethod
+    def load(cls, path=ESTIMATED_INCOME_PATH, exclusion_mask=None):
+        """Load from an estimated income dataset or a memory-mapped income grid directory."""
+        if os.path.isdir(path):
+            grid = RasterGrid.load(path).to_frame(QUERY_COLUMNS[:2] + QUERY_COLUMNS[4:])[QUERY_COLUMNS]
+        else:
+            grid = read_dataset(path, columns=QUERY_COLUMNS)
+        return cls(grid, exclusion_mask)
+
+    def _records(self, rows, distances=None):
+        records = self.grid.iloc[rows]
+        if distances is not None:
+            records = records.assign(distance_m=distances)
+        return records
+
+    def nearest_batch(self, lats, lons):
+        """
+        Nearest grid cell to each point.
+
+        Returns:
+            pd.DataFrame: One row per query point, with the distance in metres.
+        """
+        points = project_to_svy21(np.column_stack([np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)]))
+        distances, rows = self.tree.query(points, k=1)
+        return self._records(rows, distances).reset_index(drop=True)
+
+    def nearest(self, lat, lon):
+        """Nearest grid cell to a point, as a dict."""
+        distance, row = self.tree.query(project_to_svy21([[lat, lon]])[0], k=1)
+        record = {column: values[row] for column, values in self.columns.items()}
+        record['distance_m'] = distance
+        return record
+
+    def radius_batch(self, lats, lons, radius_m):
+        """
+        Aggregate income of the cells within radius_m metres of each point.
+
+        Returns:
+            list: One aggregate dict per query point.
+        """
+        points = project_to_svy21(np.column_stack([np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)]))
+        return [
+            _aggregate(self.incomes[rows], self.densities[rows])
+            for rows in (np.asarray(r, dtype=np.int64) for r in self.tree.query_ball_point(points, radius_m))
+        ]
+
+    def radius(self, lat, lon, radius_m, return_cells=False):
+        """Aggregate (and optionally the cells) within radius_m metres of a point."""
+        point = project_to_svy21([[lat, lon]])[0]
+        rows = np.asarray(self.tree.query_ball_point(point, radius_m), dtype=np.int64)
+        result = _aggregate(self.incomes[rows], self.densities[rows])
+        if return_cells:
+            result['cells_data'] = self._records(rows)
+        return result
+
+    def bbox_rows(self, min_lat, min_lon, max_lat, max_lon):
+        """Row indices of cells inside a bounding box."""
+        start = np.searchsorted(self.sorted_latitudes, min_lat, side='left')
+        end = np.searchsorted(self.sorted_latitudes, max_lat, side='right')
+        rows = self.latitude_order[start:end]
+        return rows[(self.longitudes[rows] >= min_lon) & (self.longitudes[rows] <= max_lon)]
+
+    def bbox(self, min_lat, min_lon, max_lat, max_lon, return_cells=False):
+        """Aggregate (and optionally the cells) inside a bounding box."""
+        rows = self.bbox_rows(min_lat, min_lon, max_lat, max_lon)
+        result = _aggregate(self.incomes[rows], self.densities[rows])
+        if return_cells:
+            result['cells_data'] = self._records(rows)
+        return result
+
+    def region(self, name, level='subzone'):
+        """Precomputed aggregate for a subzone or planning area (case-insensitive)."""
+        return self.region_aggregates[level].get(name.strip().lower(), _aggregate(np.empty(0), np.empty(0)))
+
+    def polygon(self, geometry):
+        """Aggregate of the cells inside a shapely polygon (EPSG:4326)."""
+        import shapely
+
+        min_lon, min_lat, max_lon, max_lat = geometry.bounds
+        rows = self.bbox_rows(min_lat, min_lon, max_lat, max_lon)
+        rows = rows[shapely.contains_xy(geometry, self.longitudes[rows], self.latitudes[rows])]
+        return _aggregate(self.incomes[rows], self.densities[rows])
+
+def _json_safe(value):
+    if isinstance(value, dict):
+        return {k: _json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    # Missing values (NaN, NA) become null; bare NaN is not valid JSON
+    if value is pd.NA or (isinstance(value, float) and not math.isfinite(value)):
+        return None
+    return value
+
+def make_handler(engine):
+    """HTTP request handler bound to an engine."""
+
+    class IncomeQueryHandler(BaseHTTPRequestHandler):
+        # Responses are small; send them without waiting to coalesce packets
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, payload):
+            body = json.dumps(_json_safe(payload), allow_nan=False).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            try:
+                if url.path == '/nearest':
+                    payload = engine.nearest(float(params['lat']), float(params['lon']))
+                elif url.path == '/radius':
+                    payload = engine.radius(float(params['lat']), float(params['lon']), float(params['radius']))
+                elif url.path == '/bbox':
+                    payload = engine.bbox(float(params['min_lat']), float(params['min_lon']),
+                                          float(params['max_lat']), float(params['max_lon']))
+                elif url.path in ('/subzone', '/planning_area'):
+                    payload = engine.region(params['name'], level=url.path[1:])
+                else:
+                    return self._send(404, {'error': f"Unknown endpoint '{url.path}'"})
+            except (KeyError, ValueError) as e:
+                return self._send(400, {'error': str(e)})
+            self._send(200, payload)
+
+        def do_POST(self):
+            # Batch nearest lookups: {"lats": [...], "lons": [...]}
+            if urlparse(self.path).path != '/nearest':
+                return self._send(404, {'error': f"Unknown endpoint '{self.path}'"})
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                result = engine.nearest_batch(request['lats'], request['lons'])
+            except (KeyError, ValueError) as e:
+                return self._send(400, {'error': str(e)})
+            self._send(200, result.to_dict(orient='records'))
+
+    return IncomeQueryHandler
+
+class PooledHTTPServer(HTTPServer):
+    """
+    HTTP server that handles requests on a fixed pool of threads.
+
+    Reusing threads avoids starting one per request and bounds the number of queries
+    running at once; all threads share the engine and its single SVY21 transformer.
+    """
+
+    def __init__(self, server_address, handler_class, max_workers=8):
+        super().__init__(server_address, handler_class)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self._process_request_thread, request, client_address)
+
+    def _process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+def serve(engine, host='127.0.0.1', port=8080, max_workers=8):
+    """Serve queries over HTTP until interrupted."""
+    server = PooledHTTPServer((host, port), make_handler(engine), max_workers=max_workers)
+    print(f"Serving income queries on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def benchmark_http(host, port, engine, n_requests=2000, concurrency=8, seed=0):
+    """
+    Measure nearest-cell query throughput against a running server.
+
+    Returns:
+        dict: Requests, elapsed seconds and requests per second.
+    """
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(engine.grid), n_requests)
+    urls = [
+        f"/nearest?{urlencode({'lat': engine.latitudes[row], 'lon': engine.longitudes[row]})}" for row in rows
+    ]
+
+    # http.client directly: urllib's proxy and handler resolution dominates the cost of a local request
+    def fetch(url):
+        connection = http.client.HTTPConnection(host, port)
+        try:
+            connection.request('GET', url)
+            return connection.getresponse().read()
+        finally:
+            connection.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(fetch, urls))
+    elapsed = time.perf_counter() - start
+    return {'requests': n_requests, 'seconds': elapsed, 'requests_per_second': n_requests / elapsed}
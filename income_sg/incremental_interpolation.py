@@ -0,0 +1,242 @@
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+INTERPOLATION_STATE_PATH = "./processed/interpolation_state.npz"
+
+def _idw_block(source_values, distances, indices, power):
+    """
+    IDW weights of one block of targets, as in utils.idw_interpolation, with each target's
+    weighted sum of values (numerator) and sum of weights (denominator).
+    """
+    weights = np.power(distances, power, out=distances)
+    weights += 1e-10  # Avoid division by zero
+    np.reciprocal(weights, out=weights)
+    weighted_values = source_values[indices]
+    weighted_values *= weights
+    return weights, np.sum(weighted_values, axis=1), np.sum(weights, axis=1)
+
+def _query(tree, targets, k, workers):
+    """k nearest neighbours, plus whether the (k+1)-th source is as close as the k-th."""
+    distances, indices = tree.query(targets, k=k + 1, workers=workers)
+    # Missing neighbours (fewer than k+1 sources) come back at infinity and are never tied
+    tied = np.isfinite(distances[:, k]) & (distances[:, k] <= distances[:, k - 1])
+    return np.ascontiguousarray(distances[:, :k]), np.ascontiguousarray(indices[:, :k]), tied
+
+def _source_keys(coords):
+    """Identify source points by coordinates, numbering repeats of the same coordinates."""
+    keys = pd.DataFrame(coords, columns=['lat', 'lon'])
+    keys['repeat'] = keys.groupby(['lat', 'lon']).cumcount()
+    return keys
+
+class IdwState:
+    """
+    Neighbour indices and IDW weights of every target cell from a previous run, with each
+    cell's weighted sum of values and sum of weights.
+
+    Parameters:
+        source_coords (np.ndarray): Source [lat, lon] pairs the indices refer to.
+        source_values (np.ndarray): Source values.
+        target_coords (np.ndarray): Target [lat, lon] pairs.
+        indices (np.ndarray): (targets, k) neighbour indices into the sources, nearest first.
+        weights (np.ndarray): (targets, k) IDW weights.
+        kth_distances (np.ndarray): Distance from each target to its farthest neighbour.
+        tied (np.ndarray): Targets whose (k+1)-th neighbour is as close as the k-th, so the
+            neighbour set depends on the KD-tree's tie-breaking.
+        numerators (np.ndarray): Weighted sum of neighbour values per target.
+        denominators (np.ndarray): Sum of neighbour weights per target.
+        power (float): IDW power.
+    """
+
+    def __init__(self, source_coords, source_values, target_coords, indices, weights, kth_distances, tied,
+                 numerators, denominators, power):
+        self.source_coords = source_coords
+        self.source_values = source_values
+        self.target_coords = target_coords
+        self.indices = indices
+        self.weights = weights
+        self.kth_distances = kth_distances
+        self.tied = tied
+        self.numerators = numerators
+        self.denominators = denominators
+        self.power = power
+
+    @property
+    def k(self):
+        return self.indices.shape[1]
+
+    @property
+    def values(self):
+        """Interpolated value per target."""
+        return self.numerators / self.denominators
+
+    @classmethod
+    def build(cls, source_data, target_coords, power=2, k=30, chunk_size=100_000, workers=-1):
+        """Run IDW over every target and keep the neighbours and weights."""
+        source_coords = source_data[['lat', 'lon']].to_numpy(dtype=float)
+        source_values = source_data['value'].to_numpy(dtype=float)
+        target_coords = np.asarray(target_coords, dtype=float)
+        tree = cKDTree(source_coords)
+
+        indices = np.empty((len(target_coords), k), dtype=np.int32)
+        weights = np.empty((len(target_coords), k))
+        kth_distances = np.empty(len(target_coords))
+        tied = np.empty(len(target_coords), dtype=bool)
+        numerators = np.empty(len(target_coords))
+        denominators = np.empty(len(target_coords))
+        chunk_size = chunk_size or max(len(target_coords), 1)
+        for start in range(0, len(target_coords), chunk_size):
+            end = start + chunk_size
+            distances, block_indices, tied[start:end] = _query(tree, target_coords[start:end], k, workers)
+            kth_distances[start:end] = distances[:, -1]
+            weights[start:end], numerators[start:end], denominators[start:end] = _idw_block(
+                source_values, distances, block_indices, power
+            )
+            indices[start:end] = block_indices
+
+        return cls(source_coords, source_values, target_coords, indices, weights, kth_distances, tied,
+                   numerators, denominators, power)
+
+    def update(self, source_data, workers=-1):
+        """
+        Bring the interpolation up to date with a new set of source points.
+
+        Sources are matched to the previous run by coordinates. For cells whose neighbours
+        only changed value, each changed neighbour's weight times its change in value is
+        added to the cell's stored weighted sum; the sum of weights is unchanged. Only
+        cells whose k-neighbour set changed (they lost a neighbour, a new point is at
+        least as close as their k-th neighbour, or a tie at the k-th neighbour may break
+        differently in the rebuilt tree) are re-queried. All other cells keep their
+        previous sums, so the cost follows the size of the change. Results match a full
+        run up to floating-point rounding.
+
+        Returns:
+            dict: Counts of changed, added and removed sources and of updated cells.
+        """
+        source_coords = source_data[['lat', 'lon']].to_numpy(dtype=float)
+        source_values = source_data['value'].to_numpy(dtype=float)
+
+        # Map previous source positions to new ones (-1 for removed points)
+        matched = _source_keys(self.source_coords).reset_index().merge(
+            _source_keys(source_coords).reset_index(), on=['lat', 'lon', 'repeat'], how='outer',
+            suffixes=('_old', '_new'),
+        )
+        old_to_new = np.full(len(self.source_coords), -1, dtype=np.int64)
+        kept = matched.dropna(subset=['index_old', 'index_new'])
+        old_to_new[kept['index_old'].to_numpy(dtype=np.int64)] = kept['index_new'].to_numpy(dtype=np.int64)
+        added = matched.loc[matched['index_old'].isna(), 'index_new'].to_numpy(dtype=np.int64)
+        removed = np.flatnonzero(old_to_new < 0)
+
+        kept_old = kept['index_old'].to_numpy(dtype=np.int64)
+        changed = kept_old[self.source_values[kept_old] != source_values[old_to_new[kept_old]]]
+
+        def targets_of(sources):
+            """Targets with any of the given previous sources among their neighbours."""
+            if len(sources) == 0:
+                return np.empty(0, dtype=np.int64)
+            selected = np.zeros(len(self.source_coords), dtype=bool)
+            selected[sources] = True
+            return np.flatnonzero(selected[self.indices].any(axis=1))
+
+        # Targets that lost a neighbour
+        requery = targets_of(removed)
+        if not np.array_equal(old_to_new, np.arange(len(source_coords))):
+            # A rebuilt tree may break ties at the k-th neighbour differently
+            requery = np.union1d(requery, np.flatnonzero(self.tied))
+        if len(added):
+            # Targets a new point would enter the k nearest of (ties included, as a full query may pick either)
+            distances, _ = cKDTree(source_coords[added]).query(self.target_coords, k=1, workers=workers)
+            requery = np.union1d(requery, np.flatnonzero(distances <= self.kth_distances))
+
+        # Delta update of the weighted sums for cells whose neighbour set is unchanged
+        reweight = np.setdiff1d(targets_of(changed), requery)
+        if len(reweight):
+            deltas = np.zeros(len(self.source_coords))
+            deltas[changed] = source_values[old_to_new[changed]] - self.source_values[changed]
+            self.numerators[reweight] += np.sum(self.weights[reweight] * deltas[self.indices[reweight]], axis=1)
+
+        indices = old_to_new[self.indices].astype(np.int32)
+        if len(requery):
+            tree = cKDTree(source_coords)
+            distances, requery_indices, self.tied[requery] = _query(tree, self.target_coords[requery], self.k, workers)
+            self.kth_distances[requery] = distances[:, -1]
+            self.weights[requery], self.numerators[requery], self.denominators[requery] = _idw_block(
+                source_values, distances, requery_indices, self.power
+            )
+            indices[requery] = requery_indices
+
+        self.source_coords = source_coords
+        self.source_values = source_values
+        self.indices = indices
+        return {
+            'changed_sources': len(changed),
+            'added_sources': len(added),
+            'removed_sources': len(removed),
+            'reweighted_cells': len(reweight),
+            'requeried_cells': len(requery),
+        }
+
+    def save(self, path=INTERPOLATION_STATE_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        np.savez(
+            path,
+            source_coords=self.source_coords,
+            source_values=self.source_values,
+            target_coords=self.target_coords,
+            indices=self.indices,
+            weights=self.weights,
+            kth_distances=self.kth_distances,
+            tied=self.tied,
+            numerators=self.numerators,
+            denominators=self.denominators,
+            power=self.power,
+        )
+
+    @classmethod
+    def load(cls, path=INTERPOLATION_STATE_PATH):
+        """Load a saved state, or return None if there is none (or it predates the stored sums)."""
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as state:
+            if 'numerators' not in state.files:
+                return None
+            return cls(
+                state['source_coords'],
+                state['source_values'],
+                state['target_coords'],
+                state['indices'],
+                state['weights'],
+                state['kth_distances'],
+                state['tied'],
+                state['numerators'],
+                state['denominators'],
+                float(state['power']),
+            )
+
+def incremental_idw_interpolation(source_data, target_coords, power=2, k=30,
+                                  state_path=INTERPOLATION_STATE_PATH, workers=-1):
+    """
+    IDW interpolation that reuses the previous run's neighbours and weights.
+
+    Falls back to a full run when there is no saved state or the targets, power or k
+    differ from the saved run.
+
+    Returns:
+        np.ndarray: Interpolated values for target_coords.
+    """
+    target_coords = np.asarray(target_coords, dtype=float)
+    state = IdwState.load(state_path)
+    if (state is None or state.power != power or state.k != k
+            or not np.array_equal(state.target_coords, target_coords)):
+        print("No reusable interpolation state. Interpolating every cell.")
+        state = IdwState.build(source_data, target_coords, power=power, k=k, workers=workers)
+    else:
+        stats = state.update(source_data, workers=workers)
+        print(f"Incremental interpolation: {stats['changed_sources']} changed, {stats['added_sources']} added, "
+              f"{stats['removed_sources']} removed sources; {stats['reweighted_cells']} cells reweighted, "
+              f"{stats['requeried_cells']} re-queried.")
+
+    state.save(state_path)
+    return state.values
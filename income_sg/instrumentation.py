@@ -0,0 +1,262 @@
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from .constants import PROFILERS
+
+
+INSTRUMENTATION_DIRECTORY = "./processed/instrumentation"
+
+# Interval of the RSS sampler and the sampling profiler, in seconds
+SAMPLE_INTERVAL = 0.05
+PROFILE_SAMPLE_INTERVAL = 0.01
+
+def current_rss():
+    """
+    Resident set size of this process in bytes: the peak so far where /proc is unavailable,
+    and 0 where the resource module is too (Windows).
+    """
+    try:
+        with open('/proc/self/statm', encoding='ascii') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        if resource is None:
+            return 0
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        scale = 1 if sys.platform == 'darwin' else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+def count_rows(path):
+    """Row count of a Parquet or CSV dataset (None for other or missing files)."""
+    if not os.path.exists(path):
+        return None
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        return pq.ParquetFile(path).metadata.num_rows
+    if path.endswith('.csv'):
+        with open(path, 'rb') as file:
+            lines = sum(block.count(b'\n') for block in iter(lambda: file.read(1 << 20), b''))
+        return max(lines - 1, 0)  # Header
+    return None
+
+def _geocode_counts():
+    """Geocoding counters so far (none until a stage has imported the geocoder)."""
+    geocoding = sys.modules.get(__package__ + '.geocoding')
+    return Counter() if geocoding is None else Counter(geocoding.GEOCODE_COUNTERS)
+
+def _total_rows(paths):
+    counts = [count_rows(path) for path in paths]
+    counts = [count for count in counts if count is not None]
+    return sum(counts) if counts else None
+
+class _Sampler(threading.Thread):
+    """Background thread calling a function every interval until stopped."""
+
+    def __init__(self, interval, sample):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.sample = sample
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+class _SamplingProfiler:
+    """Periodically records the Python stack of one thread as collapsed (flame graph) stacks."""
+
+    def __init__(self, thread_id, interval=PROFILE_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.stacks = Counter()
+        self.sampler = _Sampler(interval, self._sample)
+
+    def _sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        if stack:
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self.sampler.start()
+
+    def stop(self, path):
+        self.sampler.stop()
+        with open(path, 'w', encoding='utf-8') as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{stack} {count}\n")
+
+class Instrumentation:
+    """
+    Per-stage wall time, CPU time, peak RSS, rows in/out and geocoding counts, written
+    as JSON metrics and as Chrome trace events (open in chrome://tracing or Perfetto).
+
+    CPU time, RSS and geocoding counts are process-wide, so stages that run concurrently
+    see each other's usage; run the pipeline with max_workers=1 to separate them.
+
+    Parameters:
+        profile (str): None, 'cprofile' (a .prof file per stage, for pstats or snakeviz) or
+            'sampling' (a collapsed-stack .folded file per stage, for flame graphs).
+        output_directory (str): Directory for metrics, traces and profiles.
+    """
+
+    def __init__(self, profile=None, output_directory=INSTRUMENTATION_DIRECTORY):
+        if profile not in (None,) + PROFILERS:
+            raise ValueError(f"Unknown profiler '{profile}'. Choose from {PROFILERS}.")
+        self.profile = profile
+        self.output_directory = output_directory
+        self.run_id = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        self.start = time.perf_counter()
+        self.stages = []
+        self.trace_events = []
+        self.lock = threading.Lock()
+        self.rss_samples = []
+        self.rss_sampler = None
+
+    def _timestamp_us(self, seconds=None):
+        return ((time.perf_counter() if seconds is None else seconds) - self.start) * 1e6
+
+    def _sample_rss(self):
+        with self.lock:
+            self.rss_samples.append((time.perf_counter(), current_rss()))
+
+    def __enter__(self):
+        self._sample_rss()
+        self.rss_sampler = _Sampler(SAMPLE_INTERVAL, self._sample_rss)
+        self.rss_sampler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.rss_sampler.stop()
+        self._sample_rss()
+        self.write()
+
+    def _profile_path(self, name, extension):
+        directory = os.path.join(self.output_directory, f"profiles_{self.run_id}")
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, f"{name}.{extension}")
+
+    @contextmanager
+    def stage(self, name, inputs=(), outputs=()):
+        """Measure the body of the with-block as stage `name`."""
+        rows_in = _total_rows(inputs)
+        geocode_before = _geocode_counts()
+        thread = threading.current_thread()
+
+        profiler = None
+        if self.profile == 'cprofile':
+            profiler = cProfile.Profile()
+        elif self.profile == 'sampling':
+            profiler = _SamplingProfiler(thread.ident)
+
+        start_rss = current_rss()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        if profiler is not None:
+            profiler.enable() if self.profile == 'cprofile' else profiler.start()
+        status = 'ran'
+        try:
+            yield
+        except BaseException:
+            status = 'failed'
+            raise
+        finally:
+            if self.profile == 'cprofile':
+                profiler.disable()
+                profiler.dump_stats(self._profile_path(name, 'prof'))
+            elif self.profile == 'sampling':
+                profiler.stop(self._profile_path(name, 'folded'))
+            wall_end, cpu_end = time.perf_counter(), time.process_time()
+
+            with self.lock:
+                peak_rss = max([start_rss, current_rss()] + [
+                    rss for t, rss in self.rss_samples if wall_start <= t <= wall_end
+                ])
+            geocode_after = _geocode_counts()
+            record = {
+                'stage': name,
+                'status': status,
+                'wall_seconds': wall_end - wall_start,
+                'cpu_seconds': cpu_end - cpu_start,
+                'peak_rss_bytes': peak_rss,
+                'rows_in': rows_in,
+                'rows_out': _total_rows(outputs) if status == 'ran' else None,
+                'geocode_network_calls': geocode_after['network_calls'] - geocode_before['network_calls'],
+                'geocode_cache_hits': geocode_after['cache_hits'] - geocode_before['cache_hits'],
+            }
+            with self.lock:
+                self.stages.append(record)
+                self.trace_events.append({
+                    'name': name, 'cat': 'stage', 'ph': 'X', 'pid': os.getpid(), 'tid': thread.ident,
+                    'ts': self._timestamp_us(wall_start), 'dur': (wall_end - wall_start) * 1e6,
+                    'args': {k: v for k, v in record.items() if k not in ('stage', 'status')},
+                })
+
+    def skipped(self, name):
+        """Record a stage that was skipped because its inputs were unchanged."""
+        with self.lock:
+            self.stages.append({'stage': name, 'status': 'skipped'})
+            self.trace_events.append({
+                'name': f"{name} (skipped)", 'cat': 'stage', 'ph': 'i', 's': 'p',
+                'pid': os.getpid(), 'tid': threading.get_ident(), 'ts': self._timestamp_us(),
+            })
+
+    def write(self):
+        """
+        Write metrics_<run>.json and trace_<run>.json to the output directory.
+
+        Returns:
+            tuple: Paths of the metrics and trace files.
+        """
+        os.makedirs(self.output_directory, exist_ok=True)
+        metrics_path = os.path.join(self.output_directory, f"metrics_{self.run_id}.json")
+        trace_path = os.path.join(self.output_directory, f"trace_{self.run_id}.json")
+
+        with self.lock:
+            rss_events = [
+                {'name': 'rss', 'ph': 'C', 'pid': os.getpid(), 'ts': self._timestamp_us(t),
+                 'args': {'bytes': rss}}
+                for t, rss in self.rss_samples
+            ]
+            metrics = {
+                'run_id': self.run_id,
+                'wall_seconds': time.perf_counter() - self.start,
+                'peak_rss_bytes': max((rss for _, rss in self.rss_samples), default=None),
+                'profile': self.profile,
+                'stages': self.stages,
+            }
+            trace = {'traceEvents': self.trace_events + rss_events, 'displayTimeUnit': 'ms'}
+
+        with open(metrics_path, 'w', encoding='utf-8') as file:
+            json.dump(metrics, file, indent=2)
+        with open(trace_path, 'w', encoding='utf-8') as file:
+            json.dump(trace, file)
+
+        for record in metrics['stages']:
+            if record['status'] == 'failed':
+                print(f"  {record['stage']}: failed after {record['wall_seconds']:.2f}s")
+            elif record['status'] == 'ran':
+                print(f"  {record['stage']}: {record['wall_seconds']:.2f}s wall, {record['cpu_seconds']:.2f}s CPU, "
+                      f"peak RSS {record['peak_rss_bytes'] / 2**20:.0f} MiB, rows {record['rows_in']} -> "
+                      f"{record['rows_out']}, geocoding {record['geocode_network_calls']} calls / "
+                      f"{record['geocode_cache_hits']} cached")
+        print(f"Instrumentation saved to '{metrics_path}' and '{trace_path}'.")
+        return metrics_path, trace_path
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+from .storage import read_dataset, write_dataset
+from .incremental_interpolation import incremental_idw_interpolation
+from .partitioned import partitioned_idw_interpolation
+from .price_surfaces import blended_price_surface
+from .utils import idw_interpolation, kernel_interpolation, prepare_coordinates
+
+def interpolate_property_prices_to_population_density_grid(kernel=None, incremental=False, n_workers=None,
+                                                           skip_excluded=False, blend_housing_types=False,
+                                                           **kernel_params):
+    """
+    Interpolate HDB and private property prices onto the population density grid.
+
+    By default this runs IDW in lat/lon degrees with the 30 nearest neighbours. Pass a
+    kernel ('idw', 'gaussian' or 'nearest') to interpolate in SVY21 metres instead, with
+    kernel_interpolation parameters such as k, max_distance, power or bandwidth.
+
+    With incremental=True (default IDW only), each cell's neighbours and weights are kept
+    in ./processed/interpolation_state.npz, and later runs only recompute the cells whose
+    neighbours changed price, moved, or were added or removed.
+
+    With n_workers (default IDW only), planning areas are interpolated in parallel
+    processes; the result is identical to the serial run.
+
+    With skip_excluded=True, cells excluded by the exclusion mask (see exclusion_mask.py)
+    are not interpolated and keep a missing combined_price.
+
+    With blend_housing_types=True, each housing type is interpolated on its own and
+    combined_price is their average weighted by each type's local supply, the number of
+    transactions within 500 m (see price_surfaces.py). The per-type surfaces are cached, so a change to one type's
+    prices only re-interpolates that type; incremental and n_workers do not apply.
+    """
+    # Load data
+    pop_density_file = "./processed/population_density.parquet"
+    hdb_file = "./processed/hdb_property_prices.parquet"
+    private_file = "./processed/private_property_prices.parquet"
+    output_file = "./processed/interpolated_combined.parquet"
+
+    price_columns = ['latitude', 'longitude', 'mean_price_per_sqm', 'housing_type']
+    if blend_housing_types:
+        price_columns.append('transactions')
+    population_density = read_dataset(pop_density_file)
+    hdb_prices = read_dataset(hdb_file, columns=price_columns)
+    private_prices = read_dataset(private_file, columns=price_columns)
+
+    hdb_data = prepare_coordinates(hdb_prices, 'latitude', 'longitude', 'mean_price_per_sqm')
+    private_data = prepare_coordinates(private_prices, 'latitude', 'longitude', 'mean_price_per_sqm')
+    if blend_housing_types:
+        hdb_data['housing_type'] = hdb_prices['housing_type'].fillna('public').astype(str)
+        private_data['housing_type'] = private_prices['housing_type'].fillna('private').astype(str)
+        # Each point's supply is its number of transactions
+        hdb_data['units'] = hdb_prices['transactions'].fillna(1).astype(float)
+        private_data['units'] = private_prices['transactions'].fillna(1).astype(float)
+
+    # Combine datasets
+    combined_data = pd.concat([hdb_data, private_data], ignore_index=True)
+
+    # Population density grid coordinates
+    pop_coords = population_density[['latitude', 'longitude']].values
+    targets = np.arange(len(population_density))
+    if skip_excluded:
+        from .exclusion_mask import load_exclusion_mask
+
+        excluded = load_exclusion_mask().excluded(
+            population_density['latitude'], population_density['longitude'],
+            population_density['popDensity'], population_density['subzone'],
+        )
+        targets = np.flatnonzero(~excluded)
+        print(f"Skipping {excluded.sum()} excluded grid cells.")
+
+    # Interpolate combined prices
+    if blend_housing_types:
+        prices = blended_price_surface(combined_data, pop_coords[targets], kernel=kernel, **kernel_params)
+    elif kernel is None and incremental:
+        prices = incremental_idw_interpolation(combined_data, pop_coords[targets])
+    elif kernel is None and n_workers:
+        prices = partitioned_idw_interpolation(
+            combined_data, pop_coords[targets], population_density['planning_area'].iloc[targets], n_workers=n_workers
+        )
+    elif kernel is None:
+        prices = idw_interpolation(combined_data, pop_coords[targets])
+    else:
+        prices = kernel_interpolation(combined_data, pop_coords[targets], kernel=kernel, **kernel_params)
+
+    population_density['combined_price'] = np.nan
+    population_density.loc[population_density.index[targets], 'combined_price'] = prices
+
+    # Save results
+    write_dataset(population_density, output_file)
+
+    print(f"Interpolation completed. Results saved to '{output_file}'.")
\ No newline at end of file
@@ -0,0 +1,196 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from .utils import idw_interpolation
+
+# Margin in degrees (~2 km) of property points shipped with each partition
+DEFAULT_HALO = 0.02
+
+# Per-process arrays and context for partition workers, set by _init_partition_worker
+_partition_arrays = None
+_partition_context = None
+_partition_memory = []
+
+class SharedArrays:
+    """
+    Copies of numpy arrays in named shared memory blocks, for workers to attach to
+    without pickling. Use as a context manager; the blocks are freed on exit.
+
+    Parameters:
+        arrays (dict): Name -> numpy array.
+    """
+
+    def __init__(self, arrays):
+        self.blocks = []
+        self.specs = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self.blocks.append(block)
+            self.specs[name] = (block.name, array.shape, array.dtype.str)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+
+def _init_partition_worker(specs, context):
+    global _partition_arrays, _partition_context
+    _partition_arrays = {}
+    for name, (block_name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        _partition_memory.append(block)  # Keep the mapping alive for the worker's lifetime
+        _partition_arrays[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    _partition_context = context
+
+def partition_arrays():
+    """Arrays and context of the current partition worker."""
+    return _partition_arrays, _partition_context
+
+def partition_bounds(codes):
+    """
+    Group rows by partition code.
+
+    Returns:
+        tuple: (order, bounds) where order lists row positions grouped by code (in code
+        order, stable within a code) and bounds holds the (start, end) slice of order for
+        each code. Negative codes are left out.
+    """
+    codes = np.asarray(codes)
+    order = np.argsort(codes, kind='stable')
+    order = order[codes[order] >= 0]
+    counts = np.bincount(codes[order], minlength=codes.max() + 1 if len(order) else 0)
+    ends = np.cumsum(counts)
+    return order, [(int(end - count), int(end)) for count, end in zip(counts, ends) if count]
+
+def map_partitions(func, arrays, partitions, context=None, n_workers=None):
+    """
+    Run func over partitions in a process pool, with arrays shared rather than pickled.
+
+    func is a module-level function taking one partition; it reads the arrays and
+    context through partition_arrays(). Results come back in the order of partitions
+    whatever the timing, so a merge over them is deterministic. With n_workers=1 the
+    partitions run in this process.
+
+    Parameters:
+        func (callable): Function applied to each partition.
+        arrays (dict): Name -> numpy array, placed in shared memory.
+        partitions (list): Small picklable partition descriptions, e.g. (start, end) slices.
+        context: Picklable values passed once to every worker.
+        n_workers (int): Number of worker processes (default: all cores).
+
+    Returns:
+        list: func's result per partition.
+    """
+    n_workers = min(n_workers or os.cpu_count(), max(len(partitions), 1))
+    if n_workers == 1:
+        global _partition_arrays, _partition_context
+        _partition_arrays, _partition_context = arrays, context
+        try:
+            return [func(partition) for partition in partitions]
+        finally:
+            _partition_arrays = _partition_context = None
+
+    with SharedArrays(arrays) as shared, ProcessPoolExecutor(
+            max_workers=n_workers, initializer=_init_partition_worker, initargs=(shared.specs, context)) as executor:
+        return list(executor.map(func, partitions))
+
+def _idw_partition(bounds):
+    """
+    IDW of one partition's targets from the property points within its halo.
+
+    A target is only interpolated here if the result is certain to equal a query of
+    all points: its k+1 nearest halo points are at strictly increasing distances (so
+    the neighbours and their order are unique) and its k-th neighbour is closer than
+    the edge of the halo (so no point outside could be nearer).
+
+    Returns:
+        tuple: (values, certified) for the targets in the partition.
+    """
+    from scipy.spatial import cKDTree
+
+    arrays, context = partition_arrays()
+    k, power, halo = context['k'], context['power'], context['halo']
+    rows = arrays['order'][bounds[0]:bounds[1]]
+    targets = arrays['target_coords'][rows]
+    source_coords = arrays['source_coords']
+
+    low = targets.min(axis=0) - halo
+    high = targets.max(axis=0) + halo
+    in_halo = np.flatnonzero(((source_coords >= low) & (source_coords <= high)).all(axis=1))
+
+    values = np.full(len(rows), np.nan)
+    certified = np.zeros(len(rows), dtype=bool)
+    if len(in_halo) <= k:
+        return values, certified
+
+    distances, indices = cKDTree(source_coords[in_halo]).query(targets, k=k + 1)
+    edge = np.minimum(targets - low, high - targets).min(axis=1)
+    certified = (np.diff(distances, axis=1) > 0).all(axis=1) & (distances[:, k - 1] < edge)
+
+    # Same operations as utils.idw_interpolation, so certified targets match it exactly
+    weights = np.power(distances[certified, :k], power)
+    weights += 1e-10
+    np.reciprocal(weights, out=weights)
+    weighted_values = arrays['source_values'][in_halo[indices[certified, :k]]]
+    weighted_values *= weights
+    values[certified] = np.sum(weighted_values, axis=1) / np.sum(weights, axis=1)
+    return values, certified
+
+def partitioned_idw_interpolation(source_data, target_coords, partitions, power=2, k=30,
+                                  halo=DEFAULT_HALO, n_workers=None):
+    """
+    utils.idw_interpolation split into partitions (e.g. planning areas) run in parallel.
+
+    Each partition is interpolated from the property points within `halo` degrees of
+    its bounding box. Targets that the halo cannot decide exactly (sparse areas, or
+    equidistant neighbours whose order a different KD-tree may break differently) are
+    interpolated afterwards against all points, so the result is identical to
+    idw_interpolation.
+
+    Parameters:
+        source_data (pd.DataFrame): DataFrame with 'lat', 'lon', 'value'.
+        target_coords (array-like): Target [lat, lon] pairs.
+        partitions (array-like): Partition label of each target (missing labels form a partition).
+        power (float): IDW power.
+        k (int): Number of nearest neighbours.
+        halo (float): Margin in degrees around each partition.
+        n_workers (int): Number of worker processes (default: all cores).
+
+    Returns:
+        np.ndarray: Interpolated values for target_coords.
+    """
+    target_coords = np.asarray(target_coords, dtype=float)
+    codes, _ = pd.factorize(pd.Series(np.asarray(partitions, dtype=object)), use_na_sentinel=False)
+    order, bounds = partition_bounds(codes)
+
+    arrays = {
+        'source_coords': source_data[['lat', 'lon']].to_numpy(dtype=float),
+        'source_values': source_data['value'].to_numpy(dtype=float),
+        'target_coords': target_coords,
+        'order': order,
+    }
+    results = map_partitions(_idw_partition, arrays, bounds,
+                             context={'k': k, 'power': power, 'halo': halo}, n_workers=n_workers)
+
+    interpolated_values = np.empty(len(target_coords))
+    fallback = []
+    for (start, end), (values, certified) in zip(bounds, results):
+        rows = order[start:end]
+        interpolated_values[rows] = values
+        fallback.append(rows[~certified])
+    fallback = np.sort(np.concatenate(fallback)) if fallback else np.empty(0, dtype=np.int64)
+
+    if len(fallback):
+        interpolated_values[fallback] = idw_interpolation(source_data, target_coords[fallback], power=power, k=k)
+    print(f"Partitioned interpolation: {len(bounds)} partitions, {len(fallback)} of {len(target_coords)} "
+          f"cells interpolated against all points.")
+    return interpolated_values
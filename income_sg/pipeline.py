@@ -0,0 +1,204 @@
+import ast
+import hashlib
+import importlib
+import importlib.util
+import inspect
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+PIPELINE_STATE_PATH = "./processed/pipeline_state.json"
+
+class LazyCall:
+    """
+    A call of module.function(**kwargs) that imports the module only when run, so a
+    stage list can be built without importing the dependencies of every stage.
+    """
+
+    def __init__(self, module, function, **kwargs):
+        self.module = module
+        self.function = function
+        self.kwargs = kwargs
+
+    @property
+    def source_file(self):
+        return importlib.util.find_spec(self.module).origin
+
+    def __call__(self):
+        return getattr(importlib.import_module(self.module), self.function)(**self.kwargs)
+
+@dataclass
+class Stage:
+    """
+    A pipeline stage with the files it reads and writes.
+
+    Stages depend on each other through their paths: a stage runs after every stage
+    that writes one of its inputs.
+    """
+    name: str
+    func: callable
+    inputs: list = field(default_factory=list)
+    outputs: list = field(default_factory=list)
+
+def hash_file(path, file_hashes):
+    """
+    Content hash of a file, reusing the previous hash if its size and mtime are unchanged.
+
+    Parameters:
+        path (str): File path.
+        file_hashes (dict): Cache of path -> [size, mtime, hash], updated in place.
+
+    Returns:
+        str: Hex digest, or "missing" if the file does not exist.
+    """
+    if not os.path.exists(path):
+        return "missing"
+
+    stat = os.stat(path)
+    cached = file_hashes.get(path)
+    if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime:
+        return cached[2]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    file_hashes[path] = [stat.st_size, stat.st_mtime, digest.hexdigest()]
+    return digest.hexdigest()
+
+def _relative_imports(source_file):
+    """Paths of the sibling modules a source file imports relatively (from .module import ...)."""
+    with open(source_file, 'rb') as file:
+        tree = ast.parse(file.read(), filename=source_file)
+    directory = os.path.dirname(source_file)
+    paths = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and node.level == 1:
+            names = [node.module] if node.module else [alias.name for alias in node.names]
+            paths += [os.path.join(directory, f"{name.split('.')[0]}.py") for name in names]
+    return [path for path in paths if os.path.exists(path)]
+
+def stage_source_files(func):
+    """
+    Source files a stage function depends on: the module defining it and the package
+    modules it imports, directly or through other package modules. Modules it never
+    imports (the CLI, other stages) do not invalidate it.
+    """
+    source_file = func.source_file if isinstance(func, LazyCall) else inspect.getsourcefile(func)
+    seen = {os.path.normpath(source_file)}
+    pending = [source_file]
+    while pending:
+        for path in _relative_imports(pending.pop()):
+            path = os.path.normpath(path)
+            if path not in seen:
+                seen.add(path)
+                pending.append(path)
+    return sorted(seen)
+
+def stage_fingerprint(stage, file_hashes):
+    """Fingerprint of a stage's arguments, input contents and the source it depends on."""
+    digest = hashlib.sha256(stage.name.encode())
+    kwargs = stage.func.kwargs if isinstance(stage.func, LazyCall) else {}
+    digest.update(json.dumps(kwargs, sort_keys=True, default=str).encode())
+    for path in sorted(stage.inputs) + stage_source_files(stage.func):
+        digest.update(path.encode())
+        digest.update(hash_file(path, file_hashes).encode())
+    return digest.hexdigest()
+
+def load_pipeline_state(state_path=PIPELINE_STATE_PATH):
+    if os.path.exists(state_path):
+        with open(state_path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    return {"stages": {}, "files": {}}
+
+def save_pipeline_state(state, state_path=PIPELINE_STATE_PATH):
+    os.makedirs(os.path.dirname(state_path), exist_ok=True)
+    with open(state_path, 'w', encoding='utf-8') as file:
+        json.dump(state, file, indent=2)
+
+def stage_dependencies(stages):
+    """Map each stage name to the names of the stages producing its inputs."""
+    producers = {}
+    for stage in stages:
+        for output in stage.outputs:
+            producers[os.path.normpath(output)] = stage.name
+    return {
+        stage.name: {producers[os.path.normpath(path)] for path in stage.inputs
+                     if os.path.normpath(path) in producers} - {stage.name}
+        for stage in stages
+    }
+
+def run_pipeline(stages, force=False, max_workers=2, state_path=PIPELINE_STATE_PATH, instrumentation=None):
+    """
+    Run stages in dependency order, skipping stages whose inputs are unchanged since
+    their last successful run. Independent stages run concurrently.
+
+    Parameters:
+        stages (list): Stage definitions.
+        force (bool): Run every stage regardless of fingerprints.
+        max_workers (int): Maximum number of stages running at once.
+        state_path (str): Path of the JSON file storing fingerprints between runs.
+        instrumentation (Instrumentation): Records per-stage metrics if given.
+
+    Returns:
+        dict: Stage name -> "ran" or "skipped".
+    """
+    state = load_pipeline_state(state_path)
+    dependencies = stage_dependencies(stages)
+    stages_by_name = {stage.name: stage for stage in stages}
+    pending = dict(dependencies)
+    status = {}
+
+    # cProfile can only follow one stage thread at a time
+    if instrumentation is not None and instrumentation.profile == 'cprofile':
+        max_workers = 1
+
+    def run_stage(stage):
+        print(f"Running stage '{stage.name}'...")
+        start = time.perf_counter()
+        if instrumentation is None:
+            stage.func()
+        else:
+            with instrumentation.stage(stage.name, stage.inputs, stage.outputs):
+                stage.func()
+        print(f"Stage '{stage.name}' completed in {time.perf_counter() - start:.1f}s.")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        running = {}
+        while pending or running:
+            # Keep scheduling while skipped stages unblock their dependents
+            ready = [name for name, deps in pending.items() if deps <= status.keys()]
+            while ready:
+                name = ready.pop(0)
+                del pending[name]
+                stage = stages_by_name[name]
+
+                # Fingerprints are taken once upstream stages have written their outputs
+                fingerprint = stage_fingerprint(stage, state["files"])
+                outputs_exist = all(os.path.exists(path) for path in stage.outputs)
+                if not force and outputs_exist and state["stages"].get(name) == fingerprint:
+                    print(f"Skipping stage '{name}' (inputs unchanged).")
+                    status[name] = "skipped"
+                    if instrumentation is not None:
+                        instrumentation.skipped(name)
+                    ready = [name for name, deps in pending.items() if deps <= status.keys()]
+                    continue
+
+                running[executor.submit(run_stage, stage)] = (name, fingerprint)
+
+            if not running:
+                if pending:
+                    raise ValueError(f"Pipeline has a dependency cycle between stages: {sorted(pending)}")
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, fingerprint = running.pop(future)
+                future.result()
+                status[name] = "ran"
+                state["stages"][name] = fingerprint
+                save_pipeline_state(state, state_path)
+
+    return status
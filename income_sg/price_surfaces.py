@@ -0,0 +1,157 @@
+"""
+Separate price surfaces per housing type, blended by local supply.
+
+Each housing type's points are interpolated onto the grid on their own, so a handful
+of condominiums cannot dominate an HDB estate, and each cell counts the supply of
+every type within a radius: the transactions recorded at each point (an HDB block or a
+private project), as a proxy for its number of units. The combined price is the
+supply-weighted average of the surfaces. Surfaces are cached per housing type, keyed by a hash of that type's points,
+the targets and the parameters, so a change to one type's prices only re-interpolates
+its own layer; the blend itself is a few vectorized array operations.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from .utils import idw_interpolation, kernel_interpolation, project_to_svy21
+
+PRICE_SURFACES_DIRECTORY = "./processed/price_surfaces"
+
+# Radius (SVY21 metres) within which points count towards a cell's supply of their type
+DEFAULT_SUPPLY_RADIUS = 500.0
+
+def _surface_signature(points, target_coords, params):
+    """Hash of one housing type's points, the target cells and the interpolation parameters."""
+    digest = hashlib.blake2b(digest_size=16)
+    columns = ['lat', 'lon', 'value'] + (['units'] if 'units' in points else [])
+    digest.update(np.ascontiguousarray(points[columns].to_numpy(dtype=float)).tobytes())
+    digest.update(np.ascontiguousarray(target_coords, dtype=float).tobytes())
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+def _surface_path(housing_type, directory=PRICE_SURFACES_DIRECTORY):
+    name = ''.join(char if char.isalnum() else '_' for char in str(housing_type).lower())
+    return os.path.join(directory, f"{name}.npz")
+
+def local_supply(points, target_coords, radius=DEFAULT_SUPPLY_RADIUS, workers=-1):
+    """
+    Supply of one housing type around each target cell.
+
+    Each price point contributes its 'units' (its number of transactions), or one unit
+    if points carry no 'units' column.
+
+    Parameters:
+        points (pd.DataFrame): DataFrame with 'lat', 'lon' and optionally 'units'.
+        target_coords (array-like): Array of target coordinates [[lat, lon], ...].
+        radius (float): Search radius in metres.
+        workers (int): Number of workers for the KDTree queries (-1 uses all cores).
+
+    Returns:
+        tuple: (supply, nearest). The units within radius of each target, and the
+        distance in metres to the nearest point.
+    """
+    from scipy.spatial import cKDTree
+
+    tree = cKDTree(project_to_svy21(points[['lat', 'lon']].to_numpy(dtype=float)))
+    targets = project_to_svy21(target_coords)
+    nearest, _ = tree.query(targets, k=1, workers=workers)
+    if 'units' not in points:
+        supply = tree.query_ball_point(targets, radius, workers=workers, return_length=True)
+        return supply.astype(np.float64), nearest
+
+    units = points['units'].to_numpy(dtype=float)
+    neighbours = tree.query_ball_point(targets, radius, workers=workers)
+    lengths = np.fromiter((len(indices) for indices in neighbours), dtype=np.int64, count=len(neighbours))
+    flat = np.fromiter((i for indices in neighbours for i in indices), dtype=np.int64, count=lengths.sum())
+    supply = np.bincount(np.repeat(np.arange(len(neighbours)), lengths), weights=units[flat],
+                         minlength=len(neighbours))
+    return supply, nearest
+
+def housing_type_surface(housing_type, points, target_coords, supply_radius=DEFAULT_SUPPLY_RADIUS, kernel=None,
+                         directory=PRICE_SURFACES_DIRECTORY, **kernel_params):
+    """
+    Interpolated price and supply of one housing type, from its cache when unchanged.
+
+    Parameters:
+        housing_type (str): Name the surface is cached under.
+        points (pd.DataFrame): The housing type's 'lat', 'lon', 'value' and optionally 'units' points.
+        target_coords (np.ndarray): Array of target coordinates [[lat, lon], ...].
+        supply_radius (float): Supply search radius in metres.
+        kernel (str): None for the default lat/lon IDW, else a kernel_interpolation kernel.
+        directory (str): Directory of the cached surfaces.
+        **kernel_params: kernel_interpolation parameters.
+
+    Returns:
+        dict: 'price', 'supply' and 'nearest' arrays over the targets.
+    """
+    path = _surface_path(housing_type, directory)
+    params = {'supply_radius': supply_radius, 'kernel': kernel, **kernel_params}
+    signature = _surface_signature(points, target_coords, params)
+    if os.path.exists(path):
+        with np.load(path) as cached:
+            if str(cached['signature']) == signature:
+                print(f"Reusing the cached {housing_type} price surface.")
+                return {name: cached[name] for name in ('price', 'supply', 'nearest')}
+
+    print(f"Interpolating the {housing_type} price surface from {len(points)} points.")
+    if kernel is None:
+        # Clamp k so a housing type with few points still interpolates
+        price = np.asarray(idw_interpolation(points, target_coords, k=min(30, len(points))))
+    else:
+        price = kernel_interpolation(points, target_coords, kernel=kernel, **kernel_params)
+    supply, nearest = local_supply(points, target_coords, supply_radius)
+
+    surface = {'price': price, 'supply': supply, 'nearest': nearest}
+    os.makedirs(directory, exist_ok=True)
+    np.savez(path, signature=signature, **surface)
+    return surface
+
+def blend_surfaces(surfaces):
+    """
+    Supply-weighted average of the housing type surfaces.
+
+    Cells with no supply of any type within the radius take the surface of the type
+    whose nearest point is closest.
+
+    Parameters:
+        surfaces (dict): Housing type -> surface, as from housing_type_surface.
+
+    Returns:
+        np.ndarray: Blended price per target.
+    """
+    prices = np.stack([surface['price'] for surface in surfaces.values()])
+    weights = np.stack([surface['supply'] for surface in surfaces.values()])
+    nearest = np.stack([surface['nearest'] for surface in surfaces.values()])
+
+    unsupplied = weights.sum(axis=0) == 0
+    weights[np.argmin(nearest[:, unsupplied], axis=0), np.flatnonzero(unsupplied)] = 1.0
+    return np.sum(weights * prices, axis=0) / np.sum(weights, axis=0)
+
+def blended_price_surface(price_data, target_coords, supply_radius=DEFAULT_SUPPLY_RADIUS, kernel=None,
+                          directory=PRICE_SURFACES_DIRECTORY, **kernel_params):
+    """
+    Interpolate each housing type separately and blend the surfaces by local supply.
+
+    Parameters:
+        price_data (pd.DataFrame): DataFrame with 'lat', 'lon', 'value', 'housing_type' and
+            optionally 'units' (supply per point, default 1).
+        target_coords (array-like): Array of target coordinates [[lat, lon], ...].
+        supply_radius (float): Supply search radius in metres.
+        kernel (str): None for the default lat/lon IDW, else a kernel_interpolation kernel.
+        directory (str): Directory of the cached surfaces.
+        **kernel_params: kernel_interpolation parameters.
+
+    Returns:
+        np.ndarray: Blended price per target.
+    """
+    target_coords = np.asarray(target_coords, dtype=float)
+    surfaces = {
+        housing_type: housing_type_surface(
+            housing_type, points.reset_index(drop=True), target_coords, supply_radius, kernel, directory,
+            **kernel_params,
+        )
+        for housing_type, points in price_data.groupby('housing_type', sort=True)
+    }
+    return blend_surfaces(surfaces)
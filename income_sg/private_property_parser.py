@@ -0,0 +1,119 @@
+import codecs
+import os
+from dataclasses import dataclass, field
+
+import ijson
+import numpy as np
+from pyproj import Transformer
+
+PRIVATE_PROPERTY_RAW_DIRECTORY = './raw'
+PRIVATE_PROPERTY_RAW_FILENAMES = [f"private_property_prices_raw_{i}.json" for i in range(1, 5)]
+
+@dataclass
+class PrivateTransaction:
+    """A single URA private property transaction (values as given by the API)."""
+    area: str = None
+    floorRange: str = None
+    noOfUnits: str = None
+    contractDate: str = None
+    typeOfSale: str = None
+    price: str = None
+    propertyType: str = None
+    district: str = None
+    typeOfArea: str = None
+    tenure: str = None
+
+@dataclass
+class PrivateProject:
+    """A URA private property project with its transactions and WGS84 coordinates."""
+    project: str
+    street: str
+    x: float = None
+    y: float = None
+    transactions: list = field(default_factory=list)
+    latitude: float = None
+    longitude: float = None
+
+    @property
+    def has_coordinates(self):
+        return bool(self.x) and bool(self.y)
+
+class _Utf8Reader:
+    """
+    File wrapper that yields UTF-8 bytes for ijson, decoding the source as UTF-8 and
+    switching to latin-1 from the first block that is not valid UTF-8.
+    """
+
+    def __init__(self, file, path):
+        self.file = file
+        self.path = path
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+
+    def read(self, size=-1):
+        block = self.file.read(size)
+        try:
+            text = self.decoder.decode(block, final=not block)
+        except UnicodeDecodeError:
+            print(f"'{self.path}' is not valid UTF-8, reading the rest as latin-1.")
+            self.decoder = codecs.getincrementaldecoder('latin-1')()
+            text = self.decoder.decode(block, final=not block)
+        return text.encode('utf-8')
+
+def _to_float(value):
+    try:
+        return float(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+def iter_private_projects(directory=PRIVATE_PROPERTY_RAW_DIRECTORY, filenames=PRIVATE_PROPERTY_RAW_FILENAMES):
+    """
+    Stream projects from the URA private property JSON files, reading each file once.
+
+    Projects are yielded one at a time from the 'Result' array without loading the whole
+    document. Coordinates are not transformed here; see transform_project_coordinates.
+
+    Yields:
+        PrivateProject: Parsed project with typed transactions.
+    """
+    transaction_fields = PrivateTransaction.__dataclass_fields__.keys()
+
+    for filename in filenames:
+        filepath = os.path.join(directory, filename)
+        if not os.path.exists(filepath):
+            continue
+
+        with open(filepath, 'rb') as file:
+            for property_data in ijson.items(_Utf8Reader(file, filepath), 'Result.item', use_float=True):
+                yield PrivateProject(
+                    project=property_data.get('project', 'Unknown'),
+                    street=property_data.get('street', 'Unknown'),
+                    x=_to_float(property_data.get('x')),
+                    y=_to_float(property_data.get('y')),
+                    transactions=[
+                        PrivateTransaction(**{k: v for k, v in transaction.items() if k in transaction_fields})
+                        for transaction in property_data.get('transaction', [])
+                    ],
+                )
+
+def transform_project_coordinates(projects):
+    """
+    Fill in latitude/longitude for all projects with SVY21 coordinates in one
+    vectorized EPSG:3414 -> EPSG:4326 transform.
+
+    Returns:
+        list: The same projects.
+    """
+    with_coordinates = [project for project in projects if project.has_coordinates]
+    if with_coordinates:
+        transformer = Transformer.from_crs("EPSG:3414", "EPSG:4326", always_xy=True)
+        xs = np.array([project.x for project in with_coordinates])
+        ys = np.array([project.y for project in with_coordinates])
+        lons, lats = transformer.transform(xs, ys)
+        for project, lat, lon in zip(with_coordinates, lats.tolist(), lons.tolist()):
+            project.latitude = lat
+            project.longitude = lon
+    return projects
+
+def load_private_projects(directory=PRIVATE_PROPERTY_RAW_DIRECTORY, filenames=PRIVATE_PROPERTY_RAW_FILENAMES):
+    """Parse all private property projects in a single pass and transform their coordinates."""
+    return transform_project_coordinates(list(iter_private_projects(directory, filenames)))
@@ -0,0 +1,153 @@
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+from .constants import CUMULATIVE_INCOME_PATH, INCOME_CSV_PATTERN
+from .storage import write_dataset
+
+def income_vintage(path):
+    """Vintage name of an income CSV: the suffix after 'income_', or 'current' for income.csv."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return stem[len('income_'):] if stem.startswith('income_') else 'current'
+
+def read_income_counts(path):
+    """
+    Read one income CSV as household counts.
+
+    The first column holds the planning areas, which are stripped and lowercased.
+    Counts are parsed in one pass (values may carry trailing spaces); unparsable
+    counts are treated as 0. 'No_Working_Person' is summed into '0_1000'.
+
+    Returns:
+        tuple: (areas, brackets, counts, totals) with counts of shape (areas, brackets).
+    """
+    raw = pd.read_csv(path, dtype=str)
+    areas = raw.iloc[:, 0].str.strip().str.lower()
+
+    columns = list(raw.columns[1:])
+    values = pd.to_numeric(pd.Series(raw[columns].to_numpy().ravel()), errors='coerce')
+    values = values.fillna(0).to_numpy(dtype=float).reshape(len(raw), len(columns))
+
+    brackets = [col for col in columns if col not in ['Total', 'No_Working_Person']]
+    counts = values[:, [columns.index(col) for col in brackets]]
+    if 'No_Working_Person' in columns:
+        counts[:, brackets.index('0_1000')] += values[:, columns.index('No_Working_Person')]
+
+    # Keep the first row of any repeated planning area
+    first = ~areas.duplicated().to_numpy()
+    return list(areas[first]), brackets, counts[first], values[first, columns.index('Total')]
+
+class CumulativeIncome:
+    """
+    Cumulative income bracket probabilities of several vintages.
+
+    Parameters:
+        vintages (list): Vintage names, in the order of the first axis.
+        areas (list): Normalised (stripped, lowercase) planning area names.
+        brackets (list): Income bracket names, in ascending order.
+        probabilities (np.ndarray): (vintages, areas, brackets) cumulative probabilities,
+            NaN where an area is missing from a vintage.
+    """
+
+    def __init__(self, vintages, areas, brackets, probabilities):
+        self.vintages = list(vintages)
+        self.areas = list(areas)
+        self.brackets = list(brackets)
+        self.probabilities = probabilities
+
+    @classmethod
+    def from_csvs(cls, paths):
+        """Load and combine the income CSVs of several vintages."""
+        vintages = [income_vintage(path) for path in paths]
+        tables = [read_income_counts(path) for path in paths]
+
+        brackets = tables[0][1]
+        for vintage, (_, vintage_brackets, _, _) in zip(vintages, tables):
+            if vintage_brackets != brackets:
+                raise ValueError(f"Income brackets of vintage '{vintage}' differ from '{vintages[0]}'.")
+
+        areas = pd.Index(tables[0][0])
+        for vintage_areas, _, _, _ in tables[1:]:
+            areas = areas.append(pd.Index(vintage_areas).difference(areas, sort=False))
+
+        probabilities = np.full((len(paths), len(areas), len(brackets)), np.nan)
+        for i, (vintage_areas, _, counts, totals) in enumerate(tables):
+            with np.errstate(invalid='ignore', divide='ignore'):
+                cumulative = np.cumsum(counts / totals[:, None], axis=1)
+            # The top bracket ("20k and over") always closes at 1
+            cumulative[:, -1] = 1.0
+            probabilities[i, areas.get_indexer(vintage_areas)] = cumulative
+
+        return cls(vintages, areas, brackets, probabilities)
+
+    @classmethod
+    def from_frame(cls, df, vintage='current'):
+        """Single-vintage table from a cumulative_income DataFrame."""
+        df = df.drop_duplicates(subset='planning_area')
+        brackets = [col for col in df.columns if col != 'planning_area']
+        areas = df['planning_area'].astype(str).str.strip().str.lower()
+        return cls([vintage], areas, brackets, df[brackets].to_numpy(dtype=float)[None])
+
+    def table(self, vintage=None):
+        """(areas, brackets) cumulative probabilities of a vintage (default: the last)."""
+        return self.probabilities[-1 if vintage is None else self.vintages.index(vintage)]
+
+    def to_frame(self, vintage=None):
+        """Cumulative probabilities of a vintage as a DataFrame with a 'planning_area' column."""
+        table = self.table(vintage)
+        present = ~np.isnan(table[:, -1])
+        df = pd.DataFrame(table[present], columns=self.brackets)
+        df.insert(0, 'planning_area', np.asarray(self.areas, dtype=object)[present])
+        return df
+
+    def save(self, path=CUMULATIVE_INCOME_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        np.savez(
+            path,
+            vintages=np.array(self.vintages, dtype=str),
+            areas=np.array(self.areas, dtype=str),
+            brackets=np.array(self.brackets, dtype=str),
+            probabilities=self.probabilities,
+        )
+
+    @classmethod
+    def load(cls, path=CUMULATIVE_INCOME_PATH):
+        """Load a saved table, or return None if there is none."""
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            return cls(data['vintages'].tolist(), data['areas'].tolist(), data['brackets'].tolist(),
+                       data['probabilities'])
+
+def process_income_to_cumulative(paths=None):
+    """
+    Process the income data by summing 'No_Working_Person' into '0_1000',
+    dropping 'No_Working_Person', and calculating cumulative probabilities
+    for each income range within each planning area.
+
+    Every vintage matching INCOME_CSV_PATTERN is loaded in one call and saved as a
+    (vintage, area, bracket) array to CUMULATIVE_INCOME_PATH. The last vintage is also
+    saved as a table to ./processed/cumulative_income.parquet.
+
+    Parameters:
+        paths (list): Income CSVs to load (default: every file matching INCOME_CSV_PATTERN).
+
+    Returns:
+    - pd.DataFrame: The processed DataFrame with cumulative probabilities.
+    """
+    paths = paths or sorted(glob.glob(INCOME_CSV_PATTERN), key=lambda path: (income_vintage(path) == 'current', path))
+    if not paths:
+        raise FileNotFoundError(f"No income data matches '{INCOME_CSV_PATTERN}'.")
+
+    cumulative_income = CumulativeIncome.from_csvs(paths)
+    cumulative_income.save(CUMULATIVE_INCOME_PATH)
+
+    # Save the latest vintage as a table
+    income_data = cumulative_income.to_frame()
+    write_dataset(income_data, "./processed/cumulative_income.parquet")
+
+    print(f"Cumulative income of {len(cumulative_income.vintages)} vintage(s) ({', '.join(cumulative_income.vintages)}) "
+          f"for {len(cumulative_income.areas)} planning areas saved to '{CUMULATIVE_INCOME_PATH}'.")
+    return income_data
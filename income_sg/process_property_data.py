@@ -0,0 +1,423 @@
+import csv
+import os
+import numpy as np
+import pandas as pd
+from .geocode_resolver import HDB_CANDIDATE, NEAREST_CANDIDATE, resolve_candidates
+from .geocoding import OneMapGeocoder
+from .hdb_aggregator import HdbPriceAggregator, iter_resale_csv
+from .private_property_parser import iter_private_projects, load_private_projects
+from .storage import read_dataset, write_dataset
+from .utils import assign_planning_area_and_subzone
+
+def resolve_project_addresses(projects, responses, search_vals):
+    """
+    Resolve the address of every project in one batch, choosing the OneMap result
+    closest to the project's SVY21 x/y coordinates when multiple entries are found.
+
+    Args:
+        projects (list): PrivateProject records.
+        responses (dict): Search value -> OneMap response (or None).
+        search_vals (list): Search value of each project, also its default address.
+
+    Returns:
+        np.ndarray: The resolved address of each project.
+    """
+    reference_xy = np.column_stack([
+        np.array([project.x for project in projects], dtype=float),
+        np.array([project.y for project in projects], dtype=float),
+    ])
+    resolved = resolve_candidates(responses, search_vals, score=NEAREST_CANDIDATE, reference_xy=reference_xy)
+    return np.where(resolved['rank'] >= 0, resolved['address'], np.asarray(search_vals, dtype=object))
+
+def process_hdb_property_prices(candidate_score=HDB_CANDIDATE):
+    """
+    Filters unique addresses and calculates the median and mean price per square meter.
+
+    Args:
+        candidate_score (CandidateScore): Rule choosing among multiple OneMap results for an
+            address (see geocode_resolver.py; SECOND_CANDIDATE is the earlier "second result" rule).
+
+    Returns:
+        DataFrame: Processed DataFrame with unique addresses and calculated statistics.
+    """
+    # Stream new transactions into the running per-address statistics
+    aggregator = HdbPriceAggregator.load()
+    rows = aggregator.ingest_csv("./raw/hdb_property_prices.csv")
+    print(f"Aggregated {rows} new HDB resale transactions.")
+
+    # Unique addresses with median (sketch) and mean price per square meter
+    unique_data = aggregator.summary()
+    
+    # Add the housing_type column
+    unique_data["housing_type"] = "public"
+
+    # Resolve all addresses in one batch (cached addresses skip the network)
+    geocoder = OneMapGeocoder()
+    responses = geocoder.search_batch(unique_data["full_address"])
+    geocoder.close()
+
+    # Choose one result per address in a single vectorized pass
+    resolved = resolve_candidates(responses, unique_data["full_address"], score=candidate_score)
+    unique_data["latitude"] = resolved["latitude"].to_numpy()
+    unique_data["longitude"] = resolved["longitude"].to_numpy()
+    print(f"No data found for {(resolved['found'] == 0).sum()} addresses; "
+          f"{(resolved['found'] > 1).sum()} addresses with multiple entries resolved by score.")
+    
+    data_with_planning_areas_and_subzones = assign_planning_area_and_subzone(unique_data)
+    
+    # Save the processed data to a new Parquet file
+    write_dataset(data_with_planning_areas_and_subzones, "./processed/hdb_property_prices.parquet")
+
+    # Only persist the resume position once the output holds every ingested row, so a failed
+    # geocode or write re-reads the same transactions next run
+    aggregator.save()
+
+def private_project_name(project):
+    """Project name used for the project, with the street appended for "LANDED HOUSING DEVELOPMENT"."""
+    if "LANDED HOUSING DEVELOPMENT" in project.project.upper():
+        return f"{project.project} in {project.street}"
+    return project.project
+
+def geocode_private_projects(projects, landed_names=True, raw_names=True):
+    """
+    Fetch OneMap responses for private projects in one batch.
+
+    Args:
+        projects (list): Parsed PrivateProject records.
+        landed_names (bool): Include names with the street appended for landed developments.
+        raw_names (bool): Include the raw project names.
+
+    Returns:
+        dict: Search value -> OneMap response (or None).
+    """
+    search_vals = []
+    if landed_names:
+        search_vals += [private_project_name(project) for project in projects if project.has_coordinates]
+    if raw_names:
+        search_vals += [project.project for project in projects]
+
+    geocoder = OneMapGeocoder()
+    responses = geocoder.search_batch(search_vals)
+    geocoder.close()
+    return responses
+
+def build_private_property_prices(projects, responses):
+    """
+    Calculate the mean and median price per square meter for each project,
+    picking the closest OneMap entry as its full address.
+
+    Returns:
+        pd.DataFrame: One row per project with transactions and coordinates.
+    """
+    results = []
+    priced_projects = []
+    for project in projects:
+        # Skip if no coordinates
+        if not project.has_coordinates:
+            continue
+
+        prices_per_sqm = [
+            float(t.price) / float(t.area)
+            for t in project.transactions
+            if t.price and t.area
+        ]
+        if not prices_per_sqm:
+            continue
+
+        project_name = private_project_name(project)
+        priced_projects.append(project)
+        results.append({
+            'project_name': project_name,
+            'full_address': None,
+            'median_price_per_sqm': pd.Series(prices_per_sqm).median(),
+            'mean_price_per_sqm': sum(prices_per_sqm) / len(prices_per_sqm),
+            'transactions': len(prices_per_sqm),
+            'housing_type': 'private',
+            'latitude': project.latitude,
+            'longitude': project.longitude,
+        })
+
+    df = pd.DataFrame(results)
+    if len(df):
+        df['full_address'] = resolve_project_addresses(priced_projects, responses, df['project_name'].tolist())
+    return df
+
+def build_private_property_temporal_transactions(projects, responses):
+    """
+    List every transaction with its project address and coordinates,
+    formatting the contractDate as timeData (e.g., 0124 -> 01-24).
+
+    Returns:
+        pd.DataFrame: One row per transaction.
+    """
+    addresses = resolve_project_addresses(projects, responses, [project.project for project in projects])
+
+    results = []
+    for project, address in zip(projects, addresses):
+        # Process each transaction
+        for transaction in project.transactions:
+            contract_date = transaction.contractDate
+            if contract_date:
+                time_data = f"{contract_date[:2]}-{contract_date[2:]}"  # Convert to "MM-YY" format
+            else:
+                time_data = None
+
+            results.append({
+                'project_name': project.project,
+                'street': project.street,
+                'full_address': address,
+                'latitude': project.latitude,
+                'longitude': project.longitude,
+                'area': transaction.area,
+                'price': transaction.price,
+                'time_data': time_data,
+                'housing_type': 'private',
+                'property_type': transaction.propertyType,
+                'tenure': transaction.tenure,
+                'district': transaction.district,
+                'type_of_sale': transaction.typeOfSale,
+            })
+
+    return pd.DataFrame(results)
+
+def process_private_property_prices():
+    """
+    Calculate the mean and median price per square meter for each project,
+    append street name for "LANDED HOUSING DEVELOPMENT" projects,
+    fetch full addresses using the OneMap API (pick the closest entry if multiple found),
+    and save the results to a Parquet file.
+    """
+    output_file = "./processed/private_property_prices.parquet"  # Output file name
+
+    projects = load_private_projects()
+    responses = geocode_private_projects(projects, raw_names=False)
+    df = build_private_property_prices(projects, responses)
+
+    data_with_planning_areas_and_subzones = assign_planning_area_and_subzone(df)
+
+    # Save the processed data to a new Parquet file
+    write_dataset(data_with_planning_areas_and_subzones, output_file)
+
+    print(f"The analysis has been saved to '{output_file}'.")
+
+def process_private_property_temporal_transactions():
+    """
+    Process and save all transactions from private property JSON files,
+    formatting the contractDate as timeData (e.g., 0124 -> 01-24),
+    and include address and latitude/longitude logic for each transaction.
+    """
+    output_file = "./processed/private_property_temporal_transactions.parquet"  # Output file name
+
+    projects = load_private_projects()
+    responses = geocode_private_projects(projects, landed_names=False)
+    df = build_private_property_temporal_transactions(projects, responses)
+
+    data_with_planning_areas_and_subzones = assign_planning_area_and_subzone(df)
+
+    # Save the processed data to a new Parquet file
+    write_dataset(data_with_planning_areas_and_subzones, output_file)
+
+    print(f"The transaction data has been saved to '{output_file}'.")
+
+def process_private_property_datasets():
+    """
+    Build the private property prices, temporal transactions and raw transaction CSV
+    from a single pass over the URA JSON files, with one coordinate transform batch
+    and one geocoding batch shared by all three outputs.
+    """
+    prices_file = "./processed/private_property_prices.parquet"
+    transactions_file = "./processed/private_property_temporal_transactions.parquet"
+
+    projects = load_private_projects()
+    responses = geocode_private_projects(projects)
+
+    prices = assign_planning_area_and_subzone(build_private_property_prices(projects, responses))
+    write_dataset(prices, prices_file)
+    print(f"The analysis has been saved to '{prices_file}'.")
+
+    transactions = assign_planning_area_and_subzone(build_private_property_temporal_transactions(projects, responses))
+    write_dataset(transactions, transactions_file)
+    print(f"The transaction data has been saved to '{transactions_file}'.")
+
+    write_raw_private_property_prices_csv(projects)
+
+def combine_property_prices_dataset():
+    # Load data
+    hdb_file = "./processed/hdb_property_prices.parquet"
+    private_file = "./processed/private_property_prices.parquet"
+    output_file = "./processed/combined_property_prices.parquet"
+
+    # Load your datasets
+    hdb_prices = read_dataset(hdb_file)
+    private_prices = read_dataset(private_file)
+
+    # Find shared columns
+    shared_columns = hdb_prices.columns.intersection(private_prices.columns)
+
+    # Keep only shared columns in both DataFrames
+    hdb_prices_shared = hdb_prices[shared_columns]
+    private_prices_shared = private_prices[shared_columns]
+
+    # Concatenate the DataFrames
+    combined_data = pd.concat([hdb_prices_shared, private_prices_shared], ignore_index=True)
+
+    # Save results
+    write_dataset(combined_data, output_file)
+
+
+def write_raw_private_property_prices_csv(projects, output_file="./processed/private_property_prices_raw.csv"):
+    """Write every parsed transaction, with its project and street, to a flat CSV."""
+    fieldnames = [
+        'street', 'project_name', 'area', 'floorRange', 'noOfUnits',
+        'contractDate', 'typeOfSale', 'price', 'propertyType', 'district',
+        'typeOfArea', 'tenure'
+    ]
+    transaction_fields = fieldnames[2:]
+
+    results = []
+    for project in projects:
+        for transaction in project.transactions:
+            row = {'street': project.street, 'project_name': project.project}
+            for name in transaction_fields:
+                value = getattr(transaction, name)
+                row[name] = 'Unknown' if value is None else value
+            results.append(row)
+
+    # Write results to the output CSV
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(results)
+
+    return results
+
+def process_raw_private_property_prices_to_csv():
+    return write_raw_private_property_prices_csv(list(iter_private_projects()))
+
+def process_property_transactions_with_ids(current_year=2024):
+    """
+    Processes property transaction data to filter, transform, and save into a new format.
+
+    Args:
+        input_file (str): Path to the input CSV file.
+        output_file (str): Path to save the processed CSV file.
+        current_year (int): The current year for calculating property age.
+
+    Returns:
+        pd.DataFrame: The processed DataFrame.
+    """
+    input_file = "./processed/private_property_temporal_transactions.parquet"
+    output_file = "./processed/private_property_prices_id.csv"
+
+    # Load the data into a pandas DataFrame
+    df = read_dataset(input_file)
+
+    # Filter out rows with 'Freehold' tenure (these will have 'unknown' building age)
+    df = df[df['tenure'].str.contains("lease commencing from")]
+
+    # Calculate property age for leasehold properties
+    df['property_age'] = df['tenure'].str.extract(r'(\d{4})').astype(float).apply(lambda x: current_year - x)
+
+    # Add a property_id column for unique properties (group by project_name, street, full_address, latitude, and longitude)
+    df['property_id'] = (df['project_name'] + "_" + df['street'] + "_" + df['full_address'] + 
+                         "_" + df['latitude'].astype(str) + "_" + df['longitude'].astype(str)).factorize()[0] + 1
+
+    # Add a transaction_id column (unique for each transaction)
+    df['transaction_id'] = range(1, len(df) + 1)
+
+    # Rename columns for the output
+    df['property_address'] = df['full_address']
+    df['transaction_amount'] = df['price']
+    df['property_area'] = df['area']
+
+    # Select only the required columns for the new CSV
+    output_df = df[['transaction_id', 'property_id', 'property_address', 'latitude', 'longitude', 
+                    'property_age', 'property_area', 'transaction_amount']]
+
+    # Save to a new CSV file
+    output_df.to_csv(output_file, index=False)
+
+    return output_df
+
+
+def process_hdb_property_prices_with_id(chunksize=100_000):
+    """
+    Processes HDB property data to match the private property format, including property_id and transaction_id.
+
+    The raw resale file is streamed in chunks; only compact per-transaction columns and one
+    row per property are kept in memory, and the output is written in chunks.
+
+    Args:
+        chunksize (int): Transactions read and written per chunk.
+    """
+    raw_file = "./raw/hdb_property_prices.csv"
+    processed_file = "./processed/hdb_property_prices.parquet"
+    output_file = "./processed/hdb_property_prices_id.csv"
+    unmatched_file = "./processed/unmatched_addresses.csv"
+
+    processed_data = read_dataset(processed_file, columns=["full_address", "latitude", "longitude"])
+    coordinates = processed_data.drop_duplicates("full_address").set_index("full_address")[["latitude", "longitude"]]
+
+    # property_id is assigned by first appearance of (address, latitude, longitude), as factorize would
+    property_ids = {}
+    properties = []
+    transaction_property = []
+    transaction_columns = {"lease_commence_date": [], "floor_area_sqm": [], "resale_price": []}
+    unmatched = []
+    if os.path.exists(unmatched_file):
+        os.remove(unmatched_file)
+
+    for chunk in iter_resale_csv(raw_file, chunksize=chunksize):
+        # Create full address column in raw data
+        chunk["property_address"] = chunk["block"].astype(str) + " " + chunk["street_name"]
+
+        # Match latitude and longitude by full_address
+        chunk_coordinates = coordinates.reindex(chunk["property_address"])
+        latitude = chunk_coordinates["latitude"].to_numpy()
+        longitude = chunk_coordinates["longitude"].to_numpy()
+
+        # Save unmatched addresses for manual handling
+        missing = np.isnan(latitude)
+        if missing.any():
+            unmatched.extend(chunk.loc[missing, "property_address"].unique())
+            chunk[missing].to_csv(unmatched_file, mode="a", index=False, header=not os.path.exists(unmatched_file))
+
+        keys = (chunk["property_address"] + "_" + pd.Series(latitude, index=chunk.index).astype(str) + "_"
+                + pd.Series(longitude, index=chunk.index).astype(str))
+        codes, uniques = pd.factorize(keys)
+        first_rows = pd.Series(range(len(codes))).groupby(codes).first().to_numpy()
+        for key, row in zip(uniques, first_rows):
+            if key not in property_ids:
+                property_ids[key] = len(properties) + 1
+                properties.append((chunk["property_address"].iat[row], latitude[row], longitude[row]))
+        transaction_property.append(np.array([property_ids[key] for key in uniques], dtype=np.int64)[codes])
+        for column, values in transaction_columns.items():
+            values.append(chunk[column].to_numpy())
+
+    if unmatched:
+        print("Unmatched addresses found:")
+        print(pd.unique(np.asarray(unmatched, dtype=object)))
+
+    # Sort by property_id; transaction_id is sequential in that order
+    property_id = np.concatenate(transaction_property) if transaction_property else np.zeros(0, dtype=np.int64)
+    order = np.argsort(property_id, kind="stable")
+    transactions = {column: np.concatenate(values)[order] if values else np.zeros(0)
+                    for column, values in transaction_columns.items()}
+    property_id = property_id[order]
+    property_table = pd.DataFrame(properties, columns=["property_address", "latitude", "longitude"])
+
+    # Select and rename columns for consistency with private property data
+    output_columns = ["transaction_id", "property_id", "property_address", "latitude", "longitude",
+                      "property_age", "property_area", "transaction_amount"]
+    pd.DataFrame(columns=output_columns).to_csv(output_file, index=False)
+    for start in range(0, len(property_id), chunksize):
+        end = start + chunksize
+        ids = property_id[start:end]
+        output_chunk = property_table.iloc[ids - 1].reset_index(drop=True)
+        output_chunk.insert(0, "transaction_id", np.arange(start + 1, start + 1 + len(ids)))
+        output_chunk.insert(1, "property_id", ids)
+        output_chunk["property_age"] = 2024 - transactions["lease_commence_date"][start:end]
+        output_chunk["property_area"] = transactions["floor_area_sqm"][start:end]
+        output_chunk["transaction_amount"] = transactions["resale_price"][start:end]
+        output_chunk[output_columns].to_csv(output_file, mode="a", header=False, index=False)
@@ -0,0 +1,113 @@
+import threading
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from .grid_store import POPULATION_DENSITY_CSV, RasterGrid, _code_dtype, load_population_grid
+from .spatial_index import _source_signature, load_planning_area_index
+
+LABEL_RASTER_PATH = './raw/region_label_raster'
+# Serialises cold-cache rasterization between stages running in threads
+_raster_build_lock = threading.Lock()
+
+def build_label_raster(index, grid):
+    """
+    Rasterize planning area and subzone labels onto a grid.
+
+    Every cell centre is labelled with an exact lookup, and cells whose square touches
+    any polygon boundary are flagged, so a point elsewhere in an unflagged cell is known
+    to share its centre's labels.
+
+    Parameters:
+        index (PlanningAreaIndex): Polygon index used for the exact labels.
+        grid (RasterGrid): Target grid (only its geometry is used).
+
+    Returns:
+        RasterGrid: Grid with planning_area and subzone label layers and a boundary layer.
+    """
+    lats, lons = np.meshgrid(grid.latitudes, grid.longitudes, indexing='ij')
+    lats, lons = lats.ravel(), lons.ravel()
+    planning_area, subzone = index.lookup(lats, lons)
+
+    raster = RasterGrid(np.asarray(grid.latitudes), np.asarray(grid.longitudes), np.ones(grid.shape, dtype=bool))
+    for name, labels in [('planning_area', planning_area), ('subzone', subzone)]:
+        codes, names = pd.factorize(labels, sort=True)
+        raster.layers[name] = (codes + 1).reshape(grid.shape).astype(_code_dtype(len(names)))
+        raster.categories[name] = [str(label) for label in names]
+
+    # Cells whose square intersects a planning area or subzone boundary
+    lat_size, lon_size = grid.cell_size
+    cells = shapely.box(lons - lon_size / 2, lats - lat_size / 2, lons + lon_size / 2, lats + lat_size / 2)
+    boundaries = shapely.boundary(np.concatenate([index.planning_area_geometries, index.subzone_geometries]))
+    _, boundary_cells = shapely.STRtree(cells).query(boundaries, predicate='intersects')
+    boundary = np.zeros(lats.size, dtype=np.uint8)
+    boundary[boundary_cells] = 1
+    raster.layers['boundary'] = boundary.reshape(grid.shape)
+    return raster
+
+class RegionLabeller:
+    """
+    Label points from a cached label raster, falling back to exact polygon tests.
+
+    A point is labelled from the raster if it is exactly at a cell centre, or if it falls
+    in a cell that no boundary crosses. Points off the grid or inside boundary cells are
+    passed to the exact index.
+    """
+
+    def __init__(self, raster, index):
+        self.raster = raster
+        self.index = index
+        self.planning_area_names = np.array([None] + raster.categories['planning_area'], dtype=object)
+        self.subzone_names = np.array([None] + raster.categories['subzone'], dtype=object)
+
+    def lookup(self, lats, lons):
+        """
+        Returns:
+            tuple: (planning_area, subzone) object arrays, as PlanningAreaIndex.lookup.
+        """
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+        rows, cols, _ = self.raster.cell_index(lats, lons)
+
+        # Within half a cell of the nearest centre on both axes, i.e. inside that cell's square
+        lat_size, lon_size = self.raster.cell_size
+        in_cell = (
+            (np.abs(lats - self.raster.latitudes[rows]) <= lat_size / 2)
+            & (np.abs(lons - self.raster.longitudes[cols]) <= lon_size / 2)
+        )
+        at_centre = (lats == self.raster.latitudes[rows]) & (lons == self.raster.longitudes[cols])
+        from_raster = in_cell & ((self.raster.layers['boundary'][rows, cols] == 0) | at_centre)
+
+        planning_area = self.planning_area_names[self.raster.layers['planning_area'][rows, cols]]
+        subzone = self.subzone_names[self.raster.layers['subzone'][rows, cols]]
+
+        exact = np.flatnonzero(~from_raster)
+        if len(exact):
+            planning_area[exact], subzone[exact] = self.index.lookup(lats[exact], lons[exact])
+        return planning_area, subzone
+
+@lru_cache(maxsize=None)
+def load_region_labeller(planning_area_geojson='./raw/planning_area.geojson',
+                         subzone_geojson='./raw/subzone.geojson',
+                         population_density_csv=POPULATION_DENSITY_CSV,
+                         raster_path=LABEL_RASTER_PATH):
+    """
+    Load the label raster for the population grid once per process, rasterizing the
+    GeoJSON files on first use and again whenever they or the grid change.
+
+    Returns:
+        RegionLabeller: Labeller backed by the cached raster.
+    """
+    index = load_planning_area_index(planning_area_geojson, subzone_geojson)
+    signature = _source_signature((planning_area_geojson, subzone_geojson, population_density_csv)).tolist()
+
+    with _raster_build_lock:
+        raster = RasterGrid.load(raster_path)
+        if raster is None or raster.metadata.get('source_signature') != signature:
+            raster = build_label_raster(index, load_population_grid(population_density_csv))
+            raster.metadata['source_signature'] = signature
+            raster.save(raster_path)
+            raster = RasterGrid.load(raster_path)
+    return RegionLabeller(raster, index)
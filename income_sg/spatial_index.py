@@ -0,0 +1,199 @@
+import os
+import threading
+from functools import lru_cache
+
+import numpy as np
+import shapely
+
+# Bump when the cache layout changes
+INDEX_CACHE_VERSION = 1
+# Serialises cold-cache builds between stages running in threads
+_index_build_lock = threading.Lock()
+
+def _source_signature(paths):
+    """Size and modification time of each source file, used to invalidate the cache."""
+    return np.array([[os.path.getsize(path), os.path.getmtime(path)] for path in paths], dtype=float)
+
+def _pack_geometries(geometries):
+    """Serialize geometries to a flat WKB byte buffer plus offsets."""
+    wkb = shapely.to_wkb(geometries)
+    offsets = np.cumsum([0] + [len(b) for b in wkb])
+    return np.frombuffer(b"".join(wkb), dtype=np.uint8), offsets
+
+def _unpack_geometries(buffer, offsets):
+    """Inverse of _pack_geometries."""
+    data = buffer.tobytes()
+    return shapely.from_wkb([data[start:end] for start, end in zip(offsets[:-1], offsets[1:])])
+
+class PlanningAreaIndex:
+    """
+    In-memory index of planning area and subzone polygons for point labelling.
+
+    Subzones nest inside planning areas, so each subzone is mapped to its planning area
+    once at build time and a single STRtree query over the subzones labels both levels.
+    Points that fall outside every subzone are looked up in the planning area tree.
+
+    Parameters:
+        planning_area_names (array): Planning area name per planning area polygon.
+        planning_area_geometries (array): Planning area polygons (EPSG:4326).
+        subzone_names (array): Subzone name per subzone polygon.
+        subzone_geometries (array): Subzone polygons (EPSG:4326).
+        subzone_planning_area (array): Index into planning_area_names for each subzone (-1 if none).
+    """
+
+    def __init__(self, planning_area_names, planning_area_geometries,
+                 subzone_names, subzone_geometries, subzone_planning_area):
+        self.planning_area_names = np.asarray(planning_area_names, dtype=object)
+        self.planning_area_geometries = np.asarray(planning_area_geometries)
+        self.subzone_names = np.asarray(subzone_names, dtype=object)
+        self.subzone_geometries = np.asarray(subzone_geometries)
+        self.subzone_planning_area = np.asarray(subzone_planning_area, dtype=np.int32)
+
+        # Prepared geometries make the repeated point-in-polygon tests cheap
+        shapely.prepare(self.planning_area_geometries)
+        shapely.prepare(self.subzone_geometries)
+        self.planning_area_tree = shapely.STRtree(self.planning_area_geometries)
+        self.subzone_tree = shapely.STRtree(self.subzone_geometries)
+
+    @classmethod
+    def from_geojson(cls, planning_area_geojson, subzone_geojson):
+        """Build the index from the planning area and subzone GeoJSON files."""
+        import geopandas as gpd
+
+        planning_areas_gdf = gpd.read_file(planning_area_geojson)
+        subzones_gdf = gpd.read_file(subzone_geojson)
+        subzone_geometries = np.asarray(subzones_gdf.geometry)
+        planning_area_geometries = np.asarray(planning_areas_gdf.geometry)
+
+        # Map each subzone to the planning area containing its representative point
+        planning_area_tree = shapely.STRtree(planning_area_geometries)
+        subzone_idx, planning_area_idx = planning_area_tree.query(
+            shapely.point_on_surface(subzone_geometries), predicate='intersects'
+        )
+        subzone_planning_area = np.full(len(subzone_geometries), -1, dtype=np.int32)
+        # Keep the first matching planning area for each subzone
+        order = np.lexsort((planning_area_idx, subzone_idx))[::-1]
+        subzone_planning_area[subzone_idx[order]] = planning_area_idx[order]
+
+        return cls(
+            planning_areas_gdf['name'].to_numpy(),
+            planning_area_geometries,
+            subzones_gdf['name'].to_numpy(),
+            subzone_geometries,
+            subzone_planning_area,
+        )
+
+    def save(self, path, source_paths=()):
+        """Serialize the index to a compact binary (npz) cache, replacing path atomically."""
+        planning_area_wkb, planning_area_offsets = _pack_geometries(self.planning_area_geometries)
+        subzone_wkb, subzone_offsets = _pack_geometries(self.subzone_geometries)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, 'wb') as file:
+            np.savez(
+                file,
+                version=INDEX_CACHE_VERSION,
+                source_signature=_source_signature(source_paths),
+                planning_area_names=self.planning_area_names.astype(str),
+                planning_area_wkb=planning_area_wkb,
+                planning_area_offsets=planning_area_offsets,
+                subzone_names=self.subzone_names.astype(str),
+                subzone_wkb=subzone_wkb,
+                subzone_offsets=subzone_offsets,
+                subzone_planning_area=self.subzone_planning_area,
+            )
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path, source_paths=()):
+        """Load a cached index. Returns None if the cache is missing or stale."""
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as cache:
+            if int(cache['version']) != INDEX_CACHE_VERSION:
+                return None
+            signature = _source_signature(source_paths)
+            if cache['source_signature'].shape != signature.shape or not np.array_equal(
+                    cache['source_signature'], signature):
+                return None
+            return cls(
+                cache['planning_area_names'],
+                _unpack_geometries(cache['planning_area_wkb'], cache['planning_area_offsets']),
+                cache['subzone_names'],
+                _unpack_geometries(cache['subzone_wkb'], cache['subzone_offsets']),
+                cache['subzone_planning_area'],
+            )
+
+    @staticmethod
+    def _first_match(tree, geometries, points, lats, lons):
+        """Index of the first polygon intersecting each point (-1 if none)."""
+        # Bounding box candidates from the tree, then exact tests per prepared polygon
+        point_idx, polygon_idx = tree.query(points)
+        order = np.argsort(polygon_idx, kind='stable')
+        point_idx, polygon_idx = point_idx[order], polygon_idx[order]
+
+        hit = np.zeros(len(point_idx), dtype=bool)
+        starts = np.flatnonzero(np.diff(polygon_idx, prepend=-1))
+        for start, end in zip(starts, np.append(starts[1:], len(polygon_idx))):
+            candidates = point_idx[start:end]
+            hit[start:end] = shapely.intersects_xy(geometries[polygon_idx[start]], lons[candidates], lats[candidates])
+        point_idx, polygon_idx = point_idx[hit], polygon_idx[hit]
+
+        first = np.full(len(points), -1, dtype=np.int64)
+        # Write matches in descending polygon order so the lowest index wins
+        order = np.lexsort((polygon_idx, point_idx))[::-1]
+        first[point_idx[order]] = polygon_idx[order]
+        return first
+
+    def lookup(self, lats, lons):
+        """
+        Label points with their planning area and subzone.
+
+        Parameters:
+            lats (array-like): Latitudes.
+            lons (array-like): Longitudes.
+
+        Labels agree with gpd.sjoin(predicate='intersects') for points inside a single
+        polygon. A point on a shared boundary, which sjoin matches to every polygon it
+        touches, gets the polygon that comes first in the GeoJSON.
+
+        Returns:
+            tuple: (planning_area, subzone) object arrays, with None where a point falls
+            outside every polygon.
+        """
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+        points = shapely.points(lons, lats)
+
+        subzone_idx = self._first_match(self.subzone_tree, self.subzone_geometries, points, lats, lons)
+        planning_area_idx = np.where(subzone_idx >= 0, self.subzone_planning_area[subzone_idx], -1)
+
+        # Points outside any subzone (or in an unmapped subzone) fall back to the planning area tree
+        missing = np.flatnonzero(planning_area_idx < 0)
+        if len(missing):
+            planning_area_idx[missing] = self._first_match(
+                self.planning_area_tree, self.planning_area_geometries,
+                points[missing], lats[missing], lons[missing]
+            )
+
+        planning_area = np.where(planning_area_idx >= 0, self.planning_area_names[planning_area_idx], None)
+        subzone = np.where(subzone_idx >= 0, self.subzone_names[subzone_idx], None)
+        return planning_area, subzone
+
+@lru_cache(maxsize=None)
+def load_planning_area_index(planning_area_geojson='./raw/planning_area.geojson',
+                             subzone_geojson='./raw/subzone.geojson',
+                             cache_path='./raw/planning_area_index.npz'):
+    """
+    Load the planning area/subzone index once per process, using the binary cache
+    next to the GeoJSON files and rebuilding it when the GeoJSON files change.
+
+    Returns:
+        PlanningAreaIndex: The loaded index.
+    """
+    source_paths = (planning_area_geojson, subzone_geojson)
+    with _index_build_lock:
+        index = PlanningAreaIndex.load(cache_path, source_paths)
+        if index is None:
+            index = PlanningAreaIndex.from_geojson(planning_area_geojson, subzone_geojson)
+            index.save(cache_path, source_paths)
+    return index
@@ -0,0 +1,111 @@
+import glob
+import json
+import os
+
+from .constants import (CUMULATIVE_INCOME_PATH, EXCLUSION_MASK_PATH, EXCLUSION_RULES_PATH, INCOME_CSV_PATTERN,
+                        INCOME_GRID_PATH, TEMPORAL_OUTPUT_PATH, TILES_DIRECTORY)
+from .pipeline import LazyCall, Stage
+
+GEOJSON_FILES = ["./raw/planning_area.geojson", "./raw/subzone.geojson"]
+PRIVATE_PROPERTY_RAW_FILES = [f"./raw/private_property_prices_raw_{i}.json" for i in range(1, 5)]
+
+def _call(module, function, **kwargs):
+    return LazyCall(f"{__package__}.{module}", function, **kwargs)
+
+def _exclusion_inputs():
+    """Files the exclusion mask is compiled from: the rules, the labelled grid and any land-use file."""
+    inputs = [EXCLUSION_RULES_PATH, "./processed/population_density.parquet", "./processed/population_density.csv"]
+    if os.path.exists(EXCLUSION_RULES_PATH):
+        with open(EXCLUSION_RULES_PATH, encoding='utf-8') as file:
+            land_use = json.load(file).get('land_use')
+        if land_use:
+            inputs.append(land_use['path'])
+    return inputs
+
+def pipeline_stages(incremental=False, workers=None, temporal=False, ensemble=None, tiles=False, export_csv=False,
+                    skip_excluded=False, blend_housing_types=False):
+    """
+    The pipeline's stages, with the optional ones requested.
+
+    Stage functions are imported only when a stage runs, so building the list (and
+    skipping unchanged stages) costs no heavy imports.
+
+    Parameters:
+        incremental (bool): Re-interpolate only grid cells affected by changed property prices.
+        workers (int): Interpolate and estimate per planning area in this many processes.
+        temporal (bool): Add quarterly price surfaces.
+        ensemble (int): Add a Monte Carlo income ensemble of this many realisations.
+        tiles (bool): Add MBTiles exports of the income and price grids.
+        export_csv (bool): Add a CSV export of estimated_income.
+        skip_excluded (bool): Do not interpolate cells excluded by the exclusion mask.
+        blend_housing_types (bool): Interpolate each housing type separately and blend by local supply.
+
+    Returns:
+        list: Stage definitions.
+    """
+    stages = [
+        Stage("hdb_property_prices", _call("process_property_data", "process_hdb_property_prices"),
+              inputs=["./raw/hdb_property_prices.csv"] + GEOJSON_FILES,
+              outputs=["./processed/hdb_property_prices.parquet"]),
+        Stage("private_property_prices", _call("process_property_data", "process_private_property_datasets"),
+              inputs=PRIVATE_PROPERTY_RAW_FILES + GEOJSON_FILES,
+              outputs=["./processed/private_property_prices.parquet",
+                       "./processed/private_property_temporal_transactions.parquet",
+                       "./processed/private_property_prices_raw.csv"]),
+        # optional: combine_property_prices_dataset()
+        Stage("cumulative_income", _call("process_income_data", "process_income_to_cumulative"),
+              inputs=sorted(glob.glob(INCOME_CSV_PATTERN)),
+              outputs=[CUMULATIVE_INCOME_PATH, "./processed/cumulative_income.parquet"]),
+        # Non-residential cells, compiled from ./raw/exclusion_rules.json onto the population grid
+        Stage("exclusion_mask", _call("exclusion_mask", "build_exclusion_mask"),
+              inputs=_exclusion_inputs(),
+              outputs=[f"{EXCLUSION_MASK_PATH}/header.json"]),
+        Stage("interpolation", _call("interpolate_property_data",
+                                     "interpolate_property_prices_to_population_density_grid",
+                                     incremental=incremental, n_workers=workers, skip_excluded=skip_excluded,
+                                     blend_housing_types=blend_housing_types),
+              inputs=["./processed/population_density.parquet",
+                      "./processed/population_density.csv",
+                      "./processed/hdb_property_prices.parquet",
+                      "./processed/private_property_prices.parquet"]
+                     + ([f"{EXCLUSION_MASK_PATH}/header.json"] if skip_excluded else []),
+              outputs=["./processed/interpolated_combined.parquet"]),
+        # estimated_income dataset
+        Stage("estimate_income", _call("estimate_income", "estimate_income", n_workers=workers),
+              inputs=["./processed/interpolated_combined.parquet",
+                      CUMULATIVE_INCOME_PATH,
+                      f"{EXCLUSION_MASK_PATH}/header.json"],
+              outputs=["./processed/estimated_income.parquet"]),
+        # Memory-mapped grid of the estimated income, for the query service
+        Stage("income_grid", _call("grid_store", "build_income_grid"),
+              inputs=["./processed/estimated_income.parquet"],
+              outputs=[f"{INCOME_GRID_PATH}/header.json"]),
+    ]
+
+    if temporal:
+        stages.append(Stage("temporal_interpolation",
+                            _call("temporal_interpolation", "interpolate_temporal_price_surfaces"),
+                            inputs=["./raw/hdb_property_prices.csv",
+                                    "./processed/hdb_property_prices.parquet",
+                                    "./processed/private_property_temporal_transactions.parquet",
+                                    "./processed/population_density.parquet",
+                                    "./processed/population_density.csv"],
+                            outputs=[TEMPORAL_OUTPUT_PATH]))
+    if ensemble:
+        stages.append(Stage("estimate_income_ensemble",
+                            _call("estimate_income", "estimate_income_ensemble", n_realisations=ensemble),
+                            inputs=["./processed/interpolated_combined.parquet",
+                                    CUMULATIVE_INCOME_PATH,
+                                    f"{EXCLUSION_MASK_PATH}/header.json"],
+                            outputs=["./processed/estimated_income_ensemble.parquet"]))
+    if tiles:
+        stages.append(Stage("tile_pyramids", _call("tile_pyramid", "export_tile_pyramids"),
+                            inputs=[f"{INCOME_GRID_PATH}/header.json",
+                                    "./processed/interpolated_combined.parquet"],
+                            outputs=[f"{TILES_DIRECTORY}/estimated_income.mbtiles",
+                                     f"{TILES_DIRECTORY}/combined_price.mbtiles"]))
+    if export_csv:
+        stages.append(Stage("export_csv", _call("storage", "export_csv", path="./processed/estimated_income.parquet"),
+                            inputs=["./processed/estimated_income.parquet"],
+                            outputs=["./processed/estimated_income.csv"]))
+    return stages
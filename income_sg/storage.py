@@ -0,0 +1,67 @@
+import os
+
+import pandas as pd
+
+# String columns stored as dictionary-encoded categoricals
+CATEGORICAL_COLUMNS = ['planning_area', 'subzone', 'housing_type', 'income_bracket']
+
+def _csv_path(path):
+    return os.path.splitext(path)[0] + ".csv"
+
+def write_dataset(df, path):
+    """
+    Write an intermediate dataset as Parquet with typed columns.
+    Planning area, subzone and other label columns are dictionary-encoded.
+
+    Parameters:
+        df (pd.DataFrame): Dataset to write.
+        path (str): Output path ending in '.parquet'.
+    """
+    df = df.copy()
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+
+    # Columns built from None placeholders (e.g. geocoded coordinates) are stored as floats
+    for column in ['latitude', 'longitude']:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors='coerce')
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    df.to_parquet(path, engine='pyarrow', index=False)
+
+def read_dataset(path, columns=None):
+    """
+    Read an intermediate dataset, loading only the requested columns.
+
+    Falls back to the CSV with the same name if the Parquet file does not exist,
+    so datasets produced before the Parquet layer can still be read.
+
+    Parameters:
+        path (str): Dataset path ending in '.parquet'.
+        columns (list): Columns to load (None for all).
+
+    Returns:
+        pd.DataFrame: The dataset.
+    """
+    if os.path.exists(path):
+        return pd.read_parquet(path, engine='pyarrow', columns=columns)
+
+    csv_path = _csv_path(path)
+    if os.path.exists(csv_path):
+        df = pd.read_csv(csv_path, usecols=columns)
+        return df[columns] if columns is not None else df
+
+    raise FileNotFoundError(f"Neither '{path}' nor '{csv_path}' exists.")
+
+def export_csv(path, output_file=None):
+    """
+    Export a Parquet dataset to CSV (by default next to it, with a '.csv' extension).
+
+    Returns:
+        str: Path of the written CSV file.
+    """
+    output_file = output_file or _csv_path(path)
+    pd.read_parquet(path, engine='pyarrow').to_csv(output_file, index=False)
+    print(f"Exported '{path}' to '{output_file}'.")
+    return output_file
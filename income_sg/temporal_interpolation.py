@@ -0,0 +1,169 @@
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from .constants import TEMPORAL_OUTPUT_PATH
+from .storage import read_dataset, write_dataset
+
+def load_hdb_transactions(raw_file="./raw/hdb_property_prices.csv",
+                          processed_file="./processed/hdb_property_prices.parquet", freq='Q'):
+    """
+    HDB resale transactions with the coordinates of their address and their period.
+
+    Returns:
+        pd.DataFrame: source, latitude, longitude, period and price_per_sqm per transaction.
+    """
+    raw_data = pd.read_csv(raw_file, usecols=['month', 'block', 'street_name', 'floor_area_sqm', 'resale_price'])
+    coordinates = read_dataset(processed_file, columns=['full_address', 'latitude', 'longitude'])
+
+    transactions = pd.DataFrame({
+        'source': 'public|' + raw_data['block'].astype(str) + " " + raw_data['street_name'],
+        'full_address': raw_data['block'].astype(str) + " " + raw_data['street_name'],
+        'period': pd.PeriodIndex(pd.to_datetime(raw_data['month'], format='%Y-%m'), freq=freq),
+        'price_per_sqm': raw_data['resale_price'] / raw_data['floor_area_sqm'],
+    })
+    transactions = transactions.merge(coordinates, on='full_address', how='inner')
+    return transactions.drop(columns='full_address')
+
+def load_private_transactions(temporal_file="./processed/private_property_temporal_transactions.parquet", freq='Q'):
+    """
+    URA private transactions with their project coordinates and period (from time_data, MM-YY).
+
+    Returns:
+        pd.DataFrame: source, latitude, longitude, period and price_per_sqm per transaction.
+    """
+    data = read_dataset(temporal_file, columns=[
+        'project_name', 'full_address', 'latitude', 'longitude', 'area', 'price', 'time_data'
+    ])
+    dates = pd.to_datetime(data['time_data'], format='%m-%y', errors='coerce')
+    transactions = pd.DataFrame({
+        'source': 'private|' + data['project_name'].astype(str) + "|" + data['full_address'].astype(str),
+        'latitude': pd.to_numeric(data['latitude'], errors='coerce'),
+        'longitude': pd.to_numeric(data['longitude'], errors='coerce'),
+        'period': pd.PeriodIndex(dates, freq=freq),
+        'price_per_sqm': pd.to_numeric(data['price'], errors='coerce') / pd.to_numeric(data['area'], errors='coerce'),
+    })
+    return transactions
+
+def period_price_table(transactions):
+    """
+    Mean price per sqm of every source (address or project) in every period.
+
+    Returns:
+        tuple: (coords, periods, values) with source [lat, lon] pairs, sorted periods and a
+        (periods, sources) array that is NaN where a source has no transactions in a period.
+    """
+    transactions = transactions.replace([np.inf, -np.inf], np.nan).dropna()
+    source_codes, sources = pd.factorize(transactions['source'])
+    period_codes, periods = pd.factorize(transactions['period'], sort=True)
+
+    coords = transactions.groupby(source_codes)[['latitude', 'longitude']].first().to_numpy(dtype=float)
+    flat = period_codes * len(sources) + source_codes
+    sums = np.bincount(flat, weights=transactions['price_per_sqm'], minlength=len(periods) * len(sources))
+    counts = np.bincount(flat, minlength=len(periods) * len(sources))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        values = (sums / counts).reshape(len(periods), len(sources))
+    return coords, list(periods), values
+
+def temporal_idw_interpolation(source_coords, values, target_coords, power=2, k=30, candidates=None,
+                               chunk_size=4096, workers=-1):
+    """
+    IDW of many periods over one set of source locations, sharing a single neighbour search.
+
+    Each target's `candidates` nearest sources are found once. For every period, the first
+    k candidates with data in that period are weighted as in utils.idw_interpolation.
+    Targets with fewer than k candidates with data in a period are re-queried against that
+    period's sources, so every period matches its own k-nearest IDW.
+
+    Parameters:
+        source_coords (np.ndarray): Source [lat, lon] pairs.
+        values (np.ndarray): (periods, sources) values, NaN where a source has no data.
+        target_coords (array-like): Target [lat, lon] pairs.
+        power (float): IDW power.
+        k (int): Neighbours per target and period.
+        candidates (int): Neighbours searched once per target (default 4 * k).
+
+    Returns:
+        np.ndarray: (targets, periods) interpolated values (NaN for periods without data).
+    """
+    target_coords = np.asarray(target_coords, dtype=float)
+    n_periods, n_sources = values.shape
+    candidates = min(candidates or 4 * k, n_sources)
+    has_data = ~np.isnan(values)
+    filled_values = np.where(has_data, values, 0.0)
+    period_counts = has_data.sum(axis=1)
+
+    tree = cKDTree(source_coords)
+    result = np.full((len(target_coords), n_periods), np.nan)
+    short = [[] for _ in range(n_periods)]
+
+    for start in range(0, len(target_coords), chunk_size):
+        end = min(start + chunk_size, len(target_coords))
+        distances, indices = tree.query(target_coords[start:end], k=candidates, workers=workers)
+        distances = distances.reshape(end - start, -1)
+        indices = indices.reshape(end - start, -1)
+        weights = 1 / (distances ** power + 1e-10)
+        indices = indices.astype(np.int32)
+
+        for period in range(n_periods):
+            available = has_data[period][indices]
+            # Rank of each available candidate; only the k nearest are used
+            rank = np.cumsum(available, axis=1, dtype=np.int16)
+            selected_weights = weights * (available & (rank <= k))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result[start:end, period] = (
+                    np.einsum('ij,ij->i', selected_weights, filled_values[period][indices])
+                    / selected_weights.sum(axis=1)
+                )
+            short[period].append(start + np.flatnonzero(rank[:, -1] < min(k, period_counts[period])))
+
+    # Exact per-period neighbours where the shared candidates ran out
+    for period in range(n_periods):
+        targets = np.concatenate(short[period])
+        period_sources = np.flatnonzero(has_data[period])
+        if len(targets) == 0 or len(period_sources) == 0:
+            continue
+        period_k = min(k, len(period_sources))
+        distances, indices = cKDTree(source_coords[period_sources]).query(
+            target_coords[targets], k=period_k, workers=workers
+        )
+        distances = distances.reshape(len(targets), -1)
+        indices = indices.reshape(len(targets), -1)
+        weights = 1 / (distances ** power + 1e-10)
+        result[targets, period] = (
+            np.sum(weights * values[period, period_sources[indices]], axis=1) / np.sum(weights, axis=1)
+        )
+
+    return result
+
+def interpolate_temporal_price_surfaces(freq='Q', power=2, k=30, housing_types=('public', 'private')):
+    """
+    Interpolate per-period (quarterly by default) property price surfaces onto the
+    population density grid, one per housing type, and save them with one
+    <housing_type>_price_<period> column per (period, housing type).
+
+    HDB and private prices per sqm differ too much to share a surface: pooled, a period's
+    surface would follow whichever type happened to transact nearby in that period.
+    """
+    pop_density_file = "./processed/population_density.parquet"
+    output_file = TEMPORAL_OUTPUT_PATH
+
+    loaders = {'public': load_hdb_transactions, 'private': load_private_transactions}
+    population_density = read_dataset(pop_density_file, columns=['latitude', 'longitude'])
+    target_coords = population_density[['latitude', 'longitude']].to_numpy()
+
+    columns = {}
+    for housing_type in housing_types:
+        source_coords, periods, values = period_price_table(loaders[housing_type](freq=freq))
+        if not periods:
+            print(f"No {housing_type} transactions with coordinates. Skipping.")
+            continue
+        surfaces = temporal_idw_interpolation(source_coords, values, target_coords, power=power, k=k)
+        for i, period in enumerate(periods):
+            columns[f"{housing_type}_price_{period}"] = surfaces[:, i].astype(np.float32)
+        print(f"Interpolated {len(periods)} {housing_type} periods ({periods[0]} to {periods[-1]}) "
+              f"from {len(source_coords)} locations.")
+
+    result = pd.concat([population_density, pd.DataFrame(columns, index=population_density.index)], axis=1)
+    write_dataset(result, output_file)
+    print(f"Temporal price surfaces saved to '{output_file}'.")
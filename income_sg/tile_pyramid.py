@@ -0,0 +1,293 @@
+import json
+import math
+import os
+import sqlite3
+import struct
+import zlib
+
+import numpy as np
+
+from .constants import INCOME_GRID_PATH, TILES_DIRECTORY
+from .grid_store import RasterGrid
+from .storage import read_dataset
+
+TILE_SIZE = 256
+
+# Colour ramp anchors (dark blue to yellow) for low to high values
+COLOUR_RAMP = np.array([
+    [68, 1, 84], [59, 82, 139], [33, 145, 140], [94, 201, 98], [253, 231, 37]
+], dtype=float)
+
+def _colour_table(n_colours=256):
+    positions = np.linspace(0, len(COLOUR_RAMP) - 1, n_colours)
+    return np.stack([
+        np.interp(positions, np.arange(len(COLOUR_RAMP)), COLOUR_RAMP[:, channel]) for channel in range(3)
+    ], axis=1).astype(np.uint8)
+
+def encode_png(rgba):
+    """Encode a (height, width, 4) uint8 array as an RGBA PNG."""
+    height, width, _ = rgba.shape
+    # Filter type 0 (none) at the start of every scanline
+    scanlines = np.concatenate([np.zeros((height, 1), dtype=np.uint8), rgba.reshape(height, width * 4)], axis=1)
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    return (
+        b'\x89PNG\r\n\x1a\n'
+        + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))
+        + chunk(b'IDAT', zlib.compress(scanlines.tobytes(), 6))
+        + chunk(b'IEND', b'')
+    )
+
+def lonlat_to_pixel(lons, lats, zoom):
+    """Global Web Mercator pixel coordinates of points at a zoom level."""
+    scale = TILE_SIZE * 2 ** zoom
+    x = (np.asarray(lons, dtype=float) + 180.0) / 360.0 * scale
+    y = (1.0 - np.arcsinh(np.tan(np.radians(lats))) / math.pi) / 2.0 * scale
+    return x, y
+
+def pixel_to_lonlat(x, y, zoom):
+    """Longitude and latitude of global pixel coordinates (use +0.5 for pixel centres)."""
+    scale = TILE_SIZE * 2 ** zoom
+    lons = np.asarray(x, dtype=float) / scale * 360.0 - 180.0
+    lats = np.degrees(np.arctan(np.sinh(math.pi * (1.0 - 2.0 * np.asarray(y, dtype=float) / scale))))
+    return lons, lats
+
+def _grid_bounds(grid):
+    lat_size, lon_size = grid.cell_size
+    return (float(grid.longitudes[0] - lon_size / 2), float(grid.latitudes[0] - lat_size / 2),
+            float(grid.longitudes[-1] + lon_size / 2), float(grid.latitudes[-1] + lat_size / 2))
+
+def default_zoom_range(grid):
+    """
+    Zoom levels for a grid: the first zoom whose pixels are no wider than a cell, down
+    to the last zoom at which the whole grid fits in one tile.
+    """
+    _, lon_size = grid.cell_size
+    max_zoom = int(math.ceil(math.log2(360.0 / (TILE_SIZE * lon_size))))
+    west, south, east, north = _grid_bounds(grid)
+    min_zoom = max_zoom
+    while min_zoom > 0:
+        x, y = lonlat_to_pixel([west, east], [north, south], min_zoom)
+        if (np.floor(x / TILE_SIZE) == np.floor(x[0] / TILE_SIZE)).all() and \
+                (np.floor(y / TILE_SIZE) == np.floor(y[0] / TILE_SIZE)).all():
+            break
+        min_zoom -= 1
+    return min_zoom, max_zoom
+
+def sample_base_level(grid, layer, zoom):
+    """
+    Resample a grid layer onto the Web Mercator pixels of a zoom level.
+
+    Each pixel takes the cell its centre falls in; rows and columns are resolved
+    separately, as the grid is regular in latitude and longitude.
+
+    Returns:
+        tuple: (x0, y0, sums, counts), the global pixel of the first array element and
+        the (height, width) sums of values and counts of pixels with data.
+    """
+    west, south, east, north = _grid_bounds(grid)
+    (x0, x1), (y0, y1) = [np.floor(v).astype(np.int64) for v in lonlat_to_pixel([west, east], [north, south], zoom)]
+    lons, _ = pixel_to_lonlat(np.arange(x0, x1 + 1) + 0.5, np.zeros(1), zoom)
+    _, lats = pixel_to_lonlat(np.zeros(1), np.arange(y0, y1 + 1) + 0.5, zoom)
+
+    lat_size, lon_size = grid.cell_size
+    rows = np.clip(np.rint((lats - grid.latitudes[0]) / lat_size).astype(np.int64), 0, grid.shape[0] - 1)
+    cols = np.clip(np.rint((lons - grid.longitudes[0]) / lon_size).astype(np.int64), 0, grid.shape[1] - 1)
+    in_row = np.abs(lats - grid.latitudes[rows]) <= lat_size / 2
+    in_col = np.abs(lons - grid.longitudes[cols]) <= lon_size / 2
+
+    values = np.asarray(grid.layers[layer])[rows[:, None], cols[None, :]].astype(float)
+    present = in_row[:, None] & in_col[None, :] & np.asarray(grid.mask)[rows[:, None], cols[None, :]] & ~np.isnan(values)
+    return int(x0), int(y0), np.where(present, values, 0.0), present.astype(np.uint32)
+
+def downsample(x0, y0, sums, counts):
+    """
+    Aggregate one level into the next lower zoom by summing 2x2 pixel blocks.
+
+    The arrays are padded so they start and end on even global pixels, keeping the
+    blocks aligned to the pyramid. Means computed from the sums and counts are the
+    means over every base pixel with data.
+
+    Returns:
+        tuple: (x0, y0, sums, counts) of the lower level.
+    """
+    pad_top, pad_left = y0 % 2, x0 % 2
+    pad_bottom = (pad_top + sums.shape[0]) % 2
+    pad_right = (pad_left + sums.shape[1]) % 2
+    padding = ((pad_top, pad_bottom), (pad_left, pad_right))
+    sums = np.pad(sums, padding)
+    counts = np.pad(counts, padding)
+
+    height, width = sums.shape[0] // 2, sums.shape[1] // 2
+    return (
+        (x0 - pad_left) // 2,
+        (y0 - pad_top) // 2,
+        sums.reshape(height, 2, width, 2).sum(axis=(1, 3)),
+        counts.reshape(height, 2, width, 2).sum(axis=(1, 3)),
+    )
+
+def _level_tiles(x0, y0, sums, counts):
+    """Split a level into (tile_x, tile_y, means) for every tile with data."""
+    pad_top, pad_left = y0 % TILE_SIZE, x0 % TILE_SIZE
+    pad_bottom = -(pad_top + sums.shape[0]) % TILE_SIZE
+    pad_right = -(pad_left + sums.shape[1]) % TILE_SIZE
+    padding = ((pad_top, pad_bottom), (pad_left, pad_right))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.pad(sums / counts, padding, constant_values=np.nan)
+
+    n_rows, n_cols = means.shape[0] // TILE_SIZE, means.shape[1] // TILE_SIZE
+    tiles = means.reshape(n_rows, TILE_SIZE, n_cols, TILE_SIZE).swapaxes(1, 2)
+    has_data = ~np.isnan(tiles).all(axis=(2, 3))
+    for row, col in zip(*np.nonzero(has_data)):
+        yield (x0 - pad_left) // TILE_SIZE + col, (y0 - pad_top) // TILE_SIZE + row, tiles[row, col]
+
+def colour_tile(means, value_min, value_max, colours):
+    """RGBA pixels of a tile, transparent where there is no data."""
+    scaled = np.clip((means - value_min) / max(value_max - value_min, 1e-12), 0.0, 1.0)
+    indices = np.rint(np.nan_to_num(scaled) * (len(colours) - 1)).astype(np.int64)
+    rgba = np.empty(means.shape + (4,), dtype=np.uint8)
+    rgba[..., :3] = colours[indices]
+    rgba[..., 3] = np.where(np.isnan(means), 0, 255)
+    return rgba
+
+def build_tile_pyramid(grid, layer, path, name=None, min_zoom=None, max_zoom=None, value_range=None):
+    """
+    Export a grid layer as an MBTiles file of PNG tiles, one zoom level per power of two.
+
+    The highest zoom is resampled from the grid; every lower zoom is aggregated from the
+    level above it with a vectorized 2x2 sum, so no level goes back to the grid.
+
+    Parameters:
+        grid (RasterGrid): Source grid.
+        layer (str): Value layer to render.
+        path (str): Output .mbtiles path (replaced if it exists).
+        name (str): Tileset name (default: the layer name).
+        min_zoom (int), max_zoom (int): Zoom range (default: see default_zoom_range).
+        value_range (tuple): Values mapped to the ends of the colour ramp (default: the
+            2nd and 98th percentiles of the layer).
+
+    Returns:
+        int: Number of tiles written.
+    """
+    default_min_zoom, default_max_zoom = default_zoom_range(grid)
+    min_zoom = default_min_zoom if min_zoom is None else min_zoom
+    max_zoom = default_max_zoom if max_zoom is None else max_zoom
+    if value_range is None:
+        values = np.asarray(grid.layers[layer])[np.asarray(grid.mask)]
+        value_range = tuple(float(v) for v in np.nanpercentile(values, [2, 98]))
+    colours = _colour_table()
+
+    west, south, east, north = _grid_bounds(grid)
+    metadata = {
+        'name': name or layer,
+        'format': 'png',
+        'type': 'overlay',
+        'version': '1',
+        'description': f"{layer} on a {grid.shape[0]}x{grid.shape[1]} grid",
+        'bounds': f"{west},{south},{east},{north}",
+        'center': f"{(west + east) / 2},{(south + north) / 2},{min_zoom}",
+        'minzoom': str(min_zoom),
+        'maxzoom': str(max_zoom),
+        'legend': json.dumps({'value_min': value_range[0], 'value_max': value_range[1],
+                              'colours': colours[::51].tolist()}),
+    }
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temporary_path = path + '.tmp'
+    if os.path.exists(temporary_path):
+        os.remove(temporary_path)
+
+    n_tiles = 0
+    completed = False
+    connection = sqlite3.connect(temporary_path)
+    try:
+        with connection:
+            connection.execute("CREATE TABLE metadata (name TEXT, value TEXT)")
+            connection.execute("CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, "
+                               "tile_data BLOB)")
+            connection.execute("CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row)")
+            connection.executemany("INSERT INTO metadata VALUES (?, ?)", metadata.items())
+
+            level = sample_base_level(grid, layer, max_zoom)
+            for zoom in range(max_zoom, min_zoom - 1, -1):
+                if zoom < max_zoom:
+                    level = downsample(*level)
+                # MBTiles rows count from the south (TMS)
+                rows = [
+                    (zoom, int(x), int(2 ** zoom - 1 - y), encode_png(colour_tile(means, *value_range, colours)))
+                    for x, y, means in _level_tiles(*level)
+                ]
+                connection.executemany("INSERT INTO tiles VALUES (?, ?, ?, ?)", rows)
+                n_tiles += len(rows)
+        completed = True
+    finally:
+        connection.close()
+        # Don't leave a partial tileset behind
+        if not completed:
+            os.remove(temporary_path)
+    os.replace(temporary_path, path)
+    return n_tiles
+
+class TilePyramid:
+    """
+    Read-only access to an MBTiles file by slippy-map (XYZ) tile coordinates.
+
+    Parameters:
+        path (str): Path of the .mbtiles file.
+    """
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self.metadata = dict(self.connection.execute("SELECT name, value FROM metadata"))
+
+    def tile(self, zoom, x, y):
+        """PNG bytes of tile z/x/y, or None where the pyramid has no data."""
+        row = self.connection.execute(
+            "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+            (zoom, x, 2 ** zoom - 1 - y),
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def viewport(self, zoom, west, south, east, north):
+        """
+        Every tile of a zoom level that intersects a lon/lat box, in one indexed range query.
+
+        Returns:
+            dict: (x, y) -> PNG bytes for the tiles with data.
+        """
+        x, y = lonlat_to_pixel([west, east], [north, south], zoom)
+        x_min, x_max = (np.clip(x, 0, TILE_SIZE * 2 ** zoom - 1) // TILE_SIZE).astype(int)
+        y_min, y_max = (np.clip(y, 0, TILE_SIZE * 2 ** zoom - 1) // TILE_SIZE).astype(int)
+        flip = 2 ** zoom - 1
+        rows = self.connection.execute(
+            "SELECT tile_column, tile_row, tile_data FROM tiles WHERE zoom_level = ? "
+            "AND tile_column BETWEEN ? AND ? AND tile_row BETWEEN ? AND ?",
+            (zoom, int(x_min), int(x_max), int(flip - y_max), int(flip - y_min)),
+        )
+        return {(column, flip - row): data for column, row, data in rows}
+
+    def close(self):
+        self.connection.close()
+
+def export_tile_pyramids(income_grid_path=INCOME_GRID_PATH,
+                         interpolated_combined_path="./processed/interpolated_combined.parquet",
+                         output_directory=TILES_DIRECTORY):
+    """
+    Export tile pyramids of the estimated income and combined property price grids to
+    estimated_income.mbtiles and combined_price.mbtiles.
+    """
+    income_grid = RasterGrid.load(income_grid_path)
+    if income_grid is None:
+        raise FileNotFoundError(f"No income grid at '{income_grid_path}'. Run the income_grid stage first.")
+    price_grid = RasterGrid.from_frame(
+        read_dataset(interpolated_combined_path, columns=['latitude', 'longitude', 'combined_price']),
+        value_columns=['combined_price'],
+    )
+
+    for grid, layer, name in [(income_grid, 'average_income', 'estimated_income'),
+                              (price_grid, 'combined_price', 'combined_price')]:
+        path = os.path.join(output_directory, f"{name}.mbtiles")
+        n_tiles = build_tile_pyramid(grid, layer, path, name=name)
+        print(f"{n_tiles} {name} tiles saved to '{path}'.")
@@ -0,0 +1,238 @@
+from collections import OrderedDict
+import hashlib
+from math import sqrt
+import os
+import threading
+import pandas as pd
+import numpy as np
+
+# scipy, pyproj and the polygon index are imported where used, so stages that only
+# need standardize_names or prepare_coordinates start without them
+
+def calculate_distance(x1, y1, x2, y2):
+    """Calculate Euclidean distance between two points."""
+    return sqrt((x1 - x2) ** 2 + (y1 - y2) ** 2)
+
+def assign_planning_area_and_subzone(df, 
+                                     planning_area_geojson='./raw/planning_area.geojson', 
+                                     subzone_geojson='./raw/subzone.geojson',
+                                     use_raster=False):
+    """
+    Assigns planning area and subzone information to a property dataset based on latitude and longitude.
+    The polygons are loaded once per process from a binary cache (see spatial_index.py).
+
+    Parameters:
+        df (pd.Dataframe): Dataframe
+        planning_area_geojson (str): Path to the GeoJSON file containing planning area geometries. Default is './raw/planning_area.geojson'.
+        subzone_geojson (str): Path to the GeoJSON file containing subzone geometries. Default is './raw/subzone.geojson'.
+        use_raster (bool): Label from the cached raster of the population grid (see region_raster.py),
+            testing only off-grid and boundary points against the polygons. Gives the same labels.
+
+    Returns:
+        pd.DataFrame: A DataFrame enriched with planning area and subzone information.
+    """
+
+    from .region_raster import load_region_labeller
+    from .spatial_index import load_planning_area_index
+
+    # Label both levels in one batched lookup against the cached polygon index
+    if use_raster:
+        index = load_region_labeller(planning_area_geojson, subzone_geojson)
+    else:
+        index = load_planning_area_index(planning_area_geojson, subzone_geojson)
+    planning_area, subzone = index.lookup(df['latitude'], df['longitude'])
+
+    # Drop points outside any planning area or subzone
+    enriched_df = df.assign(planning_area=planning_area, subzone=subzone).dropna(subset=['planning_area', 'subzone'])
+
+    return enriched_df
+
+def prepare_coordinates(data, lat_col, lon_col, value_col):
+    return data[[lat_col, lon_col, value_col]].dropna().rename(columns={
+        lat_col: 'lat',
+        lon_col: 'lon',
+        value_col: 'value'
+    })
+
+# Interpolation function using Inverse Distance Weighting (IDW)
+def idw_interpolation(source_data, target_coords, power=2, k=30, chunk_size=100_000, workers=-1):
+    """
+    Perform IDW interpolation.
+
+    Target coordinates are processed in blocks of chunk_size so that the N x k
+    neighbour arrays never exceed chunk_size x k, whatever the size of the grid.
+    :param source_data: DataFrame with 'lat', 'lon', 'value'
+    :param target_coords: Array of target coordinates [[lat, lon], ...]
+    :param power: Power parameter for IDW
+    :param k: Number of nearest neighbours
+    :param chunk_size: Number of targets per block (None to process all at once)
+    :param workers: Number of workers for the KDTree query (-1 uses all cores)
+    :return: Interpolated values for target_coords
+    """
+    from scipy.spatial import cKDTree
+
+    source_coords = source_data[['lat', 'lon']].values
+    source_values = source_data['value'].values
+    target_coords = np.asarray(target_coords)
+
+    # Create KDTree for efficient nearest-neighbor lookup
+    tree = cKDTree(source_coords)
+
+    interpolated_values = np.empty(len(target_coords))
+    chunk_size = chunk_size or max(len(target_coords), 1)
+
+    for start in range(0, len(target_coords), chunk_size):
+        end = start + chunk_size
+
+        # Query distances and indices of nearest neighbors
+        distances, indices = tree.query(target_coords[start:end], k=k, workers=workers)
+
+        # Apply IDW formula in place: weights = 1 / (distances**power + 1e-10)
+        weights = np.power(distances, power, out=distances)
+        weights += 1e-10  # Avoid division by zero
+        np.reciprocal(weights, out=weights)
+
+        weighted_values = source_values[indices]
+        weighted_values *= weights
+        interpolated_values[start:end] = np.sum(weighted_values, axis=1) / np.sum(weights, axis=1)
+
+    return interpolated_values
+
+# Projected SVY21 coordinates keyed by a hash of the lat/lon array
+_projection_cache = OrderedDict()
+_projection_lock = threading.Lock()
+_PROJECTION_CACHE_SIZE = 8
+# Inputs smaller than this (e.g. single-point queries) are projected without caching
+_PROJECTION_CACHE_MIN_POINTS = 64
+_svy21_transformer = None
+
+def _svy21_project(coords):
+    global _svy21_transformer
+    if _svy21_transformer is None:
+        from pyproj import Transformer
+
+        _svy21_transformer = Transformer.from_crs("EPSG:4326", "EPSG:3414", always_xy=True)
+    x, y = _svy21_transformer.transform(coords[:, 1], coords[:, 0])
+    return np.column_stack([x, y])
+
+def project_to_svy21(coords):
+    """
+    Project [[lat, lon], ...] coordinates to SVY21 (EPSG:3414) metres.
+    Results are cached per process, so a grid is only projected once.
+
+    Parameters:
+        coords (array-like): Array of [lat, lon] pairs.
+
+    Returns:
+        np.ndarray: Array of [x, y] pairs in metres. Cached results are read-only.
+    """
+    coords = np.ascontiguousarray(coords, dtype=float)
+    if len(coords) < _PROJECTION_CACHE_MIN_POINTS:
+        with _projection_lock:
+            return _svy21_project(coords)
+
+    key = hashlib.blake2b(coords.tobytes(), digest_size=16).hexdigest()
+    with _projection_lock:
+        cached = _projection_cache.get(key)
+        if cached is not None:
+            _projection_cache.move_to_end(key)
+            return cached
+
+        projected = _svy21_project(coords)
+        projected.setflags(write=False)
+        _projection_cache[key] = projected
+        if len(_projection_cache) > _PROJECTION_CACHE_SIZE:
+            _projection_cache.popitem(last=False)
+    return projected
+
+def _idw_kernel(distances, power=2, **_):
+    return 1 / (distances**power + 1e-10)
+
+def _gaussian_kernel(distances, bandwidth=250.0, **_):
+    return np.exp(-0.5 * (distances / bandwidth) ** 2)
+
+# Weighting kernels for kernel_interpolation, taking distances in metres
+INTERPOLATION_KERNELS = {
+    'idw': _idw_kernel,
+    'gaussian': _gaussian_kernel,
+}
+
+def kernel_interpolation(source_data, target_coords, kernel='idw', k=30, max_distance=None,
+                         chunk_size=100_000, workers=-1, **kernel_params):
+    """
+    Interpolate in SVY21 metres using up to k neighbours within max_distance.
+
+    Neighbours beyond max_distance are ignored, so dense estates use only nearby points
+    (adaptive k). Targets with no source within max_distance fall back to their nearest source.
+
+    Parameters:
+        source_data (pd.DataFrame): DataFrame with 'lat', 'lon', 'value'.
+        target_coords (array-like): Array of target coordinates [[lat, lon], ...].
+        kernel (str): 'idw', 'gaussian', 'nearest' or any key of INTERPOLATION_KERNELS.
+        k (int): Maximum number of neighbours.
+        max_distance (float): Search radius in metres (None for unbounded).
+        chunk_size (int): Number of targets per block (None to process all at once).
+        workers (int): Number of workers for the KDTree query (-1 uses all cores).
+        **kernel_params: Kernel parameters, e.g. power=2 for 'idw' or bandwidth=250 for 'gaussian'.
+
+    Returns:
+        np.ndarray: Interpolated values for target_coords.
+    """
+    from scipy.spatial import cKDTree
+
+    source_coords = project_to_svy21(source_data[['lat', 'lon']].values)
+    source_values = source_data['value'].values
+    target_coords = project_to_svy21(target_coords)
+
+    tree = cKDTree(source_coords)
+
+    # Nearest neighbour needs no weighting
+    if kernel == 'nearest':
+        _, indices = tree.query(target_coords, k=1, workers=workers)
+        return source_values[indices]
+
+    weight_function = INTERPOLATION_KERNELS[kernel]
+    upper_bound = np.inf if max_distance is None else max_distance
+    # Pad with a zero-weight entry for neighbours missing within the radius
+    padded_values = np.append(source_values, 0.0)
+
+    interpolated_values = np.empty(len(target_coords))
+    chunk_size = chunk_size or max(len(target_coords), 1)
+
+    for start in range(0, len(target_coords), chunk_size):
+        end = start + chunk_size
+        block = target_coords[start:end]
+
+        distances, indices = tree.query(block, k=k, distance_upper_bound=upper_bound, workers=workers)
+        distances = distances.reshape(len(block), -1)
+        indices = indices.reshape(len(block), -1)
+
+        found = np.isfinite(distances)
+        weights = np.where(found, weight_function(np.where(found, distances, 0.0), **kernel_params), 0.0)
+        weight_sums = np.sum(weights, axis=1)
+        values = np.sum(weights * padded_values[indices], axis=1)
+
+        # Fall back to the nearest source where nothing is in range (or all weights underflow)
+        fallback = weight_sums == 0
+        if fallback.any():
+            _, nearest = tree.query(block[fallback], k=1, workers=workers)
+            values[fallback] = source_values[nearest]
+            weight_sums[fallback] = 1.0
+
+        interpolated_values[start:end] = values / weight_sums
+
+    return interpolated_values
+
+# Standardize planning area names
+def standardize_names(df, column_name):
+    if isinstance(df[column_name].dtype, pd.CategoricalDtype):
+        # Normalise each distinct name once and remap the codes (names may merge)
+        column = df[column_name].cat
+        category_codes, categories = pd.factorize(column.categories.str.strip().str.lower())
+        codes = column.codes.to_numpy()
+        df[column_name] = pd.Categorical.from_codes(
+            np.where(codes >= 0, category_codes[codes], -1), categories
+        )
+        return df
+    df[column_name] = df[column_name].str.strip().str.lower()
+    return df
\ No newline at end of file
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from income_sg.estimate_income import compute_income_bounds, partitioned_income_bounds
+from income_sg.process_income_data import CumulativeIncome
+
+BRACKETS = ['0_1000', '1000_1999', '2000_2999', '3000_3999', '4000_4999', '5000_and_Over']
+
+def _cumulative_income(areas):
+    rng = np.random.default_rng(0)
+    counts = rng.uniform(1, 10, size=(len(areas), len(BRACKETS)))
+    cumulative = np.cumsum(counts, axis=1) / counts.sum(axis=1, keepdims=True)
+    return CumulativeIncome(['current'], areas, BRACKETS, cumulative[None])
+
+def _grid(n_cells=500, seed=1):
+    rng = np.random.default_rng(seed)
+    planning_areas = np.array(['bedok', 'tampines', 'jurong west', 'unknown area', None], dtype=object)
+    subzones = np.array(['BEDOK NORTH', 'TAMPINES EAST', 'BOON LAY', None], dtype=object)
+    return pd.DataFrame({
+        'planning_area': planning_areas[rng.integers(0, len(planning_areas), n_cells)],
+        'subzone': subzones[rng.integers(0, len(subzones), n_cells)],
+        'latitude': rng.uniform(1.25, 1.45, n_cells),
+        'longitude': rng.uniform(103.6, 104.0, n_cells),
+        'combined_price': rng.uniform(3000, 20000, n_cells),
+        'price_decile': rng.integers(0, 11, n_cells),
+        'popDensity': rng.uniform(0, 50, n_cells),
+        'excluded': rng.random(n_cells) < 0.1,
+    })
+
+@pytest.mark.parametrize('n_cells', [500, 0])
+def test_partitioned_income_bounds_matches_serial(n_cells):
+    grid = _grid(n_cells)
+    cumulative_income = _cumulative_income(['bedok', 'tampines', 'jurong west', 'others'])
+
+    expected = compute_income_bounds(grid, cumulative_income)
+    result = partitioned_income_bounds(grid, cumulative_income, n_workers=2)
+
+    assert_frame_equal(result, expected)
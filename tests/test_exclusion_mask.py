@@ -0,0 +1,18 @@
+import numpy as np
+
+from income_sg.exclusion_mask import ExclusionRules
+
+def test_subzones_match_exactly():
+    rules = ExclusionRules(subzones=['CHANGI AIRPORT', 'JURONG ISLAND'])
+    subzone = ['CHANGI AIRPORT', 'changi airport', ' JURONG ISLAND', 'JURONG ISLAND', None, 'BEDOK NORTH']
+
+    excluded = rules.evaluate(np.zeros(6), np.zeros(6), np.full(6, 100.0), subzone)
+
+    np.testing.assert_array_equal(excluded, [True, False, False, True, False, False])
+
+def test_low_population_density_is_excluded():
+    rules = ExclusionRules(min_population_density=1.0)
+
+    excluded = rules.evaluate(np.zeros(3), np.zeros(3), [0.0, 0.5, 1.0], ['A', 'B', 'C'])
+
+    np.testing.assert_array_equal(excluded, [True, True, False])
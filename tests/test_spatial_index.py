@@ -0,0 +1,47 @@
+import os
+
+import numpy as np
+import pytest
+
+gpd = pytest.importorskip('geopandas')
+import shapely
+
+from income_sg.spatial_index import PlanningAreaIndex
+
+PLANNING_AREA_GEOJSON = './raw/planning_area.geojson'
+SUBZONE_GEOJSON = './raw/subzone.geojson'
+
+pytestmark = pytest.mark.skipif(
+    not (os.path.exists(PLANNING_AREA_GEOJSON) and os.path.exists(SUBZONE_GEOJSON)),
+    reason="Planning area and subzone GeoJSON files are not available.",
+)
+
+def _sjoin_labels(lats, lons, polygons):
+    """Every polygon name each point intersects, as gpd.sjoin labels them."""
+    points = gpd.GeoDataFrame(geometry=gpd.points_from_xy(lons, lats), crs=polygons.crs)
+    joined = gpd.sjoin(points, polygons[['name', 'geometry']], how='left', predicate='intersects')
+    return joined.groupby(level=0)['name'].agg(lambda names: set(names.dropna())).sort_index().tolist()
+
+def test_lookup_matches_sjoin():
+    planning_areas = gpd.read_file(PLANNING_AREA_GEOJSON)
+    subzones = gpd.read_file(SUBZONE_GEOJSON)
+    rng = np.random.default_rng(0)
+
+    min_lon, min_lat, max_lon, max_lat = planning_areas.total_bounds
+    lons = rng.uniform(min_lon, max_lon, 5000)
+    lats = rng.uniform(min_lat, max_lat, 5000)
+    # Subzone vertices lie on shared boundaries, where sjoin returns more than one polygon
+    vertices = shapely.get_coordinates(np.asarray(subzones.geometry.boundary))
+    vertices = vertices[rng.choice(len(vertices), min(len(vertices), 2000), replace=False)]
+    lons = np.concatenate([lons, vertices[:, 0]])
+    lats = np.concatenate([lats, vertices[:, 1]])
+
+    index = PlanningAreaIndex.from_geojson(PLANNING_AREA_GEOJSON, SUBZONE_GEOJSON)
+    planning_area, subzone = index.lookup(lats, lons)
+
+    # Inside one polygon the labels agree; on a boundary lookup keeps one of sjoin's matches
+    for labels, expected in [(subzone, _sjoin_labels(lats, lons, subzones)),
+                             (planning_area, _sjoin_labels(lats, lons, planning_areas))]:
+        mismatched = [i for i, (label, names) in enumerate(zip(labels, expected))
+                      if (label is None and names) or (label is not None and label not in names)]
+        assert not mismatched, f"{len(mismatched)} points labelled differently from sjoin"